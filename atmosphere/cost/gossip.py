@@ -102,11 +102,46 @@ class CostGossipState:
         Returns:
             NodeCostFactors if available and fresh, None otherwise
         """
-        if node_id not in self.node_costs:
+        entry = self.node_costs.get(node_id)
+        if entry is None:
             return None
         
-        factors, received_at = self.node_costs[node_id]
-        age = time.time() - received_at
+        return self._fresh_or_none(entry, time.time())
+    
+    def get_many(self, node_ids: list[str]) -> dict[str, Optional[NodeCostFactors]]:
+        """
+        Get cost factors for several nodes in one pass.
+        
+        Equivalent to calling get_node_cost() per node, but reads the
+        clock once and avoids per-call overhead when routing across
+        many candidates.
+        
+        Args:
+            node_ids: The nodes to query
+        
+        Returns:
+            Dict of node_id -> NodeCostFactors (None if missing or stale)
+        """
+        now = time.time()
+        node_costs = self.node_costs
+        result: dict[str, Optional[NodeCostFactors]] = {}
+        
+        for node_id in node_ids:
+            entry = node_costs.get(node_id)
+            result[node_id] = (
+                None if entry is None else self._fresh_or_none(entry, now)
+            )
+        
+        return result
+    
+    def _fresh_or_none(
+        self,
+        entry: tuple[NodeCostFactors, float],
+        now: float,
+    ) -> Optional[NodeCostFactors]:
+        """Return the cached factors if still fresh at `now`."""
+        factors, received_at = entry
+        age = now - received_at
         
         # Use shorter threshold for power-sensitive decisions
         if factors.on_battery and age > self.power_stale_seconds:
@@ -274,23 +274,31 @@ def compute_node_cost(
     """
     cost = 1.0
     
+    # The multiplier calls below are skipped when their inputs fall in the
+    # nominal range (each would return 1.0), which is the common case for
+    # healthy nodes.
+    
     # === Power State ===
-    cost *= power_cost_multiplier(node.on_battery, node.battery_percent)
+    if node.on_battery:
+        cost *= power_cost_multiplier(True, node.battery_percent)
     
     # === Compute Load ===
-    cost *= compute_load_multiplier(
-        cpu_load=node.cpu_load,
-        gpu_load=node.gpu_load,
-        memory_percent=node.memory_percent,
-        work_type=work.work_type,
-    )
+    if node.cpu_load > 0.25 or node.gpu_load > 25 or node.memory_percent > 80:
+        cost *= compute_load_multiplier(
+            cpu_load=node.cpu_load,
+            gpu_load=node.gpu_load,
+            memory_percent=node.memory_percent,
+            work_type=work.work_type,
+        )
     
     # === Network ===
-    cost *= network_cost_multiplier(
-        bandwidth_mbps=node.bandwidth_mbps,
-        is_metered=node.is_metered,
-        work_type=work.work_type,
-    )
+    bandwidth = node.bandwidth_mbps
+    if node.is_metered or (bandwidth is not None and bandwidth < 100):
+        cost *= network_cost_multiplier(
+            bandwidth_mbps=bandwidth,
+            is_metered=node.is_metered,
+            work_type=work.work_type,
+        )
     
     # === Data-Heavy Work Additional Penalty ===
     if work.data_size_bytes > 1_000_000:  # > 1MB
@@ -92,8 +92,16 @@ class CostAwareRouter:
         node_factors = []
         cost_breakdown = {}
         
+        # Fetch all remote gossip state in one batch
+        remote_factors = self.cost_state.get_many(
+            [n for n in candidate_nodes if n != self.local_node_id]
+        )
+        
         for node_id in candidate_nodes:
-            factors = self._get_node_factors(node_id)
+            if node_id == self.local_node_id:
+                factors = self._get_node_factors(node_id)
+            else:
+                factors = remote_factors.get(node_id)
             if factors is not None:
                 node_factors.append(factors)
                 cost = compute_node_cost(factors, work, sensitivity)
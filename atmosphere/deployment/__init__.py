@@ -20,6 +20,7 @@ from .gossip import (
     MessageType,
     ModelRoute,
     ModelRoutingTable,
+    WireFormat,
 )
 
 __all__ = [
@@ -37,4 +38,5 @@ __all__ = [
     "MessageType",
     "ModelRoute",
     "ModelRoutingTable",
+    "WireFormat",
 ]
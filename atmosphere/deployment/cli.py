@@ -5,38 +5,127 @@ Integrates with the Atmosphere CLI to provide model management commands.
 """
 
 import asyncio
+import heapq
+import json
+import os
 import sys
-from datetime import datetime
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 import click
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
-from .registry import ModelRegistry, ModelManifest, LLAMAFARM_MODELS_DIR
-from .packager import ModelPackager
-from .distributor import ModelDistributor, DeploymentStrategy
+# Registry, packager, distributor and rich table/progress are imported
+# inside the commands that use them so `atmosphere model --help` stays cheap.
 
 console = Console()
 
+# Snapshot of the loaded registry, reused by later invocations while the
+# registry file is unchanged
+REGISTRY_CACHE_FILE = Path.home() / ".atmosphere" / "cache" / "registry.json"
+REGISTRY_CACHE_TTL = 24 * 60 * 60
+
+# Rows rendered per table chunk in long listings
+TABLE_CHUNK_ROWS = 100
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
 
 def run_async(coro):
-    """Run an async function."""
+    """
+    Run an async function.
+    
+    Reuses one event loop for the whole process instead of creating and
+    tearing one down per call.
+    """
+    global _loop
     try:
         loop = asyncio.get_running_loop()
     except RuntimeError:
-        return asyncio.run(coro)
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+        return _loop.run_until_complete(coro)
     else:
         return loop.run_until_complete(coro)
 
 
+def _load_registry_cached():
+    """
+    Return a loaded ModelRegistry, using the on-disk snapshot if valid.
+    
+    The snapshot is valid when it was written by this atmosphere version,
+    is younger than REGISTRY_CACHE_TTL and matches the mtime of the
+    registry file load() reads. Set ATMOSPHERE_DISABLE_REGISTRY_CACHE to always do a full load.
+    """
+    from .. import __version__
+    from .registry import ModelRegistry
+    
+    if os.environ.get("ATMOSPHERE_DISABLE_REGISTRY_CACHE"):
+        registry = ModelRegistry()
+        run_async(registry.load())
+        return registry
+    
+    # Whichever file load() would read, including the legacy YAML fallback
+    registry_file = ModelRegistry().source_file
+    try:
+        registry_mtime = registry_file.stat().st_mtime_ns
+    except OSError:
+        registry_mtime = None
+    
+    try:
+        with open(REGISTRY_CACHE_FILE) as f:
+            snapshot = json.load(f)
+        if (
+            snapshot.get("atmosphere_version") == __version__
+            and snapshot.get("registry_mtime_ns") == registry_mtime
+            and time.time() - snapshot.get("created_at", 0) < REGISTRY_CACHE_TTL
+        ):
+            return ModelRegistry.from_snapshot(snapshot["registry"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    registry = ModelRegistry()
+    run_async(registry.load())
+    
+    try:
+        REGISTRY_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(REGISTRY_CACHE_FILE, "w") as f:
+            json.dump({
+                "atmosphere_version": __version__,
+                "registry_mtime_ns": registry_mtime,
+                "created_at": time.time(),
+                "registry": registry.to_snapshot(),
+            }, f)
+    except OSError:
+        pass
+    
+    return registry
+
+
+def _invalidate_registry_cache() -> None:
+    """Drop the registry snapshot after the registry is modified."""
+    try:
+        REGISTRY_CACHE_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _registry(ctx: click.Context):
+    """Return the registry shared by commands in this invocation."""
+    ctx.ensure_object(dict)
+    if "model_registry" not in ctx.obj:
+        ctx.obj["model_registry"] = _load_registry_cached()
+    return ctx.obj["model_registry"]
+
+
 @click.group()
-def model():
+@click.pass_context
+def model(ctx):
     """Model deployment and management commands."""
-    pass
+    ctx.ensure_object(dict)
 
 
 @model.command('list')
@@ -44,11 +133,23 @@ def model():
 @click.option('--available', is_flag=True, help='Show models available but not local')
 @click.option('--type', '-t', 'model_type', help='Filter by model type')
 @click.option('--capability', '-c', help='Filter by capability')
-def list_models(mesh: bool, available: bool, model_type: str, capability: str):
+@click.option('--limit', default=50, show_default=True, help='Rows per page (0 for all)')
+@click.option('--page', default=0, show_default=True, help='Page to show, starting at 0')
+@click.pass_context
+def list_models(
+    ctx,
+    mesh: bool,
+    available: bool,
+    model_type: str,
+    capability: str,
+    limit: int,
+    page: int,
+):
     """List models."""
+    from rich.table import Table
     
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
+    start, stop = _page_bounds(limit, page)
     
     if mesh:
         # Show all models in mesh
@@ -66,8 +167,8 @@ def list_models(mesh: bool, available: bool, model_type: str, capability: str):
         table.add_column("Nodes")
         table.add_column("First Seen")
         
-        for info in mesh_models:
-            versions = ", ".join(sorted(info.versions.keys(), reverse=True)[:3])
+        for info in mesh_models[start:stop]:
+            versions = ", ".join(heapq.nlargest(3, info.versions))
             if len(info.versions) > 3:
                 versions += f" (+{len(info.versions) - 3})"
             
@@ -76,7 +177,9 @@ def list_models(mesh: bool, available: bool, model_type: str, capability: str):
             
             table.add_row(info.name, versions, str(node_count), first_seen)
         
-        console.print(table)
+        if start < len(mesh_models):
+            console.print(table)
+        _print_page_footer(start, stop, len(mesh_models), page)
     
     elif available:
         # Show models we don't have
@@ -104,30 +207,32 @@ def list_models(mesh: bool, available: bool, model_type: str, capability: str):
     
     else:
         # Show local models
-        local = registry.list_local()
-        
-        if model_type:
-            local = [e for e in local if e.manifest.type == model_type]
-        if capability:
-            local = [e for e in local if capability in e.manifest.capabilities]
-        
-        if not local:
-            console.print("[yellow]No local models.[/yellow]")
-            console.print("[dim]Import from LlamaFarm: atmosphere model import --llamafarm[/dim]")
-            return
-        
-        console.print("\n[bold]Local Models[/bold]\n")
-        
-        table = Table()
-        table.add_column("Name", style="cyan")
-        table.add_column("Version")
-        table.add_column("Type")
-        table.add_column("Size")
-        table.add_column("Capabilities")
-        table.add_column("Loaded", justify="center")
-        
-        for entry in local:
+        def new_table(show_header: bool = True) -> Table:
+            # Columns keep their header width so headerless chunks line up
+            table = Table(show_header=show_header)
+            table.add_column("Name", style="cyan", min_width=4)
+            table.add_column("Version", min_width=7)
+            table.add_column("Type", min_width=4)
+            table.add_column("Size", min_width=4)
+            table.add_column("Capabilities", min_width=12)
+            table.add_column("Loaded", justify="center", min_width=6)
+            return table
+        
+        # Long listings are printed in chunks so output starts before
+        # every row has been laid out
+        table = new_table()
+        flushed = False
+        count = 0
+        total_bytes = 0
+        for entry in registry.iter_local(model_type=model_type, capability=capability):
+            if count == 0:
+                console.print("\n[bold]Local Models[/bold]\n")
+            i = count
+            count += 1
             m = entry.manifest
+            total_bytes += m.size_bytes
+            if not start <= i < stop:
+                continue
             size = _format_size(m.size_bytes)
             caps = ", ".join(m.capabilities[:2])
             if len(m.capabilities) > 2:
@@ -135,24 +240,38 @@ def list_models(mesh: bool, available: bool, model_type: str, capability: str):
             loaded = "[green]✓[/green]" if entry.loaded else "[dim]-[/dim]"
             
             table.add_row(m.name, m.version, m.type, size, caps, loaded)
+            if table.row_count >= TABLE_CHUNK_ROWS:
+                console.print(table)
+                table = new_table(show_header=False)
+                flushed = True
         
-        console.print(table)
-        console.print(f"\n[dim]Total: {len(local)} models, {_format_size(sum(e.manifest.size_bytes for e in local))}[/dim]")
+        if count == 0:
+            console.print("[yellow]No local models.[/yellow]")
+            console.print("[dim]Import from LlamaFarm: atmosphere model import --llamafarm[/dim]")
+            return
+        
+        if start < count and (table.row_count or not flushed):
+            console.print(table)
+        _print_page_footer(start, stop, count, page)
+        console.print(f"\n[dim]Total: {count} models, {_format_size(total_bytes)}[/dim]")
 
 
 @model.command('info')
 @click.argument('name')
 @click.option('--versions', is_flag=True, help='Show all versions')
 @click.option('--nodes', is_flag=True, help='Show which nodes have it')
-def model_info(name: str, versions: bool, nodes: bool):
+@click.pass_context
+def model_info(ctx, name: str, versions: bool, nodes: bool):
     """Show detailed information about a model."""
+    from rich.table import Table
     
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
     
-    # Try local first
-    entry = registry.get_local(name)
+    desc = registry.describe(name)
+    entry = desc.local
+    mesh_info = desc.mesh
     
+    # Prefer the local entry
     if entry:
         console.print(f"\n[bold]Model: {entry.manifest.name}[/bold]\n")
         
@@ -187,8 +306,6 @@ def model_info(name: str, versions: bool, nodes: bool):
     
     else:
         # Check mesh
-        mesh_info = registry.get_mesh_model(name)
-        
         if not mesh_info:
             console.print(f"[red]Model '{name}' not found locally or in mesh.[/red]")
             return
@@ -198,7 +315,6 @@ def model_info(name: str, versions: bool, nodes: bool):
     
     # Show versions if requested
     if versions:
-        mesh_info = registry.get_mesh_model(name)
         if mesh_info and mesh_info.versions:
             console.print("\n[bold]Available Versions:[/bold]")
             for ver, ver_nodes in sorted(mesh_info.versions.items(), reverse=True):
@@ -206,10 +322,10 @@ def model_info(name: str, versions: bool, nodes: bool):
     
     # Show nodes if requested
     if nodes:
-        node_set = registry.find_nodes_with_model(name)
+        node_set = desc.nodes
         if node_set:
             console.print("\n[bold]Available From Nodes:[/bold]")
-            for node in sorted(node_set)[:10]:
+            for node in heapq.nsmallest(10, node_set):
                 console.print(f"  • {node}")
             if len(node_set) > 10:
                 console.print(f"  ... and {len(node_set) - 10} more")
@@ -221,14 +337,18 @@ def model_info(name: str, versions: bool, nodes: bool):
 @click.option('--role', '-r', help='Push to all nodes with this role')
 @click.option('--all', '-a', 'push_all', is_flag=True, help='Push to all capable nodes')
 @click.option('--version', '-v', help='Specific version to push')
-def push_model(name: str, node: Optional[str], role: str, push_all: bool, version: str):
+@click.pass_context
+def push_model(ctx, name: str, node: Optional[str], role: str, push_all: bool, version: str):
     """Push a model to specific node(s)."""
     
     if not node and not role and not push_all:
         console.print("[red]Specify a target: <node>, --role, or --all[/red]")
         return
     
-    registry = ModelRegistry()
+    from .packager import ModelPackager
+    from .distributor import ModelDistributor
+    
+    registry = _registry(ctx)
     packager = ModelPackager()
     distributor = ModelDistributor(
         node_id="local",  # TODO: Get from config
@@ -236,8 +356,6 @@ def push_model(name: str, node: Optional[str], role: str, push_all: bool, versio
         packager=packager
     )
     
-    run_async(registry.load())
-    
     # Find model
     entry = registry.get_local(name, version)
     if not entry:
@@ -265,11 +383,10 @@ def push_model(name: str, node: Optional[str], role: str, push_all: bool, versio
 @click.option('--version', '-v', help='Specific version to pull')
 @click.option('--from', 'from_node', help='Pull from specific node')
 @click.option('--capability', '-c', help='Pull all models with capability')
-def pull_model(name: str, version: str, from_node: str, capability: str):
+@click.pass_context
+def pull_model(ctx, name: str, version: str, from_node: str, capability: str):
     """Pull a model from the mesh."""
-    
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
     
     # Check if we already have it
     if registry.has_local(name, version):
@@ -290,7 +407,7 @@ def pull_model(name: str, version: str, from_node: str, capability: str):
         console.print(f"[red]No nodes have {name}:{target_version}[/red]")
         return
     
-    source = from_node or list(nodes)[0]
+    source = from_node or mesh_info.pick_node(target_version)
     
     console.print(f"\n[bold]Pulling {name}:{target_version} from {source}[/bold]\n")
     
@@ -303,15 +420,15 @@ def pull_model(name: str, version: str, from_node: str, capability: str):
 @click.option('--all', '-a', 'deploy_all', is_flag=True, help='Deploy to all capable nodes')
 @click.option('--role', '-r', help='Deploy to nodes with this role')
 @click.option('--version', '-v', help='Specific version to deploy')
-def deploy_model(name: str, deploy_all: bool, role: str, version: str):
+@click.pass_context
+def deploy_model(ctx, name: str, deploy_all: bool, role: str, version: str):
     """Deploy a model across the mesh."""
     
     if not deploy_all and not role:
         console.print("[red]Specify target: --all or --role[/red]")
         return
     
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
     
     entry = registry.get_local(name, version)
     if not entry:
@@ -331,7 +448,9 @@ def deploy_model(name: str, deploy_all: bool, role: str, version: str):
 @click.option('--capability', '-c', 'capabilities', multiple=True, help='Add capability')
 @click.option('--llamafarm', is_flag=True, help='Import from LlamaFarm models directory')
 @click.option('--llamafarm-type', help='Filter LlamaFarm models by type (anomaly, classifier)')
+@click.pass_context
 def import_model(
+    ctx,
     path: Optional[str],
     name: str,
     model_type: str,
@@ -340,9 +459,10 @@ def import_model(
     llamafarm_type: str
 ):
     """Import a model into the registry."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+    from .registry import LLAMAFARM_MODELS_DIR
     
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
     
     if llamafarm:
         # Scan and import from LlamaFarm
@@ -356,9 +476,9 @@ def import_model(
         
         console.print(f"Found {len(models)} model files:\n")
         
-        for i, model_path in enumerate(models[:20]):
-            rel_path = model_path.relative_to(LLAMAFARM_MODELS_DIR)
-            size = _format_size(model_path.stat().st_size)
+        for i, scanned in enumerate(models[:20]):
+            rel_path = scanned.path.relative_to(LLAMAFARM_MODELS_DIR)
+            size = _format_size(scanned.size_bytes)
             console.print(f"  {i+1}. {rel_path} ({size})")
         
         if len(models) > 20:
@@ -369,7 +489,6 @@ def import_model(
         if not click.confirm("Import all?"):
             return
         
-        imported = 0
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -379,19 +498,21 @@ def import_model(
         ) as progress:
             task = progress.add_task("Importing...", total=len(models))
             
-            for model_path in models:
-                try:
-                    rel_path = model_path.relative_to(LLAMAFARM_MODELS_DIR)
-                    run_async(registry.import_from_llamafarm(
-                        str(rel_path),
-                        capabilities=list(capabilities) if capabilities else None
-                    ))
-                    imported += 1
-                except Exception as e:
-                    console.print(f"[red]Failed: {model_path.name}: {e}[/red]")
-                
-                progress.advance(task)
+            results = run_async(registry.import_from_llamafarm_many(
+                [str(m.path.relative_to(LLAMAFARM_MODELS_DIR)) for m in models],
+                capabilities=list(capabilities) if capabilities else None,
+                known_sizes=[m.size_bytes for m in models],
+                on_progress=lambda done, total: progress.update(task, completed=done),
+            ))
+        
+        imported = 0
+        for scanned, result in zip(models, results):
+            if isinstance(result, Exception):
+                console.print(f"[red]Failed: {scanned.path.name}: {result}[/red]")
+            else:
+                imported += 1
         
+        _invalidate_registry_cache()
         console.print(f"\n[green]Imported {imported} models![/green]")
     
     elif path:
@@ -422,6 +543,8 @@ def import_model(
             
             progress.update(task, description="Done!")
         
+        _invalidate_registry_cache()
+        
         console.print(f"\n[green]✓ Imported as {entry.manifest.id}[/green]")
         console.print(f"  Path: {entry.path}")
         console.print(f"  Size: {_format_size(entry.manifest.size_bytes)}")
@@ -432,11 +555,12 @@ def import_model(
 
 @model.command('status')
 @click.argument('name', required=False)
-def model_status(name: Optional[str]):
+@click.pass_context
+def model_status(ctx, name: Optional[str]):
     """Show deployment status."""
+    from rich.table import Table
     
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
     
     stats = registry.stats()
     
@@ -471,11 +595,10 @@ def model_status(name: Optional[str]):
 @click.option('--version', '-v', help='Specific version to remove')
 @click.option('--delete', is_flag=True, help='Also delete the model file')
 @click.option('--force', '-f', is_flag=True, help='Skip confirmation')
-def remove_model(name: str, version: str, delete: bool, force: bool):
+@click.pass_context
+def remove_model(ctx, name: str, version: str, delete: bool, force: bool):
     """Remove a model from the registry."""
-    
-    registry = ModelRegistry()
-    run_async(registry.load())
+    registry = _registry(ctx)
     
     entry = registry.get_local(name, version)
     if not entry:
@@ -496,6 +619,7 @@ def remove_model(name: str, version: str, delete: bool, force: bool):
     success = run_async(registry.unregister_local(
         name, entry.manifest.version, delete_file=delete
     ))
+    _invalidate_registry_cache()
     
     if success:
         console.print(f"\n[green]✓ Removed {entry.manifest.id}[/green]")
@@ -503,16 +627,43 @@ def remove_model(name: str, version: str, delete: bool, force: bool):
         console.print("[red]Failed to remove model.[/red]")
 
 
+def _page_bounds(limit: int, page: int) -> tuple:
+    """Return the [start, stop) row range for a page; limit <= 0 shows all."""
+    if limit <= 0:
+        return 0, sys.maxsize
+    page = max(page, 0)
+    return page * limit, (page + 1) * limit
+
+
+def _print_page_footer(start: int, stop: int, total: int, page: int) -> None:
+    """Print which rows were shown when a listing is truncated."""
+    if start == 0 and stop >= total:
+        return
+    if start >= total:
+        pages = -(-total // (stop - start))
+        console.print(f"[yellow]Page {page} is past the end ({pages} pages)[/yellow]")
+        return
+    more = f" (use --page {page + 1} for more)" if stop < total else ""
+    console.print(f"\n[dim]Showing {start + 1}-{min(stop, total)} of {total}{more}[/dim]")
+
+
+# (divisor, suffix, precision) indexed by floor(log1024(size))
+_SIZE_UNITS = (
+    (1, "B", 0),
+    (1024, "KB", 1),
+    (1024 ** 2, "MB", 1),
+    (1024 ** 3, "GB", 2),
+)
+
+
+@lru_cache(maxsize=1024)
 def _format_size(size_bytes: int) -> str:
     """Format byte size for display."""
     if size_bytes < 1024:
         return f"{size_bytes} B"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.1f} KB"
-    elif size_bytes < 1024 * 1024 * 1024:
-        return f"{size_bytes / (1024 * 1024):.1f} MB"
-    else:
-        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+    unit = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    divisor, suffix, precision = _SIZE_UNITS[unit]
+    return f"{size_bytes / divisor:.{precision}f} {suffix}"
 
 
 # Function to register with main CLI
@@ -10,18 +10,55 @@ Handles distribution of models across the mesh using various strategies:
 
 import asyncio
 import logging
+import math
+import random
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Callable, Awaitable, Dict, List, Optional, Set
+from typing import Any, Callable, Awaitable, Dict, Iterable, List, Optional, Set, Tuple, Union
 import json
 
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .registry import ModelRegistry, ModelManifest, ModelEntry
 from .packager import ModelPackager, ModelPackage, ModelChunk, TransferSession
 
 logger = logging.getLogger(__name__)
 
+# Default cap on concurrent outbound transfers
+MAX_PARALLEL_PUSHES = 16
+
+# Default number of chunks in flight per chunked transfer
+CHUNK_WINDOW = 8
+
+# Transfer records kept for lookup before the oldest are evicted
+MAX_TRANSFER_HISTORY = 10_000
+
+# Candidate count above which resource checks are vectorized
+VECTORIZE_MIN_NODES = 64
+
+# Weight of a new sample in the smoothed peer RTT
+RTT_SMOOTHING = 0.2
+
+# Hops an advertisement travels; receivers re-advertise while ttl > 1
+ADVERTISEMENT_TTL = 2
+
+
+def _dumps(data: dict) -> bytes:
+    """Serialize a to_dict() payload to JSON bytes, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
 
 class DeploymentStrategy(Enum):
     """Model deployment strategy."""
@@ -40,7 +77,7 @@ class TransferStatus(Enum):
     CANCELLED = "cancelled"
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeCapabilities:
     """
     Capabilities of a node for model deployment decisions.
@@ -59,6 +96,12 @@ class NodeCapabilities:
     max_model_size_mb: int = 100
     max_models: int = 10
     
+    # Interests as a frozenset for hash lookups in wants_model
+    interests_set: frozenset = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.interests_set = frozenset(self.interests)
+    
     def to_dict(self) -> dict:
         return {
             "node_id": self.node_id,
@@ -86,6 +129,10 @@ class NodeCapabilities:
             max_models=data.get("max_models", 10),
         )
     
+    def to_bytes(self) -> bytes:
+        """Serialize to JSON bytes for sending over the mesh."""
+        return _dumps(self.to_dict())
+    
     def can_run_model(self, manifest: ModelManifest) -> bool:
         """Check if this node can run a model."""
         reqs = manifest.node_requirements
@@ -111,59 +158,74 @@ class NodeCapabilities:
     def wants_model(self, manifest: ModelManifest) -> bool:
         """Check if this node wants a model based on role/interests."""
         # Check role match
-        if manifest.roles and self.role not in manifest.roles:
+        if manifest.roles and self.role not in manifest.roles_set:
             return False
         
         # Check capability interests
-        if self.interests:
-            if not any(cap in self.interests for cap in manifest.capabilities):
+        if self.interests_set:
+            if self.interests_set.isdisjoint(manifest.capabilities_set):
                 return False
         
         return True
 
 
-@dataclass
+@dataclass(slots=True)
 class TransferRecord:
     """
     Record of a model transfer.
     """
-    transfer_id: str
+    transfer_id: int  # formatted as "xfer-NNNNNN" only when serialized
     model_name: str
     model_version: str
     from_node: str
     to_node: str
     strategy: DeploymentStrategy
     status: TransferStatus = TransferStatus.PENDING
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
+    # Wall-clock times as integer nanoseconds since the epoch (0 = unset)
+    started_at_ns: int = 0
+    completed_at_ns: int = 0
     error: Optional[str] = None
     bytes_transferred: int = 0
     total_bytes: int = 0
     
     def to_dict(self) -> dict:
         return {
-            "transfer_id": self.transfer_id,
+            "transfer_id": f"xfer-{self.transfer_id:06d}",
             "model_name": self.model_name,
             "model_version": self.model_version,
             "from_node": self.from_node,
             "to_node": self.to_node,
             "strategy": self.strategy.value,
             "status": self.status.value,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "started_at_ns": self.started_at_ns,
+            "completed_at_ns": self.completed_at_ns,
             "error": self.error,
             "bytes_transferred": self.bytes_transferred,
             "total_bytes": self.total_bytes,
         }
     
+    def to_bytes(self) -> bytes:
+        """Serialize to JSON bytes for sending over the mesh."""
+        return _dumps(self.to_dict())
+    
     @property
     def progress(self) -> float:
         if self.total_bytes == 0:
             return 0.0
         return self.bytes_transferred / self.total_bytes
+    
+    @property
+    def started_at(self) -> Optional[datetime]:
+        """Start time as a datetime, built on access."""
+        return datetime.fromtimestamp(self.started_at_ns / 1e9) if self.started_at_ns else None
+    
+    @property
+    def completed_at(self) -> Optional[datetime]:
+        """Completion time as a datetime, built on access."""
+        return datetime.fromtimestamp(self.completed_at_ns / 1e9) if self.completed_at_ns else None
 
 
-@dataclass
+@dataclass(slots=True)
 class DeploymentRule:
     """
     Rule for automatic model deployment.
@@ -174,21 +236,66 @@ class DeploymentRule:
     models: List[Dict[str, Any]] = field(default_factory=list)
     enabled: bool = True
     
+    # Node predicates and model matcher built from conditions and models;
+    # call compile() after changing either in place
+    _predicates: List[Callable[[NodeCapabilities], bool]] = field(
+        init=False, repr=False, compare=False
+    )
+    _match: Callable[..., List[ModelManifest]] = field(
+        init=False, repr=False, compare=False
+    )
+    
+    def __post_init__(self):
+        self.compile()
+    
+    def compile(self) -> None:
+        """Build the node predicates and model matcher for this rule."""
+        predicates = []
+        conditions = self.conditions
+        
+        if "role" in conditions:
+            role = conditions["role"]
+            predicates.append(lambda c: c.role == role)
+        
+        if "min_memory_mb" in conditions:
+            min_memory_mb = conditions["min_memory_mb"]
+            predicates.append(lambda c: c.memory_mb >= min_memory_mb)
+        
+        if "has_gpu" in conditions:
+            has_gpu = conditions["has_gpu"]
+            predicates.append(lambda c: c.has_gpu == has_gpu)
+        
+        self._predicates = predicates
+        
+        # Resolve wildcards once: None means any name / any version
+        specs = []
+        for spec in self.models:
+            name = spec.get("name", "*")
+            version = spec.get("version", "latest")
+            specs.append((
+                None if name == "*" else name,
+                None if version == "latest" else version,
+            ))
+        
+        def match(capabilities, available_models, by_name):
+            can_run = capabilities.can_run_model
+            result = []
+            for name, version in specs:
+                candidates = available_models if name is None else by_name.get(name, ())
+                for model in candidates:
+                    if (version is None or model.version == version) and can_run(model):
+                        result.append(model)
+            return result
+        
+        self._match = match
+    
     def matches_node(self, capabilities: NodeCapabilities) -> bool:
         """Check if a node matches this rule's conditions."""
         if not self.enabled:
             return False
         
-        if "role" in self.conditions:
-            if capabilities.role != self.conditions["role"]:
-                return False
-        
-        if "min_memory_mb" in self.conditions:
-            if capabilities.memory_mb < self.conditions["min_memory_mb"]:
-                return False
-        
-        if "has_gpu" in self.conditions:
-            if capabilities.has_gpu != self.conditions["has_gpu"]:
+        for predicate in self._predicates:
+            if not predicate(capabilities):
                 return False
         
         return True
@@ -196,30 +303,45 @@ class DeploymentRule:
     def get_models_for_node(
         self,
         capabilities: NodeCapabilities,
-        available_models: List[ModelManifest]
+        available_models: List[ModelManifest],
+        by_name: Optional[Dict[str, List[ModelManifest]]] = None
     ) -> List[ModelManifest]:
-        """Get models this rule wants deployed to a node."""
+        """
+        Get models this rule wants deployed to a node.
+        
+        Args:
+            capabilities: Capabilities of the target node
+            available_models: Models that could be deployed
+            by_name: Optional index of available_models by name (see
+                index_models_by_name); built on the fly if omitted
+        
+        Returns:
+            Matching models the node can run
+        """
         if not self.matches_node(capabilities):
             return []
         
-        result = []
-        for spec in self.models:
-            name = spec.get("name", "*")
-            version = spec.get("version", "latest")
-            
-            for model in available_models:
-                if name == "*" or model.name == name:
-                    if version == "latest" or model.version == version:
-                        if capabilities.can_run_model(model):
-                            result.append(model)
+        if by_name is None:
+            by_name = index_models_by_name(available_models)
         
-        return result
+        return self._match(capabilities, available_models, by_name)
+
+
+def index_models_by_name(
+    models: List[ModelManifest]
+) -> Dict[str, List[ModelManifest]]:
+    """Group manifests by model name, preserving their order."""
+    by_name: Dict[str, List[ModelManifest]] = {}
+    for model in models:
+        by_name.setdefault(model.name, []).append(model)
+    return by_name
 
 
 # Callback types
 SendPackageCallback = Callable[[str, ModelPackage], Awaitable[bool]]
 SendChunkCallback = Callable[[str, ModelChunk], Awaitable[bool]]
 RequestModelCallback = Callable[[str, str, str], Awaitable[Optional[ModelPackage]]]
+SendAdvertisementCallback = Callable[[str, dict], Awaitable[bool]]
 
 
 class ModelDistributor:
@@ -254,19 +376,51 @@ class ModelDistributor:
         node_id: str,
         registry: ModelRegistry,
         packager: ModelPackager,
-        models_dir: Path = None
+        models_dir: Path = None,
+        max_parallel_pushes: int = MAX_PARALLEL_PUSHES,
+        chunk_window: int = CHUNK_WINDOW,
     ):
         self.node_id = node_id
         self.registry = registry
         self.packager = packager
         self.models_dir = models_dir or Path.home() / ".atmosphere" / "models"
         
+        # Bounds concurrent transfers during fan-out
+        self._push_semaphore = asyncio.Semaphore(max_parallel_pushes)
+        self.chunk_window = chunk_window
+        
         # Known nodes and their capabilities
         self._node_capabilities: Dict[str, NodeCapabilities] = {}
         
-        # Transfer history
-        self._transfers: Dict[str, TransferRecord] = {}
+        # Inverted indexes of node IDs by role and architecture
+        self._by_role: Dict[str, Set[str]] = {}
+        self._by_arch: Dict[str, Set[str]] = {}
+        
+        # Column arrays of node resources for vectorized filtering:
+        # (node_ids, memory_mb, cpu_cores, has_gpu, max_model_size_mb).
+        # Rebuilt lazily after nodes change.
+        self._node_arrays: Optional[tuple] = None
+        
+        # (model, version) pairs already pushed or advertised to each node
+        self._sent: Dict[str, Set[Tuple[str, str]]] = {}
+        
+        # In-flight pulls by (model, version), shared by duplicate advertisements
+        self._pending_pulls: Dict[Tuple[str, str], asyncio.Task] = {}
+        
+        # Smoothed round-trip time to each peer in ms, used to pick pull sources
+        self._peer_rtt: Dict[str, float] = {}
+        
+        # Cached can_run_model/wants_model results per node, keyed by
+        # (manifest id, checksum); dropped when the node re-registers
+        self._fit_cache: Dict[str, Dict[Tuple[str, str], bool]] = {}
+        
+        # Transfer history, oldest first and bounded by MAX_TRANSFER_HISTORY.
+        # Status counts cover every transfer since startup, while the
+        # status index only covers retained records.
+        self._transfers: "OrderedDict[int, TransferRecord]" = OrderedDict()
         self._transfer_counter = 0
+        self._transfer_counts: Dict[str, int] = {}
+        self._by_status: Dict[TransferStatus, Set[int]] = {}
         
         # Deployment rules
         self._rules: List[DeploymentRule] = []
@@ -275,6 +429,7 @@ class ModelDistributor:
         self._send_package: Optional[SendPackageCallback] = None
         self._send_chunk: Optional[SendChunkCallback] = None
         self._request_model: Optional[RequestModelCallback] = None
+        self._send_advertisement: Optional[SendAdvertisementCallback] = None
         
         # Events
         self.on_transfer_complete: Optional[Callable[[TransferRecord], None]] = None
@@ -292,27 +447,131 @@ class ModelDistributor:
         """Set callback for requesting models from nodes."""
         self._request_model = callback
     
+    def set_advertise_callback(self, callback: SendAdvertisementCallback) -> None:
+        """Set callback for sending model advertisements to nodes."""
+        self._send_advertisement = callback
+    
     # ==================== Node Management ====================
     
     def register_node(self, capabilities: NodeCapabilities) -> None:
         """Register a node and its capabilities."""
-        self._node_capabilities[capabilities.node_id] = capabilities
-        logger.info(f"Registered node {capabilities.node_id} (role={capabilities.role})")
+        node_id = capabilities.node_id
+        previous = self._node_capabilities.get(node_id)
+        if previous is not None:
+            self._unindex_node(previous)
+        
+        self._node_capabilities[node_id] = capabilities
+        self._by_role.setdefault(capabilities.role, set()).add(node_id)
+        self._by_arch.setdefault(capabilities.architecture, set()).add(node_id)
+        self._fit_cache.pop(node_id, None)
+        self._node_arrays = None
+        logger.info(f"Registered node {node_id} (role={capabilities.role})")
     
     def unregister_node(self, node_id: str) -> None:
         """Unregister a node."""
-        self._node_capabilities.pop(node_id, None)
+        capabilities = self._node_capabilities.pop(node_id, None)
+        if capabilities is not None:
+            self._unindex_node(capabilities)
+            self._node_arrays = None
+        self._fit_cache.pop(node_id, None)
+        self._peer_rtt.pop(node_id, None)
+        self._sent.pop(node_id, None)
+    
+    def record_peer_rtt(self, node_id: str, rtt_ms: float) -> None:
+        """
+        Record a round-trip time sample for a peer.
+        
+        Samples are smoothed with an exponential moving average so one
+        slow response does not flip source selection.
+        
+        Args:
+            node_id: Peer the sample was measured against
+            rtt_ms: Measured round-trip time in milliseconds
+        """
+        previous = self._peer_rtt.get(node_id)
+        if previous is None:
+            self._peer_rtt[node_id] = rtt_ms
+        else:
+            self._peer_rtt[node_id] = previous + RTT_SMOOTHING * (rtt_ms - previous)
+    
+    def _pick_source(self, nodes: Set[str]) -> str:
+        """Pick the lowest-RTT node to pull from; unmeasured peers go last."""
+        rtt = self._peer_rtt
+        return min(nodes, key=lambda n: (rtt.get(n, float("inf")), n))
+    
+    def _unindex_node(self, capabilities: NodeCapabilities) -> None:
+        """Remove a node from the role and architecture indexes."""
+        for index, key in (
+            (self._by_role, capabilities.role),
+            (self._by_arch, capabilities.architecture),
+        ):
+            nodes = index.get(key)
+            if nodes is not None:
+                nodes.discard(capabilities.node_id)
+                if not nodes:
+                    del index[key]
     
     def get_node_capabilities(self, node_id: str) -> Optional[NodeCapabilities]:
         """Get capabilities for a node."""
         return self._node_capabilities.get(node_id)
     
-    def find_capable_nodes(self, manifest: ModelManifest) -> List[str]:
+    def find_capable_nodes(self, manifest: ModelManifest) -> Set[str]:
         """Find nodes capable of running a model."""
-        return [
-            node_id for node_id, caps in self._node_capabilities.items()
-            if caps.can_run_model(manifest) and caps.wants_model(manifest)
-        ]
+        candidates = self._candidate_nodes(manifest)
+        if len(candidates) > VECTORIZE_MIN_NODES:
+            candidates &= self._nodes_with_resources(manifest)
+        
+        return {
+            node_id for node_id in candidates
+            if self._node_fits(self._node_capabilities[node_id], manifest)
+        }
+    
+    def _nodes_with_resources(self, manifest: ModelManifest) -> Set[str]:
+        """Nodes meeting a model's resource requirements, checked in bulk."""
+        if self._node_arrays is None:
+            nodes = list(self._node_capabilities.values())
+            self._node_arrays = (
+                [c.node_id for c in nodes],
+                np.array([c.memory_mb for c in nodes], dtype=np.int64),
+                np.array([c.cpu_cores for c in nodes], dtype=np.int32),
+                np.array([c.has_gpu for c in nodes], dtype=bool),
+                np.array([c.max_model_size_mb for c in nodes], dtype=np.float64),
+            )
+        
+        node_ids, memory_mb, cpu_cores, has_gpu, max_size_mb = self._node_arrays
+        reqs = manifest.node_requirements
+        
+        mask = (memory_mb >= reqs.min_memory_mb) & (cpu_cores >= reqs.min_cpu_cores)
+        mask &= max_size_mb >= manifest.size_bytes / (1024 * 1024)
+        if reqs.gpu_required:
+            mask &= has_gpu
+        
+        return {node_ids[i] for i in np.flatnonzero(mask)}
+    
+    def _candidate_nodes(self, manifest: ModelManifest) -> Set[str]:
+        """Nodes whose architecture, and role if restricted, suit a model."""
+        candidates = set().union(*(
+            self._by_arch.get(arch, ()) for arch in manifest.node_requirements.architectures
+        ))
+        if manifest.roles:
+            candidates &= set().union(*(
+                self._by_role.get(role, ()) for role in manifest.roles
+            ))
+        return candidates
+    
+    def _node_fits(self, caps: NodeCapabilities, manifest: ModelManifest) -> bool:
+        """Check can_run_model and wants_model, caching the result."""
+        if self._node_capabilities.get(caps.node_id) is not caps:
+            # Only results for registered capabilities are cached
+            return caps.can_run_model(manifest) and caps.wants_model(manifest)
+        
+        node_cache = self._fit_cache.setdefault(caps.node_id, {})
+        key = (manifest.id, manifest.checksum_sha256)
+        fits = node_cache.get(key)
+        if fits is None:
+            fits = caps.can_run_model(manifest) and caps.wants_model(manifest)
+            node_cache[key] = fits
+        return fits
     
     def find_nodes_with_model(self, name: str, version: str = None) -> Set[str]:
         """Find nodes that have a specific model."""
@@ -344,32 +603,86 @@ class ModelDistributor:
         if not entry:
             raise ValueError(f"Model {model_name}:{version} not found locally")
         
+        return await self._push_prepared(entry, target_node, chunked)
+    
+    def _is_chunked(self, entry: ModelEntry, chunked: bool = True) -> bool:
+        """Whether a push of this model goes out as chunks."""
+        return chunked and entry.manifest.size_bytes > self.packager.chunk_size
+    
+    async def _prepare(self, entry: ModelEntry) -> Optional[ModelPackage]:
+        """
+        Do the per-model work of a push once so several pushes can share it.
+        
+        Small models are packaged once and the package is shared. Chunked
+        models are only compressed into the packager's prepared cache;
+        each push then streams its own chunks from it, so the fan-out
+        never holds every chunk of the model in memory.
+        """
+        if self._is_chunked(entry):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, self.packager.prepare_chunks, entry.manifest, entry.path
+            )
+            return None
+        return await self.packager.package(entry.manifest, entry.path)
+    
+    async def _push_prepared(
+        self,
+        entry: ModelEntry,
+        target_node: str,
+        chunked: bool = True,
+        prepared: Optional[ModelPackage] = None,
+        record: Optional[TransferRecord] = None
+    ) -> TransferRecord:
+        """
+        Push a local model entry to a node.
+        
+        Args:
+            entry: Local model to push
+            target_node: Target node ID
+            chunked: Use chunked transfer for large models
+            prepared: Package from _prepare to send instead of packaging
+                the model again (unused for chunked pushes)
+            record: Pending record to track the push in (created if omitted)
+        
+        Returns:
+            TransferRecord tracking the transfer
+        """
+        model_name = entry.manifest.name
+        version = entry.manifest.version
+        
         # Create transfer record
-        record = self._create_transfer(
-            model_name, version, self.node_id, target_node,
-            DeploymentStrategy.PUSH
-        )
+        if record is None:
+            record = self._create_transfer(
+                model_name, version, self.node_id, target_node,
+                DeploymentStrategy.PUSH
+            )
         record.total_bytes = entry.manifest.size_bytes
-        record.status = TransferStatus.IN_PROGRESS
-        record.started_at = datetime.now()
+        self._set_status(record, TransferStatus.IN_PROGRESS)
+        record.started_at_ns = time.time_ns()
         
         try:
-            if chunked and entry.manifest.size_bytes > self.packager.chunk_size:
+            if self._is_chunked(entry, chunked):
                 # Chunked transfer
                 await self._push_chunked(entry, target_node, record)
             else:
                 # Single package transfer
-                await self._push_package(entry, target_node, record)
+                await self._push_package(entry, target_node, record, prepared)
             
-            record.status = TransferStatus.COMPLETED
-            record.completed_at = datetime.now()
+            self._set_status(record, TransferStatus.COMPLETED)
+            record.completed_at_ns = time.time_ns()
+            self._sent.setdefault(target_node, set()).add((model_name, version))
             logger.info(f"Push completed: {model_name}:{version} -> {target_node}")
             
             if self.on_transfer_complete:
                 self.on_transfer_complete(record)
             
+        except asyncio.CancelledError:
+            self._set_status(record, TransferStatus.CANCELLED)
+            raise
+        
         except Exception as e:
-            record.status = TransferStatus.FAILED
+            self._set_status(record, TransferStatus.FAILED)
             record.error = str(e)
             logger.error(f"Push failed: {e}")
             
@@ -382,13 +695,15 @@ class ModelDistributor:
         self,
         entry: ModelEntry,
         target_node: str,
-        record: TransferRecord
+        record: TransferRecord,
+        package: Optional[ModelPackage] = None
     ) -> None:
-        """Push model as single package."""
+        """Push model as single package, packaging it unless one is given."""
         if not self._send_package:
             raise RuntimeError("Send callback not configured")
         
-        package = await self.packager.package(entry.manifest, entry.path)
+        if package is None:
+            package = await self.packager.package(entry.manifest, entry.path)
         success = await self._send_package(target_node, package)
         
         if not success:
@@ -402,41 +717,63 @@ class ModelDistributor:
         target_node: str,
         record: TransferRecord
     ) -> None:
-        """Push model as chunks."""
+        """
+        Push model as chunks, streaming them from disk.
+        
+        Up to chunk_window chunks are in flight at once so the transfer
+        is not bound by one round trip per chunk. The first failed send
+        aborts the transfer and cancels the chunks still in flight.
+        """
         if not self._send_chunk:
             raise RuntimeError("Chunk callback not configured")
         
-        chunks = self.packager.create_chunks(entry.manifest, entry.path)
+        source = self.packager.stream_chunks(entry.manifest, entry.path)
+        window = asyncio.Semaphore(self.chunk_window)
+        in_flight: Set[asyncio.Future] = set()
         
-        for chunk in chunks:
-            success = await self._send_chunk(target_node, chunk)
-            if not success:
-                raise RuntimeError(f"Failed to send chunk {chunk.chunk_index}")
-            record.bytes_transferred += len(chunk.data)
+        async def send_one(chunk: ModelChunk) -> None:
+            try:
+                success = await self._send_chunk(target_node, chunk)
+                if not success:
+                    raise RuntimeError(f"Failed to send chunk {chunk.chunk_index}")
+                record.bytes_transferred += len(chunk.data)
+            finally:
+                window.release()
+        
+        try:
+            async for chunk in source:
+                await window.acquire()
+                
+                # Surface any failure before sending more
+                for task in [t for t in in_flight if t.done()]:
+                    in_flight.discard(task)
+                    task.result()
+                
+                in_flight.add(asyncio.ensure_future(send_one(chunk)))
+            
+            await asyncio.gather(*in_flight)
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await source.aclose()
     
     async def push_to_role(
         self,
         model_name: str,
         version: str,
-        role: str
+        role: str,
+        fail_fast: bool = False
     ) -> List[TransferRecord]:
         """Push model to all nodes with a specific role."""
-        targets = [
-            node_id for node_id, caps in self._node_capabilities.items()
-            if caps.role == role
-        ]
-        
-        records = []
-        for target in targets:
-            record = await self.push(model_name, version, target)
-            records.append(record)
+        targets = self._by_role.get(role, ())
         
-        return records
+        return await self._push_many(model_name, version, targets, fail_fast)
     
     async def push_to_all(
         self,
         model_name: str,
-        version: str
+        version: str,
+        fail_fast: bool = False
     ) -> List[TransferRecord]:
         """Push model to all capable nodes."""
         entry = self.registry.get_local(model_name, version)
@@ -444,12 +781,75 @@ class ModelDistributor:
             raise ValueError(f"Model {model_name}:{version} not found locally")
         
         targets = self.find_capable_nodes(entry.manifest)
-        targets = [t for t in targets if t != self.node_id]
+        targets.discard(self.node_id)
         
-        records = []
-        for target in targets:
-            record = await self.push(model_name, version, target)
-            records.append(record)
+        return await self._push_many(model_name, version, targets, fail_fast)
+    
+    async def _push_many(
+        self,
+        model_name: str,
+        version: str,
+        targets: Iterable[str],
+        fail_fast: bool = False
+    ) -> List[TransferRecord]:
+        """
+        Push a model to several nodes concurrently.
+        
+        At most max_parallel_pushes transfers run at once. The model is
+        packaged (or chunked) once and shared by every target. Each target
+        gets a record up front; with fail_fast, the first failed push
+        cancels the rest and their records end up CANCELLED.
+        """
+        entry = self.registry.get_local(model_name, version)
+        if not entry:
+            raise ValueError(f"Model {model_name}:{version} not found locally")
+        
+        records = [
+            self._create_transfer(
+                model_name, version, self.node_id, target,
+                DeploymentStrategy.PUSH
+            )
+            for target in targets
+        ]
+        
+        prepared = None
+        if len(records) > 1:
+            try:
+                prepared = await self._prepare(entry)
+            except Exception as e:
+                # Each push will retry and record its own failure
+                logger.warning(f"Failed to prepare {model_name}:{version}: {e}")
+        
+        async def bounded_push(record: TransferRecord) -> TransferRecord:
+            async with self._push_semaphore:
+                return await self._push_prepared(
+                    entry, record.to_node, prepared=prepared, record=record
+                )
+        
+        tasks = [asyncio.ensure_future(bounded_push(r)) for r in records]
+        
+        if fail_fast:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    record = await next_done
+                    failed = record.status == TransferStatus.FAILED
+                except Exception:
+                    failed = True
+                if failed:
+                    for task in tasks:
+                        task.cancel()
+                    break
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for record, result in zip(records, results):
+            if record.status in (TransferStatus.PENDING, TransferStatus.IN_PROGRESS):
+                if isinstance(result, asyncio.CancelledError):
+                    self._set_status(record, TransferStatus.CANCELLED)
+                else:
+                    logger.error(f"Failed to push {model_name}:{version} to {record.to_node}: {result}")
+                    self._set_status(record, TransferStatus.FAILED)
+                    record.error = str(result)
         
         return records
     
@@ -480,7 +880,7 @@ class ModelDistributor:
             nodes = self.find_nodes_with_model(model_name, version)
             if not nodes:
                 raise ValueError(f"No nodes have model {model_name}")
-            from_node = list(nodes)[0]  # TODO: Select nearest/best
+            from_node = self._pick_source(nodes)
         
         # Determine version
         if version is None:
@@ -496,8 +896,8 @@ class ModelDistributor:
             model_name, version, from_node, self.node_id,
             DeploymentStrategy.PULL
         )
-        record.status = TransferStatus.IN_PROGRESS
-        record.started_at = datetime.now()
+        self._set_status(record, TransferStatus.IN_PROGRESS)
+        record.started_at_ns = time.time_ns()
         
         try:
             # Request model
@@ -514,15 +914,15 @@ class ModelDistributor:
                 package.manifest, model_path, source_node=from_node
             )
             
-            record.status = TransferStatus.COMPLETED
-            record.completed_at = datetime.now()
+            self._set_status(record, TransferStatus.COMPLETED)
+            record.completed_at_ns = time.time_ns()
             logger.info(f"Pull completed: {model_name}:{version} from {from_node}")
             
             if self.on_transfer_complete:
                 self.on_transfer_complete(record)
             
         except Exception as e:
-            record.status = TransferStatus.FAILED
+            self._set_status(record, TransferStatus.FAILED)
             record.error = str(e)
             logger.error(f"Pull failed: {e}")
             
@@ -536,20 +936,30 @@ class ModelDistributor:
         capability: str
     ) -> List[TransferRecord]:
         """Pull all models with a specific capability."""
-        mesh_models = self.registry.list_mesh()
-        records = []
+        # Check if any version has this capability (would need manifest)
+        # For now, pull and check
+        names = [
+            info.name for info in self.registry.list_mesh()
+            if not self.registry.has_local(info.name)
+        ]
         
-        for info in mesh_models:
-            # Check if any version has this capability (would need manifest)
-            # For now, pull and check
-            if not self.registry.has_local(info.name):
-                try:
-                    record = await self.pull(info.name)
-                    entry = self.registry.get_local(info.name)
-                    if entry and capability in entry.manifest.capabilities:
-                        records.append(record)
-                except Exception as e:
-                    logger.warning(f"Failed to pull {info.name}: {e}")
+        async def bounded_pull(name: str) -> TransferRecord:
+            async with self._push_semaphore:
+                return await self.pull(name)
+        
+        results = await asyncio.gather(
+            *(bounded_pull(n) for n in names),
+            return_exceptions=True,
+        )
+        
+        records = []
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to pull {name}: {result}")
+                continue
+            entry = self.registry.get_local(name)
+            if entry and capability in entry.manifest.capabilities_set:
+                records.append(result)
         
         return records
     
@@ -557,6 +967,7 @@ class ModelDistributor:
     
     def add_deployment_rule(self, rule: DeploymentRule) -> None:
         """Add an automatic deployment rule."""
+        rule.compile()
         self._rules.append(rule)
     
     def remove_deployment_rule(self, name: str) -> bool:
@@ -586,15 +997,16 @@ class ModelDistributor:
         local_models = [e.manifest for e in self.registry.list_local()]
         
         # Find models to deploy based on rules
+        by_name = index_models_by_name(local_models)
         models_to_deploy = []
         for rule in self._rules:
             if rule.trigger == "node_join":
-                models = rule.get_models_for_node(capabilities, local_models)
+                models = rule.get_models_for_node(capabilities, local_models, by_name)
                 models_to_deploy.extend(models)
         
         # Also check model-level deployment specs
         for model in local_models:
-            if capabilities.wants_model(model) and capabilities.can_run_model(model):
+            if self._node_fits(capabilities, model):
                 if model not in models_to_deploy:
                     models_to_deploy.append(model)
         
@@ -620,7 +1032,8 @@ class ModelDistributor:
         version: str = None,
         strategy: DeploymentStrategy = DeploymentStrategy.ORGANIC,
         target_nodes: List[str] = None,
-        target_role: str = None
+        target_role: str = None,
+        fail_fast: bool = False
     ) -> List[TransferRecord]:
         """
         Deploy a model using the specified strategy.
@@ -631,9 +1044,11 @@ class ModelDistributor:
             strategy: Deployment strategy
             target_nodes: Specific nodes (for PUSH strategy)
             target_role: Target role (for PUSH strategy)
+            fail_fast: Cancel remaining pushes after the first failure
         
         Returns:
-            List of transfers initiated
+            List of transfers initiated (empty when ORGANIC deployment
+            advertises instead of pushing)
         """
         # Get model
         entry = self.registry.get_local(model_name, version)
@@ -645,36 +1060,164 @@ class ModelDistributor:
         
         if strategy == DeploymentStrategy.PUSH:
             if target_nodes:
-                records = []
-                for node in target_nodes:
-                    records.append(await self.push(model_name, version, node))
-                return records
+                return await self._push_many(model_name, version, target_nodes, fail_fast)
             elif target_role:
-                return await self.push_to_role(model_name, version, target_role)
+                return await self.push_to_role(model_name, version, target_role, fail_fast)
             else:
-                return await self.push_to_all(model_name, version)
+                return await self.push_to_all(model_name, version, fail_fast)
         
         elif strategy == DeploymentStrategy.ORGANIC:
             # Find all capable nodes we know about
             targets = self.find_capable_nodes(entry.manifest)
-            targets = [t for t in targets if t != self.node_id]
+            targets.discard(self.node_id)
             
-            # Don't push to nodes that already have it
-            existing = self.find_nodes_with_model(model_name, version)
-            targets = [t for t in targets if t not in existing]
+            # Don't push to nodes that already have it or were already sent it
+            targets -= self.find_nodes_with_model(model_name, version)
+            key = (model_name, version)
+            targets = {t for t in targets if key not in self._sent.get(t, ())}
             
-            records = []
-            for target in targets:
-                try:
-                    records.append(await self.push(model_name, version, target))
-                except Exception as e:
-                    logger.error(f"Failed to deploy to {target}: {e}")
+            # Prefer gossip when a transport for it is configured; the
+            # resulting pulls are tracked on the receiving nodes
+            if self._send_advertisement:
+                await self.advertise(model_name, version, targets)
+                return []
             
-            return records
+            return await self._push_many(model_name, version, targets, fail_fast)
         
         else:
             raise ValueError(f"Unsupported strategy for deploy: {strategy}")
     
+    # ==================== Gossip (Advertise / Pull) ====================
+    
+    async def advertise(
+        self,
+        model_name: str,
+        version: str = None,
+        targets: Iterable[str] = None,
+        ttl: int = ADVERTISEMENT_TTL
+    ) -> List[str]:
+        """
+        Advertise a local model to a random sqrt(N) sample of targets.
+        
+        The advertisement is a small dict naming the model and a target
+        list. The rest of the targets are split into disjoint shares, one
+        per sampled node, and each receiver pulls the model and
+        re-advertises to its own share, so the origin sends the model
+        roughly sqrt(N) times instead of N and no node is advertised to
+        twice. On the last hop (ttl of 1) every target is sent to.
+        
+        Args:
+            model_name: Local model to advertise
+            version: Model version (or None for latest)
+            targets: Nodes that should end up with the model (defaults to
+                all capable nodes)
+            ttl: Hops left, including this one
+        
+        Returns:
+            Node IDs that accepted the advertisement
+        """
+        if not self._send_advertisement:
+            raise RuntimeError("Advertisement callback not configured")
+        
+        entry = self.registry.get_local(model_name, version)
+        if not entry:
+            raise ValueError(f"Model {model_name}:{version} not found locally")
+        
+        if targets is None:
+            targets = self.find_capable_nodes(entry.manifest)
+        targets = set(targets)
+        targets.discard(self.node_id)
+        if not targets:
+            return []
+        
+        ad = {
+            "model": model_name,
+            "version": entry.manifest.version,
+            "size_bytes": entry.manifest.size_bytes,
+            "checksum": entry.manifest.checksum_sha256,
+            "ttl": ttl,
+        }
+        ordered = sorted(targets)
+        count = len(ordered) if ttl <= 1 else math.ceil(math.sqrt(len(ordered)))
+        fanout = random.sample(ordered, count)
+        sampled = set(fanout)
+        rest = [n for n in ordered if n not in sampled]
+        
+        async def bounded_send(i: int, node_id: str) -> bool:
+            share = [node_id, *rest[i::len(fanout)]]
+            async with self._push_semaphore:
+                return await self._send_advertisement(node_id, {**ad, "targets": share})
+        
+        results = await asyncio.gather(
+            *(bounded_send(i, n) for i, n in enumerate(fanout)),
+            return_exceptions=True,
+        )
+        
+        sent = []
+        key = (model_name, ad["version"])
+        for node_id, result in zip(fanout, results):
+            if result is True:
+                sent.append(node_id)
+                self._sent.setdefault(node_id, set()).add(key)
+            else:
+                logger.warning(f"Failed to advertise {model_name} to {node_id}: {result}")
+        
+        return sent
+    
+    async def receive_advertisement(
+        self,
+        ad: dict,
+        from_node: str
+    ) -> Optional[TransferRecord]:
+        """
+        Handle a model advertisement from a peer.
+        
+        Pulls the model if this node is a target and lacks it, then
+        re-advertises to the rest of its share of the targets while the
+        TTL allows. Advertisements for a model already being pulled wait
+        for that pull instead of starting another.
+        
+        Args:
+            ad: Advertisement built by advertise()
+            from_node: Node that sent it (and has the model)
+        
+        Returns:
+            TransferRecord for the pull, or None if nothing was pulled
+        """
+        name = ad["model"]
+        version = ad["version"]
+        self.registry.update_mesh_model(name, version, from_node)
+        
+        targets = ad.get("targets")
+        if targets is not None and self.node_id not in targets:
+            return None
+        record = None
+        if not self.registry.has_local(name, version):
+            record = await self._pull_once(name, version)
+            if record.status != TransferStatus.COMPLETED:
+                return record
+        
+        # Pass the share on even if the model was already here
+        ttl = ad.get("ttl", 1)
+        if ttl > 1 and targets:
+            remaining = set(targets) - {self.node_id, from_node}
+            if remaining and self._send_advertisement:
+                await self.advertise(name, version, remaining, ttl=ttl - 1)
+        
+        return record
+    
+    async def _pull_once(self, model_name: str, version: str) -> TransferRecord:
+        """Pull a model, sharing one in-flight pull between concurrent callers."""
+        key = (model_name, version)
+        task = self._pending_pulls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.pull(model_name, version))
+            self._pending_pulls[key] = task
+            task.add_done_callback(lambda _: self._pending_pulls.pop(key, None))
+        
+        # Shield so one caller being cancelled does not cancel the others
+        return await asyncio.shield(task)
+    
     # ==================== Receive Handling ====================
     
     async def receive_package(
@@ -715,7 +1258,8 @@ class ModelDistributor:
         Args:
             chunk: Received chunk
             from_node: Node that sent it
-            manifest: Model manifest (required for first chunk)
+            manifest: Model manifest (required if the first chunk to
+                arrive isn't chunk 0, which carries the model header)
         
         Returns:
             ModelEntry if transfer is complete, None otherwise
@@ -724,16 +1268,34 @@ class ModelDistributor:
         session = self.packager.get_session(chunk.model_name, chunk.model_version)
         
         if session is None:
+            if manifest is None and chunk.header is not None:
+                manifest = chunk.header.manifest
             if manifest is None:
                 logger.warning(f"Received chunk without session or manifest")
                 return None
             
-            session = self.packager.start_transfer(
-                chunk.model_name,
-                chunk.model_version,
-                chunk.total_chunks,
-                manifest=manifest
-            )
+            # Older peers don't send their chunk size; any chunk but the
+            # last of a multi-chunk transfer is exactly that long
+            chunk_size = chunk.chunk_size
+            if chunk_size is None and (
+                chunk.total_chunks == 1 or chunk.chunk_index < chunk.total_chunks - 1
+            ):
+                chunk_size = len(chunk.data)
+            try:
+                session = self.packager.start_transfer(
+                    chunk.model_name,
+                    chunk.model_version,
+                    chunk.total_chunks,
+                    manifest=manifest,
+                    chunk_size=chunk_size,
+                    spool_dir=self.models_dir,
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(
+                    f"Rejected transfer of {chunk.model_name}:{chunk.model_version} "
+                    f"from {from_node}: {e}"
+                )
+                return None
         
         # Add chunk
         complete = self.packager.receive_chunk(session, chunk)
@@ -764,7 +1326,7 @@ class ModelDistributor:
     ) -> TransferRecord:
         """Create a new transfer record."""
         self._transfer_counter += 1
-        transfer_id = f"xfer-{self._transfer_counter:06d}"
+        transfer_id = self._transfer_counter
         
         record = TransferRecord(
             transfer_id=transfer_id,
@@ -776,10 +1338,44 @@ class ModelDistributor:
         )
         
         self._transfers[transfer_id] = record
+        self._count_status(record.status, 1)
+        self._by_status.setdefault(record.status, set()).add(transfer_id)
+        
+        while len(self._transfers) > MAX_TRANSFER_HISTORY:
+            _, evicted = self._transfers.popitem(last=False)
+            self._by_status[evicted.status].discard(evicted.transfer_id)
+        
         return record
     
-    def get_transfer(self, transfer_id: str) -> Optional[TransferRecord]:
-        """Get a transfer record."""
+    def _set_status(self, record: TransferRecord, status: TransferStatus) -> None:
+        """Move a transfer to a new status, keeping counts and index in step."""
+        old_status = record.status
+        if status == old_status:
+            return
+        
+        record.status = status
+        self._count_status(old_status, -1)
+        self._count_status(status, 1)
+        
+        if record.transfer_id in self._transfers:
+            self._by_status[old_status].discard(record.transfer_id)
+            self._by_status.setdefault(status, set()).add(record.transfer_id)
+    
+    def _count_status(self, status: TransferStatus, delta: int) -> None:
+        """Adjust the running count for a status."""
+        count = self._transfer_counts.get(status.value, 0) + delta
+        if count:
+            self._transfer_counts[status.value] = count
+        else:
+            self._transfer_counts.pop(status.value, None)
+    
+    def get_transfer(self, transfer_id: Union[int, str]) -> Optional[TransferRecord]:
+        """Get a transfer record by ID, as an int or its "xfer-NNNNNN" form."""
+        if isinstance(transfer_id, str):
+            try:
+                transfer_id = int(transfer_id.removeprefix("xfer-"))
+            except ValueError:
+                return None
         return self._transfers.get(transfer_id)
     
     def list_transfers(
@@ -787,11 +1383,13 @@ class ModelDistributor:
         status: TransferStatus = None,
         model_name: str = None
     ) -> List[TransferRecord]:
-        """List transfer records with optional filters."""
-        records = list(self._transfers.values())
-        
+        """List retained transfer records with optional filters, oldest first."""
         if status:
-            records = [r for r in records if r.status == status]
+            # IDs count up, so sorting them gives creation order
+            records = [self._transfers[i] for i in sorted(self._by_status.get(status, ()))]
+        else:
+            records = list(self._transfers.values())
+        
         if model_name:
             records = [r for r in records if r.model_name == model_name]
         
@@ -801,17 +1399,10 @@ class ModelDistributor:
     
     def stats(self) -> dict:
         """Get distributor statistics."""
-        transfers = list(self._transfers.values())
-        
-        by_status = {}
-        for t in transfers:
-            s = t.status.value
-            by_status[s] = by_status.get(s, 0) + 1
-        
         return {
             "known_nodes": len(self._node_capabilities),
             "deployment_rules": len(self._rules),
-            "total_transfers": len(transfers),
-            "transfers_by_status": by_status,
+            "total_transfers": self._transfer_counter,
+            "transfers_by_status": dict(self._transfer_counts),
             "active_sessions": len(self.packager.active_sessions()),
         }
@@ -20,24 +20,153 @@ Design Goals:
 """
 
 import asyncio
+import base64
+import gzip
+import hashlib
 import json
 import logging
+import os
+import random
+import sys
 import time
-import uuid
-from dataclasses import dataclass, field
+import zlib
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from typing import Any, Callable, Awaitable, Dict, List, Optional, Set
+from typing import Any, Callable, Awaitable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
 from datetime import datetime
 
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ormsgpack
+    ORMSGPACK_AVAILABLE = True
+except ImportError:
+    ORMSGPACK_AVAILABLE = False
+
 from .registry import ModelRegistry, ModelManifest, ModelEntry
 
 logger = logging.getLogger(__name__)
 
 # Protocol constants
 MODEL_ANNOUNCE_INTERVAL_SEC = 60
+ANNOUNCE_JITTER = 0.1  # +/- fraction of the interval, desynchronizes nodes
+ANNOUNCE_REFRESH_INTERVALS = 10  # Re-announce unchanged models every N intervals
 ROUTE_UPDATE_TTL = 10  # Hops before route update dies
 NONCE_CACHE_TTL_SEC = 300
+NONCE_CACHE_MAX = 1_000_000  # Beyond this, new messages are rejected, not evicted
+NONCE_PER_PEER_MAX = 100_000  # Nonces one peer may hold in the cache at once
+NONCE_BUCKET_SEC = 60  # Timestamp span of one nonce cache bucket
 SYNC_TIMEOUT_SEC = 10
+FORWARD_QUEUE_SIZE = 1024  # Forwards waiting for fan-out before back-pressure
+FORWARD_WORKERS = 4
+REQUEST_COALESCE_SEC = 5  # Identical model requests within this window share one broadcast
+WIRE_COMPRESSION_THRESHOLD = 4096  # Gzip larger sync/announcement payloads
+WIRE_COMPRESSION_LEVEL = 3
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_GOSSIP_MESSAGE_SIZE = 16 * 1024 * 1024  # Received payloads inflating past this are dropped
+
+
+class WireFormat(Enum):
+    """Encoding used for outgoing gossip messages."""
+    JSON = "json"
+    MSGPACK = "msgpack"  # Requires ormsgpack (atmosphere-mesh[speedups])
+
+
+def _dumps(data: dict, wire_format: WireFormat = WireFormat.JSON) -> bytes:
+    """Encode a message dict for the wire, using orjson when installed."""
+    if wire_format is WireFormat.MSGPACK:
+        return ormsgpack.packb(data, option=ormsgpack.OPT_SERIALIZE_NUMPY)
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data).encode()
+
+
+def _loads(data: bytes) -> dict:
+    """
+    Decode a message dict received from the wire.
+    
+    The format is detected per message from the first byte: every
+    message is a map, and msgpack map headers (0x80-0x8f, 0xde, 0xdf)
+    are never valid as the first byte of JSON text.
+    """
+    if isinstance(data, (bytes, bytearray)) and data and (
+        0x80 <= data[0] <= 0x8f or data[0] in (0xde, 0xdf)
+    ):
+        if not ORMSGPACK_AVAILABLE:
+            raise ValueError("msgpack message received but ormsgpack is not installed")
+        return ormsgpack.unpackb(data)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _new_nonce() -> str:
+    """16 hex chars of randomness, without building a UUID object."""
+    return os.urandom(8).hex()
+
+
+def _compress(data: bytes) -> bytes:
+    """
+    Gzip a large payload for the wire.
+    
+    Small payloads, and those that do not shrink, are returned unchanged.
+    Receivers tell the two apart by the gzip magic, since JSON never
+    starts with it.
+    """
+    if len(data) <= WIRE_COMPRESSION_THRESHOLD:
+        return data
+    compressed = gzip.compress(data, compresslevel=WIRE_COMPRESSION_LEVEL)
+    return compressed if len(compressed) < len(data) else data
+
+
+def _decompress(data: bytes) -> bytes:
+    """
+    Undo _compress on received bytes.
+    
+    Output is capped at MAX_GOSSIP_MESSAGE_SIZE so a small gzip bomb
+    from a peer can't exhaust memory.
+    
+    Raises:
+        ValueError: If the payload inflates past the cap or is not a
+            single complete gzip stream
+    """
+    if data[:2] != GZIP_MAGIC:
+        return data
+    dobj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = dobj.decompress(data, MAX_GOSSIP_MESSAGE_SIZE)
+    if dobj.unconsumed_tail or len(out) >= MAX_GOSSIP_MESSAGE_SIZE:
+        raise ValueError(f"Compressed message inflates past {MAX_GOSSIP_MESSAGE_SIZE} bytes")
+    if not dobj.eof or dobj.unused_data:
+        raise ValueError("Compressed message is not a single complete gzip stream")
+    return out
+
+
+def _encode_embedding(embedding: np.ndarray) -> str:
+    """Encode a float32 embedding as base64 of its raw bytes."""
+    return base64.b64encode(embedding.tobytes()).decode("ascii")
+
+
+def _decode_embedding(value: Any, dim: Optional[int] = None) -> np.ndarray:
+    """
+    Decode an embedding from the wire.
+    
+    Accepts the base64 form written by ModelRoute.to_dict as well as a
+    plain list of floats from older peers.
+    """
+    if isinstance(value, str):
+        embedding = np.frombuffer(base64.b64decode(value), dtype=np.float32)
+    else:
+        embedding = np.asarray(value or [], dtype=np.float32)
+    
+    if dim is not None and embedding.size != dim:
+        raise ValueError(f"Embedding has {embedding.size} values, expected {dim}")
+    return embedding
 
 
 class MessageType(Enum):
@@ -67,21 +196,35 @@ class ModelRoute:
     project: str  # e.g., "default/llama-expert-14" or model name
     version: str
     model_type: str
-    embedding: List[float]  # Pre-computed for fast semantic matching
-    nodes: List[str]  # Which nodes have this model
+    embedding: np.ndarray  # float32, pre-computed for fast semantic matching
+    nodes: FrozenSet[str]  # Which nodes have this model
     capabilities: List[str]
     size_bytes: int
     checksum: str
     metadata: Dict[str, Any] = field(default_factory=dict)
     updated_at: float = field(default_factory=time.time)
     
+    def __post_init__(self):
+        # Accept lists from callers; store as float32 (4 bytes per value)
+        self.embedding = np.asarray(self.embedding, dtype=np.float32)
+        
+        # Node ids and capabilities repeat across every route; interning
+        # shares one string object per value and makes equality checks in
+        # the index sets an identity comparison. Frozensets are already
+        # interned (they only come from other routes or add_node_to_route).
+        self.project = sys.intern(self.project)
+        if not isinstance(self.nodes, frozenset):
+            self.nodes = frozenset(map(sys.intern, self.nodes))
+        self.capabilities = [sys.intern(c) for c in self.capabilities]
+    
     def to_dict(self) -> dict:
         return {
             "project": self.project,
             "version": self.version,
             "model_type": self.model_type,
-            "embedding": self.embedding,
-            "nodes": self.nodes,
+            "embedding": _encode_embedding(self.embedding),
+            "dim": int(self.embedding.size),
+            "nodes": sorted(self.nodes),
             "capabilities": self.capabilities,
             "size_bytes": self.size_bytes,
             "checksum": self.checksum,
@@ -95,7 +238,7 @@ class ModelRoute:
             project=data["project"],
             version=data.get("version", "1.0.0"),
             model_type=data.get("model_type", "unknown"),
-            embedding=data.get("embedding", []),
+            embedding=_decode_embedding(data.get("embedding"), data.get("dim")),
             nodes=data.get("nodes", []),
             capabilities=data.get("capabilities", []),
             size_bytes=data.get("size_bytes", 0),
@@ -110,7 +253,7 @@ class ModelRoute:
             project=manifest.name,
             version=manifest.version,
             model_type=manifest.type,
-            embedding=embedding or [],
+            embedding=embedding if embedding is not None else [],
             nodes=nodes,
             capabilities=manifest.capabilities,
             size_bytes=manifest.size_bytes,
@@ -131,7 +274,7 @@ class ModelMessage:
     to_node: Optional[str] = None  # None for broadcast
     timestamp: float = field(default_factory=time.time)
     ttl: int = ROUTE_UPDATE_TTL
-    nonce: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    nonce: str = field(default_factory=_new_nonce)
     
     # ROUTE_UPDATE payload
     action: Optional[str] = None  # "add", "update", "remove"
@@ -205,12 +348,21 @@ class ModelMessage:
             full_routes=[ModelRoute.from_dict(r) for r in data.get("full_routes", [])],
         )
     
+    def to_bytes(self, wire_format: WireFormat = WireFormat.JSON) -> bytes:
+        """Serialize for the wire, using orjson when installed."""
+        return _dumps(self.to_dict(), wire_format)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ModelMessage":
+        """Parse a message received from the wire, in either wire format."""
+        return cls.from_dict(_loads(data))
+    
     def to_json(self) -> str:
-        return json.dumps(self.to_dict())
+        return self.to_bytes().decode()
     
     @classmethod
     def from_json(cls, json_str: str) -> "ModelMessage":
-        return cls.from_dict(json.loads(json_str))
+        return cls.from_bytes(json_str)
 
 
 # Callback types
@@ -219,45 +371,245 @@ SendCallback = Callable[[str, bytes], Awaitable[bool]]
 EmbedCallback = Callable[[str], Awaitable[List[float]]]
 
 
+class _TimeBucketedSet:
+    """
+    Set whose members are forgotten one to two periods after being added.
+    
+    Members live in a current and a previous bucket; each period the
+    previous bucket is dropped. Lookups and inserts are O(1) with no
+    per-entry expiry sweep, and memory is bounded by two periods of traffic.
+    """
+    
+    __slots__ = ("period", "max_size", "_current", "_previous", "_rotated_at")
+    
+    def __init__(self, period: float, max_size: Optional[int] = None):
+        self.period = period
+        self.max_size = max_size
+        self._current: Set[Any] = set()
+        self._previous: Set[Any] = set()
+        self._rotated_at = time.monotonic()
+    
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+    
+    def __contains__(self, item: Any) -> bool:
+        self._rotate()
+        return item in self._current or item in self._previous
+    
+    def _rotate(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._rotated_at
+        if elapsed > self.period:
+            # After two idle periods the current bucket has expired too
+            self._previous = self._current if elapsed <= 2 * self.period else set()
+            self._current = set()
+            self._rotated_at = now
+    
+    def is_full(self) -> bool:
+        """True if max_size members are held (after expiring old ones)."""
+        self._rotate()
+        return self.max_size is not None and len(self) >= self.max_size
+    
+    def add_if_new(self, item: Any) -> bool:
+        """Add an item, returning False if it was already present."""
+        self._rotate()
+        if item in self._current or item in self._previous:
+            return False
+        
+        self._current.add(item)
+        return True
+
+
+class _NonceWindow:
+    """
+    Nonces bucketed by their message timestamp.
+    
+    A message is accepted while its timestamp is within `window` seconds
+    of now, so each nonce is kept exactly that long: buckets cover
+    `granularity` seconds of timestamps and are dropped whole once every
+    timestamp in them has left the window. Lookups probe the handful of
+    live buckets; per-owner counts are kept per bucket and expire with them.
+    """
+    
+    __slots__ = ("window", "granularity", "max_size", "_buckets", "_owners", "_floor", "_size")
+    
+    def __init__(self, window: float, granularity: float, max_size: Optional[int] = None):
+        self.window = window
+        self.granularity = granularity
+        self.max_size = max_size
+        self._buckets: Dict[int, Set[str]] = {}
+        self._owners: Dict[int, Dict[str, int]] = {}
+        self._floor: Optional[int] = None
+        self._size = 0
+    
+    def __len__(self) -> int:
+        self._expire()
+        return self._size
+    
+    def _expire(self) -> None:
+        floor = int((time.time() - self.window) // self.granularity)
+        if self._floor is None or floor > self._floor:
+            for slot in [s for s in self._buckets if s < floor]:
+                self._size -= len(self._buckets.pop(slot))
+                self._owners.pop(slot, None)
+            self._floor = floor
+    
+    def is_full(self) -> bool:
+        """True if max_size nonces are held (after expiring old ones)."""
+        self._expire()
+        return self.max_size is not None and self._size >= self.max_size
+    
+    def count(self, owner: str) -> int:
+        """Number of live nonces added on behalf of an owner."""
+        self._expire()
+        return sum(owners.get(owner, 0) for owners in self._owners.values())
+    
+    def owners(self) -> int:
+        """Number of distinct owners with live nonces."""
+        return len(set().union(*self._owners.values()))
+    
+    def add_if_new(self, nonce: str, timestamp: float, owner: Optional[str] = None) -> bool:
+        """Add a nonce under its message timestamp, returning False if already present."""
+        self._expire()
+        slot = int(timestamp // self.granularity)
+        if slot < self._floor:
+            return False
+        # A replay may carry a different timestamp, so check every bucket
+        for bucket in self._buckets.values():
+            if nonce in bucket:
+                return False
+        
+        self._buckets.setdefault(slot, set()).add(nonce)
+        self._size += 1
+        if owner is not None:
+            owners = self._owners.setdefault(slot, {})
+            owners[owner] = owners.get(owner, 0) + 1
+        return True
+
+
+def _index(index: Dict[str, FrozenSet[str]], keys: Iterable[str], project: str) -> None:
+    """Add a project under each key, replacing the affected sets."""
+    for key in keys:
+        index[key] = index.get(key, frozenset()) | {project}
+
+
+def _unindex(index: Dict[str, FrozenSet[str]], keys: Iterable[str], project: str) -> None:
+    """Remove a project from each key, dropping keys left empty."""
+    for key in keys:
+        remaining = index.get(key, frozenset()) - {project}
+        if remaining:
+            index[key] = remaining
+        else:
+            index.pop(key, None)
+
+
 class ModelRoutingTable:
     """
     In-memory routing table for models.
     
     Tracks which models are available where, with embeddings
     for fast semantic matching.
+    
+    The table is copy-on-write: readers use the current snapshot without
+    locking, while writers build new containers under the lock and swap
+    the snapshot reference in one assignment. Routes in a snapshot are
+    never mutated; changes replace them.
     """
     
     def __init__(self):
-        self._routes: Dict[str, ModelRoute] = {}  # project -> route
-        self._by_node: Dict[str, Set[str]] = {}  # node_id -> set of projects
-        self._by_capability: Dict[str, Set[str]] = {}  # capability -> set of projects
+        # (project -> route, node_id -> projects, capability -> projects)
+        self._snapshot: Tuple[
+            Dict[str, ModelRoute], Dict[str, FrozenSet[str]], Dict[str, FrozenSet[str]]
+        ] = ({}, {}, {})
         self._lock = asyncio.Lock()
+        
+        # Normalized embedding matrix per dimension, rebuilt lazily by match()
+        self._matrices: Dict[int, Tuple[np.ndarray, List[str]]] = {}
+        
+        # (routes dict it was built from, route dicts, JSON-encoded list)
+        self._sync_cache: Optional[Tuple[Dict[str, ModelRoute], List[dict], Optional[bytes]]] = None
     
-    async def add_or_update(self, route: ModelRoute) -> bool:
+    @property
+    def _routes(self) -> Dict[str, ModelRoute]:
+        return self._snapshot[0]
+    
+    def _publish(self, changes: Dict[str, Optional[ModelRoute]]) -> None:
         """
-        Add or update a route. Returns True if this was a new/updated entry.
+        Swap in a new snapshot with routes replaced, or removed for None.
+        
+        Indexes are only touched for the nodes and capabilities that
+        differ from the replaced route, and only copied when they change,
+        so a refresh of an unchanged route costs O(1) index work.
+        
+        Must be called with the lock held.
         """
-        async with self._lock:
-            existing = self._routes.get(route.project)
+        current_routes, by_node, by_capability = self._snapshot
+        routes = dict(current_routes)
+        embeddings_changed = False
+        
+        for project, route in changes.items():
+            old = routes.pop(project, None)
+            if route is not None:
+                routes[project] = route
             
-            # Skip if we have a newer version
-            if existing and existing.updated_at > route.updated_at:
-                return False
+            old_nodes = old.nodes if old else frozenset()
+            new_nodes = route.nodes if route else frozenset()
+            if old_nodes != new_nodes:
+                if by_node is self._snapshot[1]:
+                    by_node = dict(by_node)
+                _unindex(by_node, old_nodes - new_nodes, project)
+                _index(by_node, new_nodes - old_nodes, project)
             
-            self._routes[route.project] = route
+            old_caps = frozenset(old.capabilities) if old else frozenset()
+            new_caps = frozenset(route.capabilities) if route else frozenset()
+            if old_caps != new_caps:
+                if by_capability is self._snapshot[2]:
+                    by_capability = dict(by_capability)
+                _unindex(by_capability, old_caps - new_caps, project)
+                _index(by_capability, new_caps - old_caps, project)
             
-            # Update indexes
-            for node in route.nodes:
-                if node not in self._by_node:
-                    self._by_node[node] = set()
-                self._by_node[node].add(route.project)
+            if old is None or route is None or not (
+                old.embedding is route.embedding
+                or np.array_equal(old.embedding, route.embedding)
+            ):
+                embeddings_changed = True
+        
+        self._snapshot = (routes, by_node, by_capability)
+        if embeddings_changed:
+            self._matrices = {}
+    
+    async def add_or_update(self, route: ModelRoute) -> bool:
+        """
+        Add or update a route. Returns True if this was a new/updated entry.
+        """
+        return bool(await self.add_or_update_many([route]))
+    
+    async def add_or_update_many(self, routes: Iterable[ModelRoute]) -> List[ModelRoute]:
+        """
+        Add or update several routes with a single snapshot swap.
+        
+        Args:
+            routes: Routes to apply; stale ones (older than the entry
+                already held) are skipped
+        
+        Returns:
+            The routes that were applied
+        """
+        async with self._lock:
+            current = self._routes
+            changes: Dict[str, ModelRoute] = {}
             
-            for cap in route.capabilities:
-                if cap not in self._by_capability:
-                    self._by_capability[cap] = set()
-                self._by_capability[cap].add(route.project)
+            for route in routes:
+                existing = changes.get(route.project) or current.get(route.project)
+                
+                # Skip if we have a newer version
+                if existing and existing.updated_at > route.updated_at:
+                    continue
+                changes[route.project] = route
             
-            return True
+            if changes:
+                self._publish(changes)
+            return list(changes.values())
     
     async def remove(self, project: str) -> bool:
         """Remove a route."""
@@ -265,51 +617,41 @@ class ModelRoutingTable:
             if project not in self._routes:
                 return False
             
-            route = self._routes.pop(project)
-            
-            # Clean up indexes
-            for node in route.nodes:
-                if node in self._by_node:
-                    self._by_node[node].discard(project)
-            
-            for cap in route.capabilities:
-                if cap in self._by_capability:
-                    self._by_capability[cap].discard(project)
-            
+            self._publish({project: None})
             return True
     
     async def add_node_to_route(self, project: str, node_id: str) -> bool:
         """Add a node as having a model."""
         async with self._lock:
-            if project not in self._routes:
+            route = self._routes.get(project)
+            if route is None:
                 return False
             
-            route = self._routes[project]
             if node_id not in route.nodes:
-                route.nodes.append(node_id)
-                route.updated_at = time.time()
-                
-                if node_id not in self._by_node:
-                    self._by_node[node_id] = set()
-                self._by_node[node_id].add(project)
+                self._publish({project: replace(
+                    route, nodes=route.nodes | {sys.intern(node_id)}, updated_at=time.time()
+                )})
             
             return True
     
-    async def remove_node_from_route(self, project: str, node_id: str) -> bool:
-        """Remove a node from having a model."""
+    async def remove_node_from_route(self, project: str, node_id: str) -> Optional[ModelRoute]:
+        """
+        Remove a node from having a model.
+        
+        A route left with no nodes is dropped from the table.
+        
+        Returns:
+            The updated route (with empty nodes if it was dropped), or
+            None if the project is unknown
+        """
         async with self._lock:
-            if project not in self._routes:
-                return False
-            
-            route = self._routes[project]
-            if node_id in route.nodes:
-                route.nodes.remove(node_id)
-                route.updated_at = time.time()
-                
-                if node_id in self._by_node:
-                    self._by_node[node_id].discard(project)
+            route = self._routes.get(project)
+            if route is None or node_id not in route.nodes:
+                return route
             
-            return True
+            route = replace(route, nodes=route.nodes - {node_id}, updated_at=time.time())
+            self._publish({project: route if route.nodes else None})
+            return route
     
     def get(self, project: str) -> Optional[ModelRoute]:
         """Get a specific route."""
@@ -321,28 +663,102 @@ class ModelRoutingTable:
     
     def get_by_node(self, node_id: str) -> List[ModelRoute]:
         """Get routes available on a specific node."""
-        projects = self._by_node.get(node_id, set())
-        return [self._routes[p] for p in projects if p in self._routes]
+        routes, by_node, _ = self._snapshot
+        return [routes[p] for p in by_node.get(node_id, ())]
     
     def get_by_capability(self, capability: str) -> List[ModelRoute]:
         """Get routes with a specific capability."""
-        projects = self._by_capability.get(capability, set())
-        return [self._routes[p] for p in projects if p in self._routes]
+        routes, _, by_capability = self._snapshot
+        return [routes[p] for p in by_capability.get(capability, ())]
     
-    def find_nodes_with_model(self, project: str) -> List[str]:
+    def match(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[ModelRoute, float]]:
+        """
+        Find the routes whose embeddings are most similar to a query.
+        
+        Routes are scored by cosine similarity with a single matrix-vector
+        product against pre-normalized rows. Only routes whose embedding
+        has the same dimension as the query are considered.
+        
+        Args:
+            query: Query embedding
+            top_k: Maximum number of routes to return
+        
+        Returns:
+            List of (route, score) tuples, best match first
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if top_k <= 0 or norm == 0:
+            return []
+        
+        routes = self._routes
+        matrix, projects = self._matrix_for(query.size)
+        if not projects:
+            return []
+        
+        scores = matrix @ (query / norm)
+        if top_k < len(projects):
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(projects))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        
+        return [(routes[projects[i]], float(scores[i])) for i in top]
+    
+    def _matrix_for(self, dim: int) -> Tuple[np.ndarray, List[str]]:
+        """Get (or build) the L2-normalized embedding matrix for a dimension."""
+        cached = self._matrices.get(dim)
+        if cached is not None:
+            return cached
+        
+        routes = self._routes
+        projects = [p for p, r in routes.items() if r.embedding.size == dim]
+        matrix = np.empty((len(projects), dim), dtype=np.float32)
+        for i, project in enumerate(projects):
+            matrix[i] = routes[project].embedding
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        
+        self._matrices[dim] = (matrix, projects)
+        return matrix, projects
+    
+    def find_nodes_with_model(self, project: str) -> FrozenSet[str]:
         """Find nodes that have a specific model."""
         route = self._routes.get(project)
-        return route.nodes if route else []
+        return route.nodes if route else frozenset()
     
     def export_for_sync(self) -> List[ModelRoute]:
         """Export all routes for sync response."""
         return list(self._routes.values())
     
+    def export_for_sync_dicts(self) -> List[dict]:
+        """
+        Export all routes in wire form.
+        
+        The list is cached per snapshot, so repeated sync responses do not
+        re-serialize unchanged routes. Callers must not modify it.
+        """
+        routes = self._routes
+        if self._sync_cache is None or self._sync_cache[0] is not routes:
+            self._sync_cache = (routes, [r.to_dict() for r in routes.values()], None)
+        return self._sync_cache[1]
+    
+    def export_for_sync_json(self) -> bytes:
+        """Export all routes as an encoded JSON list, cached per snapshot."""
+        dicts = self.export_for_sync_dicts()
+        routes, _, encoded = self._sync_cache
+        if encoded is None:
+            encoded = _dumps(dicts)
+            self._sync_cache = (routes, dicts, encoded)
+        return encoded
+    
     def stats(self) -> dict:
+        routes, by_node, by_capability = self._snapshot
         return {
-            "total_routes": len(self._routes),
-            "nodes_with_models": len(self._by_node),
-            "capabilities_indexed": len(self._by_capability),
+            "total_routes": len(routes),
+            "nodes_with_models": len(by_node),
+            "capabilities_indexed": len(by_capability),
         }
 
 
@@ -382,11 +798,16 @@ class ModelGossip:
         self,
         node_id: str,
         registry: ModelRegistry,
-        announce_interval: float = MODEL_ANNOUNCE_INTERVAL_SEC
+        announce_interval: float = MODEL_ANNOUNCE_INTERVAL_SEC,
+        wire_format: WireFormat = WireFormat.JSON,
     ):
+        if wire_format is WireFormat.MSGPACK and not ORMSGPACK_AVAILABLE:
+            raise ValueError("msgpack wire format requires ormsgpack")
+        
         self.node_id = node_id
         self.registry = registry
         self.announce_interval = announce_interval
+        self.wire_format = wire_format
         
         # Routing table (shared state)
         self.routing_table = ModelRoutingTable()
@@ -394,16 +815,51 @@ class ModelGossip:
         # Callbacks
         self._broadcast: Optional[BroadcastCallback] = None
         self._send: Optional[SendCallback] = None
+        self._peers: Set[str] = set()  # Direct peers for concurrent fan-out
         self._embed: Optional[EmbedCallback] = None  # For computing embeddings
         
         # State
         self._running = False
         self._task: Optional[asyncio.Task] = None
-        self._nonce_cache: Dict[str, float] = {}
+        self._forward_q: Optional[asyncio.Queue] = None  # Created by start()
+        self._forward_workers: List[asyncio.Task] = []
+        self._forwards_dropped = 0
+        # Nonces are kept for as long as _check_nonce accepts their timestamp
+        self._nonce_cache = _NonceWindow(
+            NONCE_CACHE_TTL_SEC, NONCE_BUCKET_SEC, max_size=NONCE_CACHE_MAX
+        )
+        self._nonce_cache_full = False
+        self._nonce_capped_peers: Set[str] = set()
+        self._nonces_rejected = 0
+        self._seen_hashes = _TimeBucketedSet(NONCE_CACHE_TTL_SEC / 2, max_size=NONCE_CACHE_MAX)
         self._pending_syncs: Dict[str, asyncio.Future] = {}
+        self._inflight_syncs: Dict[Optional[str], asyncio.Task] = {}  # target -> sync
+        self._recent_requests: Dict[str, Tuple[str, float]] = {}  # criteria key -> (nonce, sent)
+        
+        # (registry.local_version, announcement template, route count),
+        # rebuilt only when local models change
+        self._announce_cache: Optional[Tuple[int, Union[bytes, dict], int]] = None
+        self._announced_version: Optional[int] = None
+        
+        # (registry.local_version, capability -> local entries), for
+        # answering MODEL_REQUESTs without scanning every local model
+        self._capability_index: Optional[Tuple[int, Dict[str, List[ModelEntry]]]] = None
+        
+        # Message type value -> handler
+        self._handlers: Dict[str, Callable[[ModelMessage, str, dict], Awaitable[None]]] = {
+            MessageType.ROUTE_UPDATE.value: self._handle_route_update,
+            MessageType.MODEL_DEPLOYED.value: self._handle_model_deployed,
+            MessageType.MODEL_AVAILABLE.value: self._handle_model_available,
+            MessageType.MODEL_REQUEST.value: self._handle_model_request,
+            MessageType.MODEL_OFFER.value: self._handle_model_offer,
+            MessageType.MODEL_ACK.value: self._handle_model_ack,
+            MessageType.SYNC_REQUEST.value: self._handle_sync_request,
+            MessageType.SYNC_RESPONSE.value: self._handle_sync_response,
+        }
         
         # Events
         self.on_route_update: Optional[Callable[[ModelRoute, str], Awaitable[None]]] = None
+        self.on_routes_updated: Optional[Callable[[List[ModelRoute], str], Awaitable[None]]] = None
         self.on_model_deployed: Optional[Callable[[str, str, str], Awaitable[None]]] = None
         self.on_sync_complete: Optional[Callable[[int], Awaitable[None]]] = None
     
@@ -411,6 +867,36 @@ class ModelGossip:
         """Set callback for broadcasting to all peers."""
         self._broadcast = callback
     
+    def set_peers(self, peers: Iterable[str]) -> None:
+        """
+        Set the direct peers to fan out to.
+        
+        With peers and a send callback configured, broadcasts are sent to
+        each peer concurrently through the send callback instead of going
+        through the broadcast callback, and forwarded messages skip the
+        peer they came from.
+        """
+        self._peers = set(peers)
+    
+    @property
+    def _can_broadcast(self) -> bool:
+        return bool(self._broadcast or (self._peers and self._send))
+    
+    async def _fanout(self, data: bytes, exclude: Optional[str] = None) -> None:
+        """Send data to every peer except `exclude`."""
+        if not (self._peers and self._send):
+            await self._broadcast(data)
+            return
+        
+        peers = [p for p in self._peers if p != exclude]
+        results = await asyncio.gather(
+            *(self._send(peer, data) for peer in peers),
+            return_exceptions=True,
+        )
+        failed = [p for p, ok in zip(peers, results) if ok is not True]
+        if failed:
+            logger.debug(f"Fan-out failed to {len(failed)}/{len(peers)} peers")
+    
     def set_send_callback(self, callback: SendCallback) -> None:
         """Set callback for sending to specific peer."""
         self._send = callback
@@ -431,7 +917,7 @@ class ModelGossip:
         
         This is the fast path - updates propagate in seconds.
         """
-        if not self._broadcast:
+        if not self._can_broadcast:
             logger.warning("Cannot broadcast: no callback configured")
             return
         
@@ -442,7 +928,7 @@ class ModelGossip:
             route=route,
         )
         
-        await self._broadcast(msg.to_json().encode())
+        await self._fanout(msg.to_bytes(self.wire_format))
         logger.info(f"Broadcast route update: {action} {route.project}")
     
     async def broadcast_deployment(
@@ -457,7 +943,7 @@ class ModelGossip:
         Called when a model is successfully deployed/loaded.
         All nodes learn about this in seconds.
         """
-        if not self._broadcast:
+        if not self._can_broadcast:
             return
         
         # Get embedding if we have an embed callback
@@ -477,7 +963,7 @@ class ModelGossip:
             deployed_node=self.node_id,
         )
         
-        await self._broadcast(msg.to_json().encode())
+        await self._fanout(msg.to_bytes(self.wire_format))
         
         # Also update the routing table and broadcast route update
         entry = self.registry.get_local(model_name, version)
@@ -485,7 +971,7 @@ class ModelGossip:
             route = ModelRoute.from_manifest(
                 entry.manifest,
                 nodes=[self.node_id],
-                embedding=embedding or []
+                embedding=embedding if embedding is not None else []
             )
             
             # Update local routing table
@@ -498,27 +984,25 @@ class ModelGossip:
     
     async def broadcast_removal(self, model_name: str) -> None:
         """Broadcast that a model was removed from this node."""
-        if not self._broadcast:
+        if not self._can_broadcast:
             return
         
-        route = self.routing_table.get(model_name)
-        if route:
-            # Remove this node from the route
-            await self.routing_table.remove_node_from_route(model_name, self.node_id)
-            
-            # Broadcast update
-            updated_route = self.routing_table.get(model_name)
-            if updated_route:
-                await self.broadcast_route_update(updated_route, "update")
-            else:
-                # Model no longer exists anywhere
-                msg = ModelMessage(
-                    type=MessageType.ROUTE_UPDATE,
-                    from_node=self.node_id,
-                    action="remove",
-                    route=route,
-                )
-                await self._broadcast(msg.to_json().encode())
+        # Remove this node from the route
+        route = await self.routing_table.remove_node_from_route(model_name, self.node_id)
+        if route is None:
+            return
+        
+        if route.nodes:
+            await self.broadcast_route_update(route, "update")
+        else:
+            # Model no longer exists anywhere
+            msg = ModelMessage(
+                type=MessageType.ROUTE_UPDATE,
+                from_node=self.node_id,
+                action="remove",
+                route=route,
+            )
+            await self._fanout(msg.to_bytes(self.wire_format))
     
     # ==================== Sync on Join ====================
     
@@ -528,10 +1012,24 @@ class ModelGossip:
         
         Called when a new node joins the mesh.
         Returns number of routes received.
+        
+        Concurrent calls for the same target share one in-flight request
+        and all receive its result.
         """
         if not self._broadcast and not self._send:
             raise RuntimeError("No send callback configured")
         
+        task = self._inflight_syncs.get(target_node)
+        if task is None:
+            task = asyncio.create_task(self._request_sync(target_node))
+            self._inflight_syncs[target_node] = task
+            task.add_done_callback(lambda _: self._inflight_syncs.pop(target_node, None))
+        
+        # Shield so one caller being cancelled does not cancel the others
+        return await asyncio.shield(task)
+    
+    async def _request_sync(self, target_node: Optional[str]) -> int:
+        """Send one sync request and wait for its response."""
         msg = ModelMessage(
             type=MessageType.SYNC_REQUEST,
             from_node=self.node_id,
@@ -544,9 +1042,9 @@ class ModelGossip:
         self._pending_syncs[msg.nonce] = future
         
         if target_node and self._send:
-            await self._send(target_node, msg.to_json().encode())
-        elif self._broadcast:
-            await self._broadcast(msg.to_json().encode())
+            await self._send(target_node, msg.to_bytes(self.wire_format))
+        elif self._can_broadcast:
+            await self._fanout(msg.to_bytes(self.wire_format))
         
         # Wait for response
         try:
@@ -568,17 +1066,30 @@ class ModelGossip:
         if not self._send:
             return
         
-        routes = self.routing_table.export_for_sync()
+        routes = self.routing_table.export_for_sync_dicts()
         
-        msg = ModelMessage(
+        envelope = ModelMessage(
             type=MessageType.SYNC_RESPONSE,
             from_node=self.node_id,
             to_node=to_node,
             nonce=request_nonce,  # Echo nonce for correlation
-            full_routes=routes,
-        )
+        ).to_dict()
+        
+        # Splice the cached route list into the envelope instead of
+        # serializing every route again
+        if self.wire_format is WireFormat.JSON:
+            del envelope["full_routes"]
+            data = (
+                _dumps(envelope)[:-1]
+                + b',"full_routes":'
+                + self.routing_table.export_for_sync_json()
+                + b"}"
+            )
+        else:
+            envelope["full_routes"] = routes
+            data = _dumps(envelope, self.wire_format)
         
-        await self._send(to_node, msg.to_json().encode())
+        await self._send(to_node, _compress(data))
         logger.info(f"Sent sync response to {to_node}: {len(routes)} routes")
     
     def _get_node_capabilities(self) -> Dict[str, Any]:
@@ -597,35 +1108,65 @@ class ModelGossip:
         
         This is the background sync - complements fast updates.
         """
-        if not self._broadcast:
+        if not self._can_broadcast:
             return
         
-        routes = []
-        for entry in self.registry.list_local():
-            route = ModelRoute.from_manifest(
-                entry.manifest,
-                nodes=[self.node_id],
-            )
-            routes.append(route)
-            
-            # Also update local routing table
-            await self.routing_table.add_or_update(route)
+        version = self.registry.local_version
+        if self._announce_cache is None or self._announce_cache[0] != version:
+            self._announce_cache = await self._build_announcement(version)
         
-        if not routes:
+        _, template, count = self._announce_cache
+        if not count:
+            self._announced_version = version
             return
         
-        msg = ModelMessage(
-            type=MessageType.MODEL_AVAILABLE,
-            from_node=self.node_id,
-            routes=routes,
-        )
+        # Only nonce and timestamp change between announcements
+        fields = {"nonce": _new_nonce(), "timestamp": time.time()}
+        if isinstance(template, bytes):
+            payload = template + _dumps(fields)[1:]
+        else:
+            payload = _dumps({**template, **fields}, self.wire_format)
         
         try:
-            await self._broadcast(msg.to_json().encode())
-            logger.debug(f"Announced {len(routes)} models")
+            await self._fanout(_compress(payload))
+            self._announced_version = version
+            logger.debug(f"Announced {count} models")
         except Exception as e:
             logger.error(f"Failed to announce models: {e}")
     
+    async def _build_announcement(self, version: int) -> Tuple[int, Union[bytes, dict], int]:
+        """
+        Prepare the MODEL_AVAILABLE announcement for the local models.
+        
+        Also refreshes the local routing table with the announced routes.
+        
+        Returns:
+            (version, template, number of routes). For JSON the template
+            is the message bytes without the closing nonce and timestamp
+            fields; for msgpack, whose map header holds the key count, it
+            is the message dict without them.
+        """
+        routes = [
+            ModelRoute.from_manifest(entry.manifest, nodes=[self.node_id])
+            for entry in self.registry.list_local()
+        ]
+        if not routes:
+            return version, b"", 0
+        
+        # Also update local routing table
+        await self.routing_table.add_or_update_many(routes)
+        
+        data = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE,
+            from_node=self.node_id,
+            routes=routes,
+        ).to_dict()
+        del data["nonce"], data["timestamp"]
+        
+        if self.wire_format is WireFormat.JSON:
+            return version, _dumps(data)[:-1] + b",", len(routes)
+        return version, data, len(routes)
+    
     # ==================== Request/Offer Flow ====================
     
     async def request_model(
@@ -638,9 +1179,11 @@ class ModelGossip:
         """
         Request models matching criteria.
         
-        Returns request nonce for tracking responses.
+        Returns request nonce for tracking responses. A request identical
+        to one sent within REQUEST_COALESCE_SEC is not re-broadcast; the
+        earlier request's nonce is returned instead.
         """
-        if not self._broadcast:
+        if not self._can_broadcast:
             raise RuntimeError("Broadcast callback not configured")
         
         criteria = {}
@@ -651,6 +1194,16 @@ class ModelGossip:
         if max_size_bytes:
             criteria["max_size_bytes"] = max_size_bytes
         
+        now = time.monotonic()
+        self._recent_requests = {
+            k: v for k, v in self._recent_requests.items()
+            if now - v[1] < REQUEST_COALESCE_SEC
+        }
+        key = json.dumps([criteria, urgency], sort_keys=True)
+        recent = self._recent_requests.get(key)
+        if recent is not None:
+            return recent[0]
+        
         msg = ModelMessage(
             type=MessageType.MODEL_REQUEST,
             from_node=self.node_id,
@@ -658,7 +1211,8 @@ class ModelGossip:
             urgency=urgency,
         )
         
-        await self._broadcast(msg.to_json().encode())
+        await self._fanout(msg.to_bytes(self.wire_format))
+        self._recent_requests[key] = (msg.nonce, now)
         logger.info(f"Requested models: {criteria}")
         
         return msg.nonce
@@ -681,7 +1235,7 @@ class ModelGossip:
             transfer_options=transfer_options or {},
         )
         
-        await self._send(to_node, msg.to_json().encode())
+        await self._send(to_node, msg.to_bytes(self.wire_format))
         logger.info(f"Offered {route.project} to {to_node}")
     
     async def accept_offer(self, to_node: str, route: ModelRoute) -> None:
@@ -697,39 +1251,91 @@ class ModelGossip:
             accepted=True,
         )
         
-        await self._send(to_node, msg.to_json().encode())
+        await self._send(to_node, msg.to_bytes(self.wire_format))
     
     # ==================== Message Handling ====================
     
     async def handle_message(self, data: bytes, from_peer: str) -> None:
         """Handle an incoming model gossip message."""
+        # Drop byte-identical duplicates before paying for the decode
+        if self._seen_before(data):
+            return
+        
+        # Replay and type checks run on the decoded dict, so rejected
+        # messages never build a ModelMessage or its ModelRoutes
         try:
-            msg = ModelMessage.from_json(data.decode())
+            raw = _loads(_decompress(data))
+            handler = self._handlers.get(raw["type"])
+            if handler is None:
+                return
+            
+            # Check nonce (prevent replay)
+            if not self._check_nonce(
+                raw.get("nonce", ""), raw.get("timestamp", time.time()), from_peer
+            ):
+                return
+            
+            msg = ModelMessage.from_dict(raw)
         except Exception as e:
             logger.warning(f"Invalid model message from {from_peer}: {e}")
             return
         
-        # Check nonce (prevent replay)
-        if not self._check_nonce(msg.nonce, msg.timestamp):
+        await handler(msg, from_peer, raw)
+    
+    async def _forward(
+        self,
+        msg: ModelMessage,
+        raw: Optional[dict],
+        kind: str,
+        from_peer: Optional[str] = None,
+    ) -> None:
+        """
+        Re-broadcast a received message with its TTL decremented.
+        
+        The decoded dict is re-encoded with only the ttl changed, so
+        forwarding does not rebuild the message and its routes, and large
+        payloads are gzipped as on any other send. While the
+        protocol is running the fan-out is queued for the forward workers
+        so the receive path does not wait on peers. When the queue is full,
+        announcements (re-sent periodically anyway) are dropped and other
+        messages are forwarded inline.
+        """
+        if msg.ttl <= 1 or not self._can_broadcast:
             return
         
-        # Route by message type
-        handlers = {
-            MessageType.ROUTE_UPDATE: self._handle_route_update,
-            MessageType.MODEL_DEPLOYED: self._handle_model_deployed,
-            MessageType.MODEL_AVAILABLE: self._handle_model_available,
-            MessageType.MODEL_REQUEST: self._handle_model_request,
-            MessageType.MODEL_OFFER: self._handle_model_offer,
-            MessageType.MODEL_ACK: self._handle_model_ack,
-            MessageType.SYNC_REQUEST: self._handle_sync_request,
-            MessageType.SYNC_RESPONSE: self._handle_sync_response,
-        }
+        data = dict(raw) if raw is not None else msg.to_dict()
+        data["ttl"] = msg.ttl - 1
+        payload = _compress(_dumps(data, self.wire_format))
+        
+        if self._forward_q is not None:
+            try:
+                self._forward_q.put_nowait((payload, from_peer, kind))
+                return
+            except asyncio.QueueFull:
+                if msg.type == MessageType.MODEL_AVAILABLE:
+                    self._forwards_dropped += 1
+                    return
         
-        handler = handlers.get(msg.type)
-        if handler:
-            await handler(msg, from_peer)
+        await self._send_forward(payload, from_peer, kind)
     
-    async def _handle_route_update(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _send_forward(self, payload: bytes, from_peer: Optional[str], kind: str) -> None:
+        """Fan out a forwarded message, logging rather than raising on failure."""
+        try:
+            await self._fanout(payload, exclude=from_peer)
+        except Exception as e:
+            logger.error(f"Failed to forward {kind}: {e}")
+    
+    async def _forward_worker(self) -> None:
+        """Drain the forward queue."""
+        queue = self._forward_q
+        while True:
+            payload, from_peer, kind = await queue.get()
+            try:
+                await self._send_forward(payload, from_peer, kind)
+            finally:
+                queue.task_done()
+    
+    async def _handle_route_update(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle ROUTE_UPDATE - instant routing table update."""
         if not msg.route:
             return
@@ -746,22 +1352,9 @@ class ModelGossip:
                 await self.on_route_update(msg.route, action)
         
         # Forward with TTL decrement
-        if msg.ttl > 1 and self._broadcast:
-            forwarded = ModelMessage(
-                type=MessageType.ROUTE_UPDATE,
-                from_node=msg.from_node,
-                action=action,
-                route=msg.route,
-                timestamp=msg.timestamp,
-                ttl=msg.ttl - 1,
-                nonce=msg.nonce,
-            )
-            try:
-                await self._broadcast(forwarded.to_json().encode())
-            except Exception as e:
-                logger.error(f"Failed to forward route update: {e}")
+        await self._forward(msg, raw, "route update", from_peer)
     
-    async def _handle_model_deployed(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_model_deployed(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle MODEL_DEPLOYED - instant deployment notification."""
         if not msg.model_name or not msg.deployed_node:
             return
@@ -786,52 +1379,31 @@ class ModelGossip:
         logger.info(f"Model deployed: {msg.model_name} on {msg.deployed_node}")
         
         # Forward with TTL decrement
-        if msg.ttl > 1 and self._broadcast:
-            forwarded = ModelMessage(
-                type=MessageType.MODEL_DEPLOYED,
-                from_node=msg.from_node,
-                model_name=msg.model_name,
-                model_version=msg.model_version,
-                deployed_node=msg.deployed_node,
-                timestamp=msg.timestamp,
-                ttl=msg.ttl - 1,
-                nonce=msg.nonce,
-            )
-            try:
-                await self._broadcast(forwarded.to_json().encode())
-            except Exception as e:
-                logger.error(f"Failed to forward deployment: {e}")
+        await self._forward(msg, raw, "deployment", from_peer)
     
-    async def _handle_model_available(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_model_available(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle MODEL_AVAILABLE - periodic announcement."""
-        for route in msg.routes:
-            await self.routing_table.add_or_update(route)
-            self.registry.update_mesh_model(route.project, route.version, from_peer)
+        # One snapshot swap and one registry pass for the whole announcement
+        applied = await self.routing_table.add_or_update_many(msg.routes)
+        self.registry.update_mesh_models_bulk(
+            (route.project, route.version, from_peer) for route in msg.routes
+        )
+        
+        if applied and self.on_routes_updated:
+            await self.on_routes_updated(applied, from_peer)
         
         logger.debug(f"Received {len(msg.routes)} models from {from_peer}")
         
         # Forward with TTL decrement
-        if msg.ttl > 1 and self._broadcast:
-            forwarded = ModelMessage(
-                type=MessageType.MODEL_AVAILABLE,
-                from_node=msg.from_node,
-                routes=msg.routes,
-                timestamp=msg.timestamp,
-                ttl=msg.ttl - 1,
-                nonce=msg.nonce,
-            )
-            try:
-                await self._broadcast(forwarded.to_json().encode())
-            except Exception as e:
-                logger.error(f"Failed to forward announcement: {e}")
+        await self._forward(msg, raw, "announcement", from_peer)
     
-    async def _handle_model_request(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_model_request(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle MODEL_REQUEST - offer matching models."""
         if not msg.criteria:
             return
         
         # Find matching local models
-        for entry in self.registry.list_local():
+        for entry in self._local_candidates(msg.criteria):
             if self._matches_criteria(entry.manifest, msg.criteria):
                 route = ModelRoute.from_manifest(
                     entry.manifest,
@@ -839,23 +1411,10 @@ class ModelGossip:
                 )
                 await self.offer_model(msg.from_node, route)
         
-        # Forward request
-        if msg.ttl > 1 and self._broadcast:
-            forwarded = ModelMessage(
-                type=MessageType.MODEL_REQUEST,
-                from_node=msg.from_node,
-                criteria=msg.criteria,
-                urgency=msg.urgency,
-                timestamp=msg.timestamp,
-                ttl=msg.ttl - 1,
-                nonce=msg.nonce,
-            )
-            try:
-                await self._broadcast(forwarded.to_json().encode())
-            except Exception as e:
-                logger.error(f"Failed to forward request: {e}")
+        # Forward with TTL decrement
+        await self._forward(msg, raw, "request", from_peer)
     
-    async def _handle_model_offer(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_model_offer(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle MODEL_OFFER - decide whether to accept."""
         if not msg.offer_route:
             return
@@ -870,7 +1429,7 @@ class ModelGossip:
         # TODO: Trigger actual pull via distributor
         logger.info(f"Accepted offer for {msg.offer_route.project} from {from_peer}")
     
-    async def _handle_model_ack(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_model_ack(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle MODEL_ACK - start transfer if accepted."""
         if not msg.offer_route or not msg.accepted:
             return
@@ -878,20 +1437,24 @@ class ModelGossip:
         # TODO: Trigger actual push via distributor
         logger.info(f"Offer accepted for {msg.offer_route.project} by {from_peer}")
     
-    async def _handle_sync_request(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_sync_request(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle SYNC_REQUEST - send full routing table."""
         await self._send_sync_response(msg.from_node, msg.nonce)
     
-    async def _handle_sync_response(self, msg: ModelMessage, from_peer: str) -> None:
+    async def _handle_sync_response(self, msg: ModelMessage, from_peer: str, raw: dict = None) -> None:
         """Handle SYNC_RESPONSE - populate routing table."""
-        routes_received = 0
+        applied = await self.routing_table.add_or_update_many(msg.full_routes)
+        routes_received = len(applied)
+        
+        # Also update registry
+        self.registry.update_mesh_models_bulk(
+            (route.project, route.version, node)
+            for route in applied
+            for node in route.nodes
+        )
         
-        for route in msg.full_routes:
-            if await self.routing_table.add_or_update(route):
-                routes_received += 1
-                # Also update registry
-                for node in route.nodes:
-                    self.registry.update_mesh_model(route.project, route.version, node)
+        if applied and self.on_routes_updated:
+            await self.on_routes_updated(applied, from_peer)
         
         logger.info(f"Sync response: received {routes_received} routes from {from_peer}")
         
@@ -901,13 +1464,36 @@ class ModelGossip:
             if not future.done():
                 future.set_result(routes_received)
     
+    def _local_candidates(self, criteria: Dict[str, Any]) -> Iterable[ModelEntry]:
+        """
+        Narrow local models to those that can match request criteria.
+        
+        Requested capabilities are looked up in an inverted index and
+        the entries for the rarest one are returned; _matches_criteria
+        still checks the rest.
+        """
+        capabilities = criteria.get("capabilities")
+        if not capabilities:
+            return self.registry.list_local()
+        
+        version = self.registry.local_version
+        if self._capability_index is None or self._capability_index[0] != version:
+            index: Dict[str, List[ModelEntry]] = {}
+            for entry in self.registry.list_local():
+                for capability in entry.manifest.capabilities_set:
+                    index.setdefault(capability, []).append(entry)
+            self._capability_index = (version, index)
+        
+        index = self._capability_index[1]
+        return min((index.get(c, ()) for c in capabilities), key=len)
+    
     def _matches_criteria(self, manifest: ModelManifest, criteria: Dict[str, Any]) -> bool:
         """Check if a manifest matches request criteria."""
         if "name" in criteria and manifest.name != criteria["name"]:
             return False
         
         if "capabilities" in criteria:
-            if not all(c in manifest.capabilities for c in criteria["capabilities"]):
+            if not manifest.capabilities_set.issuperset(criteria["capabilities"]):
                 return False
         
         if "max_size_bytes" in criteria:
@@ -918,7 +1504,26 @@ class ModelGossip:
     
     # ==================== Nonce Handling ====================
     
-    def _check_nonce(self, nonce: str, timestamp: float) -> bool:
+    def _seen_before(self, data: bytes) -> bool:
+        """
+        Check and record a content hash of a raw message.
+        
+        Hashes are remembered for between one half and one full
+        NONCE_CACHE_TTL_SEC; the nonce check covers anything older.
+        Once NONCE_CACHE_MAX hashes are held, new ones are not recorded
+        and those messages are left to the nonce check.
+        
+        Returns:
+            True if identical bytes were received recently
+        """
+        h = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+        if self._seen_hashes.is_full():
+            return h in self._seen_hashes
+        return not self._seen_hashes.add_if_new(h)
+    
+    def _check_nonce(
+        self, nonce: str, timestamp: float, from_peer: Optional[str] = None
+    ) -> bool:
         """Check if nonce is new (not a replay)."""
         now = time.time()
         
@@ -926,44 +1531,81 @@ class ModelGossip:
         if abs(now - timestamp) > NONCE_CACHE_TTL_SEC:
             return False
         
-        # Clean old entries
-        expired = [
-            n for n, t in self._nonce_cache.items()
-            if now - t > NONCE_CACHE_TTL_SEC
-        ]
-        for n in expired:
-            del self._nonce_cache[n]
-        
-        # Check for duplicate
-        if nonce in self._nonce_cache:
+        # A full cache means more unique messages than the mesh should
+        # produce; reject rather than evict so replays can't get through
+        if self._nonce_cache.is_full():
+            if not self._nonce_cache_full:
+                logger.warning(
+                    f"nonce_rate_abuse: nonce cache holds {NONCE_CACHE_MAX} entries, "
+                    f"rejecting new messages until entries expire"
+                )
+                self._nonce_cache_full = True
+            self._nonces_rejected += 1
             return False
+        self._nonce_cache_full = False
+        
+        # Likewise cap each peer, so one flooding peer can't fill the
+        # cache and lock everyone else out
+        if from_peer is not None:
+            if self._nonce_cache.count(from_peer) >= NONCE_PER_PEER_MAX:
+                if from_peer not in self._nonce_capped_peers:
+                    logger.warning(
+                        f"nonce_rate_abuse: peer {from_peer} holds {NONCE_PER_PEER_MAX} "
+                        f"nonces, rejecting its new messages until entries expire"
+                    )
+                    self._nonce_capped_peers.add(from_peer)
+                self._nonces_rejected += 1
+                return False
+            self._nonce_capped_peers.discard(from_peer)
         
-        self._nonce_cache[nonce] = timestamp
-        return True
+        # Check for duplicate
+        return self._nonce_cache.add_if_new(nonce, timestamp, from_peer)
     
     # ==================== Lifecycle ====================
     
     async def _announce_loop(self) -> None:
-        """Periodic announcement loop."""
+        """
+        Periodic announcement loop.
+        
+        Announces only when local models changed since the last successful
+        announcement, or every ANNOUNCE_REFRESH_INTERVALS ticks as
+        anti-entropy. Changes themselves are pushed immediately by
+        broadcast_route_update/broadcast_deployment.
+        """
+        idle_ticks = 0
         while self._running:
-            try:
-                await self.announce()
-            except Exception as e:
-                logger.error(f"Model announcement failed: {e}")
-            await asyncio.sleep(self.announce_interval)
+            if (
+                self.registry.local_version != self._announced_version
+                or idle_ticks >= ANNOUNCE_REFRESH_INTERVALS
+            ):
+                idle_ticks = 0
+                try:
+                    await self.announce()
+                except Exception as e:
+                    logger.error(f"Model announcement failed: {e}")
+            else:
+                idle_ticks += 1
+            
+            jitter = random.uniform(1 - ANNOUNCE_JITTER, 1 + ANNOUNCE_JITTER)
+            await asyncio.sleep(self.announce_interval * jitter)
     
     async def start(self) -> None:
         """Start the gossip protocol."""
         if self._running:
             return
         
-        # Initialize routing table from local registry
-        for entry in self.registry.list_local():
-            route = ModelRoute.from_manifest(entry.manifest, nodes=[self.node_id])
-            await self.routing_table.add_or_update(route)
+        # Initialize routing table from local registry in one snapshot swap
+        await self.routing_table.add_or_update_many(
+            ModelRoute.from_manifest(entry.manifest, nodes=[self.node_id])
+            for entry in self.registry.list_local()
+        )
         
         self._running = True
         self._task = asyncio.create_task(self._announce_loop())
+        self._forward_q = asyncio.Queue(maxsize=FORWARD_QUEUE_SIZE)
+        self._forward_workers = [
+            asyncio.create_task(self._forward_worker()) for _ in range(FORWARD_WORKERS)
+        ]
         logger.info(f"Model gossip started with {len(self.routing_table.get_all())} local routes")
     
     async def stop(self) -> None:
@@ -975,6 +1617,13 @@ class ModelGossip:
                 await self._task
             except asyncio.CancelledError:
                 pass
+        
+        # Queued forwards are dropped; peers re-learn through announcements
+        self._forward_q = None
+        for worker in self._forward_workers:
+            worker.cancel()
+        await asyncio.gather(*self._forward_workers, return_exceptions=True)
+        self._forward_workers = []
         logger.info("Model gossip stopped")
     
     # ==================== Stats ====================
@@ -985,5 +1634,11 @@ class ModelGossip:
             "running": self._running,
             "routing_table": self.routing_table.stats(),
             "nonce_cache_size": len(self._nonce_cache),
+            "nonce_cache_peers": self._nonce_cache.owners(),
+            "nonce_capped_peers": len(self._nonce_capped_peers),
+            "nonces_rejected": self._nonces_rejected,
+            "seen_hashes_size": len(self._seen_hashes),
             "pending_syncs": len(self._pending_syncs),
+            "forward_queue": self._forward_q.qsize() if self._forward_q else 0,
+            "forwards_dropped": self._forwards_dropped,
         }
@@ -5,21 +5,35 @@ Packages models for transfer between nodes, handling serialization,
 compression, chunking, and verification.
 """
 
+import asyncio
 import base64
 import gzip
 import hashlib
 import io
 import json
 import logging
+import mmap
 import os
+import shutil
+import struct
 import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 import yaml
 
-from .registry import ModelManifest
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from .registry import CHECKSUM_READ_SIZE, ModelManifest, file_sha256
 
 logger = logging.getLogger(__name__)
 
@@ -27,43 +41,192 @@ logger = logging.getLogger(__name__)
 CHUNK_SIZE = 64 * 1024  # 64KB chunks
 COMPRESSION_THRESHOLD = 1024  # Compress files larger than 1KB
 MAX_INLINE_SIZE = 256 * 1024  # Models under 256KB can be sent inline
+PREPARED_CACHE_BYTES = 256 * 1024 * 1024  # Compressed payloads kept for repeat sends
+COMPRESSION_SAMPLES = 16  # Blocks sampled to estimate compressibility
+COMPRESSION_SAMPLE_SIZE = 4 * 1024
+COMPRESSION_SAMPLE_RATIO = 0.95  # Skip compression when samples shrink less than this
+
+# Compression codecs; "gzip" is what peers without a codec field send
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_NONE = "none"
+
+# Binary frame: 4-byte big-endian header length, JSON header, raw payload
+_FRAME_HEADER = struct.Struct(">I")
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def _frame(header: dict, *payload: bytes) -> bytes:
+    """Build a binary frame carrying a JSON header and raw payload bytes."""
+    head = json.dumps(header).encode()
+    return b"".join((_FRAME_HEADER.pack(len(head)), head, *payload))
+
+
+def _unframe(frame: bytes) -> Tuple[dict, memoryview]:
+    """
+    Split a frame built by _frame into its header and payload.
+    
+    The payload is a zero-copy view into `frame`; hashing, decompression
+    and the transfer buffer all accept it directly.
+    """
+    view = memoryview(frame)
+    (head_len,) = _FRAME_HEADER.unpack_from(view)
+    start = _FRAME_HEADER.size
+    header = json.loads(bytes(view[start:start + head_len]))
+    return header, view[start + head_len:]
+
+
+def _decompress(data: bytes, compression: str, original_size: int = 0) -> bytes:
+    """Decompress a payload produced with the given codec."""
+    if compression == COMPRESSION_NONE:
+        return data
+    if compression == COMPRESSION_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd-compressed model received but zstandard is not installed")
+        dctx = zstandard.ZstdDecompressor()
+        if original_size:
+            return dctx.decompress(data, max_output_size=original_size)
+        # Streamed frames don't record their content size
+        return dctx.decompressobj().decompress(data)
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompress_file(src: Path, dst: Path, compression: str) -> Tuple[int, str]:
+    """Stream-decompress `src` into `dst`; returns the output size and SHA256."""
+    with open(src, "rb") as f, open(dst, "wb") as out:
+        if compression == COMPRESSION_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise ValueError("zstd-compressed model received but zstandard is not installed")
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+        elif compression == COMPRESSION_GZIP:
+            reader = gzip.GzipFile(fileobj=f, mode="rb")
+        else:
+            raise ValueError(f"Unknown compression: {compression}")
+        
+        sha256 = hashlib.sha256()
+        size = 0
+        with reader:
+            for block in iter(lambda: reader.read(CHECKSUM_READ_SIZE), b""):
+                out.write(block)
+                sha256.update(block)
+                size += len(block)
+        out.flush()
+        os.fsync(out.fileno())
+    return size, sha256.hexdigest()
+
+
+def _sha256_digest(data: bytes) -> bytes:
+    """Raw SHA256 of a chunk payload; hashlib releases the GIL for large buffers."""
+    return hashlib.sha256(data).digest()
+
+
+def _chunk_checksums(batch: List[bytes]) -> List[Tuple[bytes, int]]:
+    """(SHA256 digest, CRC32) for a run of chunk payloads, in one pool task."""
+    sha256, crc32 = hashlib.sha256, zlib.crc32
+    return [(sha256(data).digest(), crc32(data)) for data in batch]
 
 
 @dataclass
-class ModelPackage:
+class ModelHeader:
     """
-    A packaged model ready for transfer.
+    Manifest and transfer metadata of a model, without its payload.
     
-    Contains the model file (possibly compressed) plus manifest.
+    Small enough to send on its own; serializing it never touches the
+    model bytes.
     """
     manifest: ModelManifest
-    data: bytes
     compressed: bool = False
     original_size: int = 0
     chunk_count: int = 1
+    compression: str = COMPRESSION_GZIP  # Codec used when compressed
     
     def to_dict(self) -> dict:
         return {
             "manifest": self.manifest.to_dict(),
-            "data_base64": base64.b64encode(self.data).decode(),
             "compressed": self.compressed,
             "original_size": self.original_size,
             "chunk_count": self.chunk_count,
+            "compression": self.compression,
         }
     
     @classmethod
-    def from_dict(cls, data: dict) -> "ModelPackage":
+    def from_dict(cls, data: dict) -> "ModelHeader":
         return cls(
             manifest=ModelManifest.from_dict(data["manifest"]),
-            data=base64.b64decode(data["data_base64"]),
             compressed=data.get("compressed", False),
             original_size=data.get("original_size", 0),
             chunk_count=data.get("chunk_count", 1),
+            compression=data.get("compression", COMPRESSION_GZIP),
         )
     
     def to_json(self) -> str:
         return json.dumps(self.to_dict())
     
+    @classmethod
+    def from_json(cls, json_str: str) -> "ModelHeader":
+        return cls.from_dict(json.loads(json_str))
+
+
+@dataclass
+class ModelPackage:
+    """
+    A packaged model ready for transfer.
+    
+    Contains the model file (possibly compressed) plus manifest.
+    """
+    manifest: ModelManifest
+    data: bytes
+    compressed: bool = False
+    original_size: int = 0
+    chunk_count: int = 1
+    compression: str = COMPRESSION_GZIP  # Codec used when compressed
+    
+    @property
+    def header(self) -> ModelHeader:
+        """Everything but the payload."""
+        return ModelHeader(
+            manifest=self.manifest,
+            compressed=self.compressed,
+            original_size=self.original_size,
+            chunk_count=self.chunk_count,
+            compression=self.compression,
+        )
+    
+    def _header(self) -> dict:
+        return self.header.to_dict()
+    
+    @classmethod
+    def _from_header(cls, header: dict, data: bytes) -> "ModelPackage":
+        h = ModelHeader.from_dict(header)
+        return cls(
+            manifest=h.manifest,
+            data=data,
+            compressed=h.compressed,
+            original_size=h.original_size,
+            chunk_count=h.chunk_count,
+            compression=h.compression,
+        )
+    
+    def to_dict(self) -> dict:
+        return {**self._header(), "data_base64": base64.b64encode(self.data).decode()}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ModelPackage":
+        return cls._from_header(data, base64.b64decode(data["data_base64"]))
+    
+    def to_bytes(self) -> bytes:
+        """Binary transfer format: payload bytes are sent raw, not base64."""
+        return _frame(self._header(), self.data)
+    
+    @classmethod
+    def from_bytes(cls, frame: bytes) -> "ModelPackage":
+        return cls._from_header(*_unframe(frame))
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+    
     @classmethod
     def from_json(cls, json_str: str) -> "ModelPackage":
         return cls.from_dict(json.loads(json_str))
@@ -73,54 +236,219 @@ class ModelPackage:
 class ModelChunk:
     """
     A chunk of a model package for streaming transfer.
+    
+    The first chunk of a transfer carries the model header, so the
+    receiver learns the manifest and how to decompress without a
+    separate message. The SHA256 is kept raw; binary frames carry it
+    as 32 bytes ahead of the data, and only the dict form uses hex.
+    A CRC32 rides along so receivers that verify the whole model at
+    the end can skip the per-chunk SHA256, and every chunk names the
+    sender's chunk size so a receiver can lay out its spool from
+    whichever chunk arrives first.
     """
     model_name: str
     model_version: str
     chunk_index: int
     total_chunks: int
     data: bytes
-    checksum: str  # SHA256 of this chunk
+    digest: bytes  # Raw SHA256 of this chunk
+    header: Optional[ModelHeader] = None
+    crc32: Optional[int] = None  # Absent from older peers
+    chunk_size: Optional[int] = None  # Sender's chunk size; absent from older peers
     
-    def to_dict(self) -> dict:
-        return {
+    @property
+    def checksum(self) -> str:
+        """Hex SHA256 of this chunk, for logs and the dict form."""
+        return self.digest.hex()
+    
+    def _header(self) -> dict:
+        header = {
             "model_name": self.model_name,
             "model_version": self.model_version,
             "chunk_index": self.chunk_index,
             "total_chunks": self.total_chunks,
-            "data_base64": base64.b64encode(self.data).decode(),
+        }
+        if self.crc32 is not None:
+            header["crc32"] = self.crc32
+        if self.chunk_size is not None:
+            header["chunk_size"] = self.chunk_size
+        if self.header is not None:
+            header["header"] = self.header.to_dict()
+        return header
+    
+    @classmethod
+    def _from_header(cls, header: dict, data: bytes, digest: bytes) -> "ModelChunk":
+        model_header = header.get("header")
+        return cls(
+            model_name=header["model_name"],
+            model_version=header["model_version"],
+            chunk_index=header["chunk_index"],
+            total_chunks=header["total_chunks"],
+            data=data,
+            digest=digest,
+            header=ModelHeader.from_dict(model_header) if model_header else None,
+            crc32=header.get("crc32"),
+            chunk_size=header.get("chunk_size"),
+        )
+    
+    def to_dict(self) -> dict:
+        return {
+            **self._header(),
             "checksum": self.checksum,
+            "data_base64": base64.b64encode(self.data).decode(),
         }
     
     @classmethod
     def from_dict(cls, data: dict) -> "ModelChunk":
-        return cls(
-            model_name=data["model_name"],
-            model_version=data["model_version"],
-            chunk_index=data["chunk_index"],
-            total_chunks=data["total_chunks"],
-            data=base64.b64decode(data["data_base64"]),
-            checksum=data["checksum"],
+        return cls._from_header(
+            data, base64.b64decode(data["data_base64"]), bytes.fromhex(data["checksum"])
         )
     
-    def verify(self) -> bool:
-        """Verify chunk checksum."""
-        computed = hashlib.sha256(self.data).hexdigest()
-        return computed == self.checksum
+    def to_bytes(self) -> bytes:
+        """Binary transfer format: digest and chunk bytes are sent raw, not encoded."""
+        return _frame(self._header(), self.digest, self.data)
+    
+    @classmethod
+    def from_bytes(cls, frame: bytes) -> "ModelChunk":
+        header, payload = _unframe(frame)
+        if "checksum" in header:
+            # Frames from peers that put a hex checksum in the header
+            return cls._from_header(header, payload, bytes.fromhex(header["checksum"]))
+        return cls._from_header(header, payload[_DIGEST_SIZE:], bytes(payload[:_DIGEST_SIZE]))
+    
+    def verify(self, authenticate: bool = True) -> bool:
+        """
+        Verify chunk checksum.
+        
+        Args:
+            authenticate: Check the SHA256; otherwise a CRC32 integrity
+                check is enough when the sender provided one
+        """
+        if not authenticate and self.crc32 is not None:
+            return zlib.crc32(self.data) == self.crc32
+        return hashlib.sha256(self.data).digest() == self.digest
+
+
+class _Inflater:
+    """
+    Decompresses a transfer's payload into a file as its chunks arrive.
+    
+    Chunks must be fed in order. The output is hashed as it is written,
+    so completing the transfer needs no second pass over the model.
+    """
+    
+    def __init__(self, compression: str, spool_dir: Optional[Path], prefix: str, limit: int = 0):
+        if compression == COMPRESSION_ZSTD and ZSTD_AVAILABLE:
+            self._dobj = zstandard.ZstdDecompressor().decompressobj()
+        elif compression == COMPRESSION_GZIP:
+            self._dobj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            raise ValueError(f"Can't stream {compression} payloads")
+        if not (hasattr(self._dobj, "unused_data") and hasattr(self._dobj, "eof")):
+            # Older zstandard releases can't tell where the stream ends
+            raise ValueError(f"Installed {compression} decompressor can't stream payloads")
+        
+        self._out = tempfile.NamedTemporaryFile(
+            dir=spool_dir, prefix=prefix, suffix=".inflated", delete=False,
+        )
+        self.path = Path(self._out.name)
+        self._limit = limit
+        self._sha256 = hashlib.sha256()
+        self._size = 0
+    
+    def feed(self, data: bytes) -> None:
+        """Decompress the next chunk of the payload into the output."""
+        block = self._dobj.decompress(data)
+        if self._dobj.unused_data:
+            raise ValueError("Payload holds more than one compressed stream")
+        self._size += len(block)
+        if self._limit and self._size > self._limit:
+            raise ValueError("Size mismatch after decompression")
+        self._out.write(block)
+        self._sha256.update(block)
+    
+    def finish(self) -> Tuple[int, str]:
+        """Sync and close the output; returns its size and SHA256."""
+        if not self._dobj.eof:
+            raise ValueError("Compressed payload ended early")
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self._out.close()
+        return self._size, self._sha256.hexdigest()
+    
+    def discard(self) -> None:
+        """Close and delete the output file."""
+        self._out.close()
+        self.path.unlink(missing_ok=True)
 
 
 @dataclass
 class TransferSession:
     """
     Tracks an in-progress model transfer.
+    
+    Chunks are written at their offsets into a spool file in spool_dir
+    (the system temp dir if unset) as they arrive, so a transfer never
+    holds the model in memory and completing it is a rename rather
+    than a write of the whole model. Compressed payloads are also
+    decompressed as the in-order prefix of chunks grows, with chunks
+    that arrived early read back from the spool, so decompression
+    overlaps the transfer instead of following it.
     """
     model_name: str
     model_version: str
     total_chunks: int
     manifest: Optional[ModelManifest] = None
-    received_chunks: Dict[int, bytes] = field(default_factory=dict)
+    received_chunks: Set[int] = field(default_factory=set)
     started_at: datetime = field(default_factory=datetime.now)
     compressed: bool = False
     original_size: int = 0
+    compression: str = COMPRESSION_GZIP
+    chunk_size: int = CHUNK_SIZE
+    spool_dir: Optional[Path] = None
+    spool_path: Optional[Path] = field(default=None, init=False)
+    _spool: Optional[BinaryIO] = field(default=None, init=False, repr=False, compare=False)
+    _size: int = field(default=0, init=False, repr=False)
+    _inflater: Optional[_Inflater] = field(default=None, init=False, repr=False, compare=False)
+    _inflated: Optional[int] = field(default=0, init=False, repr=False)  # None once abandoned
+    
+    def __post_init__(self):
+        # The layout comes from the sender; a payload never exceeds the
+        # model size its manifest declares, so refuse layouts far beyond it
+        declared = self.original_size or (self.manifest.size_bytes if self.manifest else 0)
+        capacity = self.total_chunks * self.chunk_size
+        if self.total_chunks <= 0 or self.chunk_size <= 0 or (
+            declared and capacity > 2 * declared + self.chunk_size
+        ):
+            raise ValueError(
+                f"Transfer layout of {self.total_chunks} x {self.chunk_size} bytes "
+                f"doesn't fit the declared size of {declared} bytes"
+            )
+        
+        if self.spool_dir is not None:
+            Path(self.spool_dir).mkdir(parents=True, exist_ok=True)
+        self._spool = tempfile.NamedTemporaryFile(
+            dir=self.spool_dir, prefix=f".{self.model_name}-{self.model_version}-",
+            suffix=".part", delete=False,
+        )
+        self.spool_path = Path(self._spool.name)
+        
+        # Reserve the space up front so a full disk fails the first chunk,
+        # not the last; without a declared size nothing is reserved
+        reserve = min(capacity, declared)
+        if reserve and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(self._spool.fileno(), 0, reserve)
+            except OSError:
+                self.discard()
+                raise
+    
+    def apply_header(self, header: ModelHeader) -> None:
+        """Take the manifest and compression details from a model header."""
+        self.manifest = self.manifest or header.manifest
+        self.compressed = header.compressed
+        self.original_size = header.original_size
+        self.compression = header.compression
     
     @property
     def complete(self) -> bool:
@@ -131,21 +459,113 @@ class TransferSession:
         return len(self.received_chunks) / self.total_chunks if self.total_chunks > 0 else 0
     
     def add_chunk(self, chunk: ModelChunk) -> bool:
-        """Add a received chunk. Returns True if transfer is now complete."""
-        if not chunk.verify():
+        """Add a received chunk. Returns True if this chunk completed the transfer."""
+        if chunk.chunk_index in self.received_chunks:
+            # Retransmits may arrive while the spool is being finished
+            return False
+        
+        # A manifest checksum authenticates the whole model on completion,
+        # so each chunk only needs an integrity check
+        authenticate = not (self.manifest and self.manifest.checksum_sha256)
+        if not chunk.verify(authenticate):
             logger.warning(f"Chunk {chunk.chunk_index} failed verification")
             return False
         
-        self.received_chunks[chunk.chunk_index] = chunk.data
+        index, size = chunk.chunk_index, len(chunk.data)
+        is_last = index == self.total_chunks - 1
+        if not 0 <= index < self.total_chunks or size > self.chunk_size or (
+            not is_last and size != self.chunk_size
+        ):
+            logger.warning(
+                f"Chunk {index} of {size} bytes doesn't fit the session's "
+                f"{self.total_chunks} x {self.chunk_size} byte layout"
+            )
+            return False
+        
+        start = index * self.chunk_size
+        self._spool.seek(start)
+        self._spool.write(chunk.data)
+        if is_last:
+            self._size = start + size
+        if chunk.header is not None:
+            self.apply_header(chunk.header)
+        self.received_chunks.add(index)
+        if self.compressed and index == self._inflated:
+            self._inflate(chunk.data)
         return self.complete
     
-    def assemble(self) -> bytes:
-        """Assemble all chunks into complete data."""
+    def _inflate(self, data: bytes) -> None:
+        """Decompress the next in-order chunk and any spooled ones after it."""
+        try:
+            if self._inflater is None:
+                self._inflater = _Inflater(
+                    self.compression, self.spool_dir,
+                    prefix=f".{self.model_name}-{self.model_version}-",
+                    limit=self.original_size,
+                )
+            while True:
+                self._inflater.feed(data)
+                self._inflated += 1
+                if self._inflated not in self.received_chunks:
+                    return
+                start = self._inflated * self.chunk_size
+                end = self._size if self._inflated == self.total_chunks - 1 else start + self.chunk_size
+                self._spool.seek(start)
+                data = self._spool.read(end - start)
+        except Exception as e:
+            # Completing the transfer decompresses the spool instead
+            logger.debug(f"Not streaming decompression for {self.model_name}: {e}")
+            self._inflated = None
+            if self._inflater is not None:
+                self._inflater.discard()
+                self._inflater = None
+    
+    def finish_inflated(self) -> Optional[Tuple[Path, int, str]]:
+        """
+        Finish a payload decompressed while it arrived.
+        
+        Returns:
+            (path, size, SHA256) of the decompressed model, or None if
+            it wasn't streamed and the spool must be decompressed
+        """
+        if self._inflater is None or self._inflated != self.total_chunks:
+            return None
+        try:
+            size, checksum = self._inflater.finish()
+        except Exception as e:
+            logger.debug(f"Streamed decompression of {self.model_name} incomplete: {e}")
+            self._inflater.discard()
+            self._inflater = None
+            return None
+        return self._inflater.path, size, checksum
+    
+    def finish(self) -> Path:
+        """Trim, sync and close the spool of a complete transfer; returns its path."""
         if not self.complete:
             raise ValueError("Transfer not complete")
         
-        parts = [self.received_chunks[i] for i in range(self.total_chunks)]
-        return b"".join(parts)
+        if self._spool is not None:
+            self._spool.truncate(self._size)
+            self._spool.flush()
+            os.fsync(self._spool.fileno())
+            self._spool.close()
+            self._spool = None
+        return self.spool_path
+    
+    def assemble(self) -> bytes:
+        """Read the assembled data back from the spool."""
+        return self.finish().read_bytes()
+    
+    def discard(self) -> None:
+        """Close and delete the spool file, if it still exists."""
+        if self._inflater is not None:
+            self._inflater.discard()
+            self._inflater = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if self.spool_path is not None:
+            self.spool_path.unlink(missing_ok=True)
 
 
 class ModelPackager:
@@ -179,17 +599,30 @@ class ModelPackager:
         self,
         chunk_size: int = CHUNK_SIZE,
         compress: bool = True,
-        compression_level: int = 6
+        compression_level: int = 6,
+        compression: str = COMPRESSION_GZIP,
     ):
+        if compression not in (COMPRESSION_GZIP, COMPRESSION_ZSTD):
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == COMPRESSION_ZSTD and not ZSTD_AVAILABLE:
+            raise ValueError("zstd compression requires the zstandard package")
+        
         self.chunk_size = chunk_size
         self.compress = compress
         self.compression_level = compression_level
+        self.compression = compression
         
-        # Active transfer sessions
-        self._sessions: Dict[str, TransferSession] = {}
-    
-    def _session_key(self, model_name: str, version: str) -> str:
-        return f"{model_name}:{version}"
+        # Active transfer sessions, keyed by (model_name, version)
+        self._sessions: Dict[Tuple[str, str], TransferSession] = {}
+        
+        # Pool for hashing chunks in parallel; created on first use
+        self._hash_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Compressed payloads by file identity, LRU-bounded by total size;
+        # None records that compression didn't pay off for that file
+        self._prepared: "OrderedDict[tuple, Optional[bytes]]" = OrderedDict()
+        self._prepared_bytes = 0
+        self._prepared_lock = threading.Lock()
     
     # ==================== Packaging ====================
     
@@ -208,22 +641,36 @@ class ModelPackager:
         Returns:
             ModelPackage ready for transfer
         """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._package_sync, manifest, model_path)
+    
+    def _package_sync(self, manifest: ModelManifest, model_path: Path) -> ModelPackage:
+        """Read and compress a model; runs in an executor thread."""
         model_path = Path(model_path)
         
-        # Read model data
         with open(model_path, "rb") as f:
-            data = f.read()
-        
-        original_size = len(data)
-        compressed = False
-        
-        # Compress if beneficial
-        if self.compress and original_size > COMPRESSION_THRESHOLD:
-            compressed_data = gzip.compress(data, compresslevel=self.compression_level)
-            if len(compressed_data) < original_size * 0.9:  # At least 10% savings
-                data = compressed_data
+            st = os.fstat(f.fileno())
+            original_size = st.st_size
+            compressed = False
+            
+            key = self._prepared_key(model_path, st)
+            hit, data = self._get_prepared(key)
+            if hit and data is not None:
                 compressed = True
-                logger.debug(f"Compressed {original_size} -> {len(data)} bytes")
+            else:
+                # Read model data
+                data = f.read()
+                original_size = len(data)
+                
+                # Compress if beneficial
+                if not hit and self.compress and original_size > COMPRESSION_THRESHOLD:
+                    if self._should_compress(data):
+                        compressed_data = self._compress(data)
+                        if len(compressed_data) < original_size * 0.9:  # At least 10% savings
+                            data = compressed_data
+                            compressed = True
+                            logger.debug(f"Compressed {original_size} -> {len(data)} bytes")
+                    self._put_prepared(key, data if compressed else None)
         
         return ModelPackage(
             manifest=manifest,
@@ -231,8 +678,82 @@ class ModelPackager:
             compressed=compressed,
             original_size=original_size,
             chunk_count=self._count_chunks(len(data)),
+            compression=self.compression if compressed else COMPRESSION_NONE,
+        )
+    
+    def _should_compress(self, data) -> bool:
+        """
+        Estimate whether compressing a file is worth a full pass.
+        
+        Compresses evenly spaced sample blocks so already-compressed
+        formats (quantized weights, archives) skip the trial entirely.
+        
+        Args:
+            data: File contents as bytes or a memory map
+        
+        Returns:
+            False if the samples look incompressible
+        """
+        size = len(data)
+        sample_span = COMPRESSION_SAMPLES * COMPRESSION_SAMPLE_SIZE
+        if size <= sample_span * 4:
+            # Small enough that the real trial is cheap
+            return True
+        
+        step = (size - COMPRESSION_SAMPLE_SIZE) // (COMPRESSION_SAMPLES - 1)
+        sample = b"".join(
+            data[i * step:i * step + COMPRESSION_SAMPLE_SIZE]
+            for i in range(COMPRESSION_SAMPLES)
+        )
+        ratio = len(self._compress(sample)) / len(sample)
+        if ratio >= COMPRESSION_SAMPLE_RATIO:
+            logger.debug(f"Skipping compression, sampled ratio {ratio:.2f}")
+            return False
+        return True
+    
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == COMPRESSION_ZSTD:
+            return zstandard.ZstdCompressor(
+                level=self.compression_level, threads=-1
+            ).compress(data)
+        return gzip.compress(data, compresslevel=self.compression_level, mtime=0)
+    
+    # ==================== Prepared Payload Cache ====================
+    
+    def _prepared_key(self, model_path: Path, st: os.stat_result) -> tuple:
+        """Identify a file's compressed form; any rewrite changes mtime or size."""
+        return (
+            str(model_path), st.st_mtime_ns, st.st_size,
+            self.compression, self.compression_level,
         )
     
+    def _get_prepared(self, key: tuple) -> Tuple[bool, Optional[bytes]]:
+        """Look up a compressed payload, returning (hit, payload)."""
+        if not self.compress:
+            return False, None
+        with self._prepared_lock:
+            if key not in self._prepared:
+                return False, None
+            self._prepared.move_to_end(key)
+            return True, self._prepared[key]
+    
+    def _put_prepared(self, key: tuple, payload: Optional[bytes]) -> None:
+        """Cache a compressed payload, evicting least recently used ones."""
+        size = len(payload) if payload is not None else 0
+        # Keep a single huge model from flushing everything else
+        if size > PREPARED_CACHE_BYTES // 4:
+            return
+        with self._prepared_lock:
+            old = self._prepared.pop(key, None)
+            if old is not None:
+                self._prepared_bytes -= len(old)
+            self._prepared[key] = payload
+            self._prepared_bytes += size
+            while self._prepared_bytes > PREPARED_CACHE_BYTES:
+                _, evicted = self._prepared.popitem(last=False)
+                if evicted is not None:
+                    self._prepared_bytes -= len(evicted)
+    
     async def unpackage(
         self,
         package: ModelPackage,
@@ -248,13 +769,18 @@ class ModelPackager:
         Returns:
             Path to written model file
         """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._unpackage_sync, package, dest_dir)
+    
+    def _unpackage_sync(self, package: ModelPackage, dest_dir: Path) -> Path:
+        """Decompress, verify and write a package; runs in an executor thread."""
         dest_dir = Path(dest_dir)
         dest_dir.mkdir(parents=True, exist_ok=True)
         
         # Decompress if needed
         data = package.data
         if package.compressed:
-            data = gzip.decompress(data)
+            data = _decompress(data, package.compression, package.original_size)
         
         # Verify size
         if package.original_size and len(data) != package.original_size:
@@ -279,17 +805,19 @@ class ModelPackager:
     
     def _count_chunks(self, size: int) -> int:
         """Calculate number of chunks needed."""
-        return (size + self.chunk_size - 1) // self.chunk_size
+        return -(-size // self.chunk_size)
     
     async def stream_chunks(
         self,
         manifest: ModelManifest,
         model_path: Path
-    ) -> Iterator[ModelChunk]:
+    ) -> AsyncIterator[ModelChunk]:
         """
         Stream model as chunks for transfer.
         
-        Yields ModelChunk objects for streaming to peer.
+        Yields ModelChunk objects for streaming to peer. Each chunk is
+        read, hashed and (on the first one) compressed in an executor
+        thread, so the event loop keeps serving peers meanwhile.
         
         Args:
             manifest: Model manifest
@@ -298,32 +826,175 @@ class ModelPackager:
         Yields:
             ModelChunk objects
         """
-        model_path = Path(model_path)
+        loop = asyncio.get_running_loop()
+        chunks = self.iter_chunks(manifest, model_path)
+        pending = None
+        try:
+            while True:
+                pending = loop.run_in_executor(None, next, chunks, None)
+                # Shielded so a cancelled consumer can't close the generator mid-read
+                chunk = await asyncio.shield(pending)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            if pending is not None and not pending.done():
+                pending.add_done_callback(lambda _: chunks.close())
+            else:
+                chunks.close()
+    
+    def iter_chunks(
+        self,
+        manifest: ModelManifest,
+        model_path: Path
+    ) -> Iterator[ModelChunk]:
+        """
+        Lazily yield the chunks for a model.
         
-        # Read and optionally compress
-        with open(model_path, "rb") as f:
-            data = f.read()
+        The file is memory-mapped and each chunk is sliced out as it is
+        consumed, so an uncompressed transfer only holds the chunks the
+        caller keeps. When compressing, the source is compressed chunk by
+        chunk into a spooled temporary file (in memory up to
+        MAX_INLINE_SIZE, on disk beyond) and the chunks are read back
+        from it. Compressed payloads small enough for the prepared cache
+        are kept there, so sending the same file again skips compression;
+        larger ones are chunked from the spool and never held in memory.
         
-        if self.compress and len(data) > COMPRESSION_THRESHOLD:
-            compressed = gzip.compress(data, compresslevel=self.compression_level)
-            if len(compressed) < len(data) * 0.9:
-                data = compressed
+        Args:
+            manifest: Model manifest
+            model_path: Path to model file
         
-        total_chunks = self._count_chunks(len(data))
+        Yields:
+            ModelChunk objects
+        """
+        for header, index, data in self._iter_chunk_data(manifest, model_path):
+            yield self._make_chunk(header, index, data)
+    
+    def prepare_chunks(self, manifest: ModelManifest, model_path: Path) -> None:
+        """
+        Compress a model into the prepared cache ahead of several transfers.
+        
+        Later iter_chunks/stream_chunks calls for the same file then skip
+        compression and slice the cached payload. No chunks are built;
+        payloads too large for the cache, or not worth compressing, are
+        left for each transfer to stream as usual.
+        
+        Args:
+            manifest: Model manifest
+            model_path: Path to model file
+        """
+        if not self.compress:
+            return
+        # Compression and caching happen before the first chunk is yielded
+        data = self._iter_chunk_data(manifest, model_path)
+        try:
+            next(data, None)
+        finally:
+            data.close()
+    
+    def _iter_chunk_data(
+        self, manifest: ModelManifest, model_path: Path
+    ) -> Iterator[Tuple[ModelHeader, int, bytes]]:
+        """Yield (header, index, data) for each chunk of a model file."""
+        def layout(payload_size: int, compressed: bool) -> ModelHeader:
+            return ModelHeader(
+                manifest=manifest,
+                compressed=compressed,
+                original_size=size,
+                chunk_count=self._count_chunks(payload_size),
+                compression=self.compression if compressed else COMPRESSION_NONE,
+            )
         
-        for i in range(total_chunks):
-            start = i * self.chunk_size
-            end = min(start + self.chunk_size, len(data))
-            chunk_data = data[start:end]
+        with open(model_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            if size == 0:
+                # Empty files can't be mapped and produce no chunks
+                return
             
-            yield ModelChunk(
-                model_name=manifest.name,
-                model_version=manifest.version,
-                chunk_index=i,
-                total_chunks=total_chunks,
-                data=chunk_data,
-                checksum=hashlib.sha256(chunk_data).hexdigest(),
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if self.compress and size > COMPRESSION_THRESHOLD:
+                    key = self._prepared_key(Path(model_path), st)
+                    hit, payload = self._get_prepared(key)
+                    if not hit and not self._should_compress(mapped):
+                        self._put_prepared(key, None)
+                    elif not hit:
+                        with tempfile.SpooledTemporaryFile(max_size=MAX_INLINE_SIZE) as spool:
+                            compressed_size = self._compress_to(mapped, spool)
+                            spool.seek(0)
+                            if compressed_size >= size * 0.9:
+                                self._put_prepared(key, None)
+                            elif compressed_size > PREPARED_CACHE_BYTES // 4:
+                                # Too large to cache; chunk straight from the spool
+                                header = layout(compressed_size, True)
+                                for i in range(header.chunk_count):
+                                    yield header, i, spool.read(self.chunk_size)
+                                return
+                            else:
+                                payload = spool.read()
+                                self._put_prepared(key, payload)
+                    
+                    if payload is not None:
+                        header = layout(len(payload), True)
+                        for i in range(header.chunk_count):
+                            start = i * self.chunk_size
+                            yield header, i, payload[start:start + self.chunk_size]
+                        return
+                
+                header = layout(size, False)
+                for i in range(header.chunk_count):
+                    start = i * self.chunk_size
+                    yield header, i, mapped[start:start + self.chunk_size]
+    
+    def _compress_to(self, source: mmap.mmap, out: BinaryIO) -> int:
+        """Compress a mapped file into `out` one chunk at a time; returns the compressed size."""
+        if self.compression == COMPRESSION_ZSTD:
+            cctx = zstandard.ZstdCompressor(level=self.compression_level, threads=-1)
+            with cctx.stream_writer(out, size=len(source), closefd=False) as writer:
+                for start in range(0, len(source), self.chunk_size):
+                    writer.write(source[start:start + self.chunk_size])
+            return out.tell()
+        
+        with gzip.GzipFile(
+            filename="", mode="wb", fileobj=out,
+            compresslevel=self.compression_level, mtime=0,
+        ) as gz:
+            for start in range(0, len(source), self.chunk_size):
+                gz.write(source[start:start + self.chunk_size])
+        return out.tell()
+    
+    def _make_chunk(
+        self,
+        header: ModelHeader,
+        index: int,
+        data: bytes,
+        digest: Optional[bytes] = None,
+        crc: Optional[int] = None,
+    ) -> ModelChunk:
+        return ModelChunk(
+            model_name=header.manifest.name,
+            model_version=header.manifest.version,
+            chunk_index=index,
+            total_chunks=header.chunk_count,
+            data=data,
+            digest=digest or _sha256_digest(data),
+            crc32=zlib.crc32(data) if crc is None else crc,
+            header=header if index == 0 else None,
+            chunk_size=self.chunk_size,
+        )
+    
+    def _hash_pool(self) -> ThreadPoolExecutor:
+        if self._hash_executor is None:
+            self._hash_executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count(), thread_name_prefix="chunk-hash"
             )
+        return self._hash_executor
+    
+    def close(self) -> None:
+        """Shut down the chunk hashing pool, if one was started."""
+        if self._hash_executor is not None:
+            self._hash_executor.shutdown(wait=False)
+            self._hash_executor = None
     
     def create_chunks(
         self,
@@ -333,6 +1004,13 @@ class ModelPackager:
         """
         Create all chunks for a model (non-streaming version).
         
+        Since every chunk is materialized anyway, the checksums are
+        computed on a thread pool; hashlib and zlib release the GIL while
+        digesting, so this scales with the number of cores. Chunks are
+        handed out in one contiguous run per task rather than one task
+        per chunk, which keeps scheduling overhead out of the loop for
+        models with hundreds of thousands of chunks.
+        
         Args:
             manifest: Model manifest
             model_path: Path to model file
@@ -340,34 +1018,24 @@ class ModelPackager:
         Returns:
             List of ModelChunk objects
         """
-        model_path = Path(model_path)
-        chunks = []
+        chunk_data = list(self._iter_chunk_data(manifest, model_path))
+        if len(chunk_data) <= 1:
+            return [self._make_chunk(*item) for item in chunk_data]
         
-        with open(model_path, "rb") as f:
-            data = f.read()
-        
-        if self.compress and len(data) > COMPRESSION_THRESHOLD:
-            compressed = gzip.compress(data, compresslevel=self.compression_level)
-            if len(compressed) < len(data) * 0.9:
-                data = compressed
-        
-        total_chunks = self._count_chunks(len(data))
-        
-        for i in range(total_chunks):
-            start = i * self.chunk_size
-            end = min(start + self.chunk_size, len(data))
-            chunk_data = data[start:end]
-            
-            chunks.append(ModelChunk(
-                model_name=manifest.name,
-                model_version=manifest.version,
-                chunk_index=i,
-                total_chunks=total_chunks,
-                data=chunk_data,
-                checksum=hashlib.sha256(chunk_data).hexdigest(),
-            ))
-        
-        return chunks
+        payloads = [data for _, _, data in chunk_data]
+        tasks = (os.cpu_count() or 1) * 4
+        run = -(-len(payloads) // tasks)
+        checksums = self._hash_pool().map(
+            _chunk_checksums,
+            [payloads[start:start + run] for start in range(0, len(payloads), run)],
+        )
+        make_chunk = self._make_chunk
+        return [
+            make_chunk(header, index, data, digest, crc)
+            for (header, index, data), (digest, crc) in zip(
+                chunk_data, (item for batch in checksums for item in batch)
+            )
+        ]
     
     # ==================== Receiving ====================
     
@@ -378,7 +1046,10 @@ class ModelPackager:
         total_chunks: int,
         manifest: ModelManifest = None,
         compressed: bool = False,
-        original_size: int = 0
+        original_size: int = 0,
+        compression: str = COMPRESSION_GZIP,
+        chunk_size: Optional[int] = None,
+        spool_dir: Optional[Path] = None,
     ) -> TransferSession:
         """
         Start a new transfer session.
@@ -390,12 +1061,14 @@ class ModelPackager:
             manifest: Optional model manifest
             compressed: Whether data is compressed
             original_size: Original uncompressed size
+            compression: Codec the sender compressed with
+            chunk_size: Sender's chunk size (defaults to this packager's)
+            spool_dir: Where to spool chunks; ideally the destination
+                directory, so completing the transfer is a rename
         
         Returns:
             TransferSession to track progress
         """
-        key = self._session_key(model_name, version)
-        
         session = TransferSession(
             model_name=model_name,
             model_version=version,
@@ -403,16 +1076,22 @@ class ModelPackager:
             manifest=manifest,
             compressed=compressed,
             original_size=original_size,
+            compression=compression,
+            chunk_size=chunk_size or self.chunk_size,
+            spool_dir=spool_dir,
         )
         
-        self._sessions[key] = session
+        replaced = self._sessions.get((model_name, version))
+        if replaced is not None:
+            replaced.discard()
+        self._sessions[(model_name, version)] = session
         logger.info(f"Started transfer session for {model_name}:{version}, expecting {total_chunks} chunks")
         
         return session
     
     def get_session(self, model_name: str, version: str) -> Optional[TransferSession]:
         """Get an existing transfer session."""
-        return self._sessions.get(self._session_key(model_name, version))
+        return self._sessions.get((model_name, version))
     
     def receive_chunk(self, session: TransferSession, chunk: ModelChunk) -> bool:
         """
@@ -445,45 +1124,63 @@ class ModelPackager:
         if not session.complete:
             raise ValueError("Transfer not complete")
         
-        # Assemble data
-        data = session.assemble()
-        
-        # Decompress if needed
-        if session.compressed:
-            data = gzip.decompress(data)
-            
-            if session.original_size and len(data) != session.original_size:
-                raise ValueError(f"Size mismatch after decompression")
+        loop = asyncio.get_running_loop()
+        try:
+            dest_path = await loop.run_in_executor(None, self._write_session, session, dest_dir)
+        finally:
+            # The spool is consumed either way, so the session is done;
+            # leave any newer session for the same model alone
+            key = (session.model_name, session.model_version)
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
         
-        # Verify checksum if manifest available
-        if session.manifest and session.manifest.checksum_sha256:
-            checksum = hashlib.sha256(data).hexdigest()
-            if checksum != session.manifest.checksum_sha256:
-                raise ValueError("Checksum verification failed")
-        
-        # Write file
+        logger.info(f"Completed transfer: {dest_path}")
+        return dest_path
+    
+    def _write_session(self, session: TransferSession, dest_dir: Path) -> Path:
+        """Verify a session's spool and move it into place; runs in an executor thread."""
         dest_dir = Path(dest_dir)
         dest_dir.mkdir(parents=True, exist_ok=True)
         
         suffix = Path(session.manifest.file).suffix if session.manifest else ".model"
         filename = f"{session.model_name}-{session.model_version}{suffix}"
         dest_path = dest_dir / filename
+        expected = session.manifest.checksum_sha256 if session.manifest else None
         
-        with open(dest_path, "wb") as f:
-            f.write(data)
-        
-        # Clean up session
-        key = self._session_key(session.model_name, session.model_version)
-        self._sessions.pop(key, None)
+        inflated = session.finish_inflated()
+        staged = spool_path = session.spool_path if inflated else session.finish()
+        try:
+            # Decompress if needed, streaming next to the destination
+            if session.compressed:
+                if inflated:
+                    # Already decompressed as the chunks arrived
+                    staged, size, checksum = inflated
+                else:
+                    staged = dest_dir / f".{filename}.part"
+                    size, checksum = _decompress_file(spool_path, staged, session.compression)
+                if session.original_size and size != session.original_size:
+                    raise ValueError(f"Size mismatch after decompression")
+            else:
+                checksum = file_sha256(spool_path) if expected else None
+            
+            # Verify checksum if manifest available
+            if expected and checksum != expected:
+                raise ValueError("Checksum verification failed")
+            
+            # A rename when the spool shares the destination's filesystem
+            shutil.move(staged, dest_path)
+        finally:
+            if staged != spool_path:
+                staged.unlink(missing_ok=True)
+            session.discard()
         
-        logger.info(f"Completed transfer: {dest_path}")
         return dest_path
     
     def cancel_transfer(self, model_name: str, version: str) -> None:
         """Cancel an in-progress transfer."""
-        key = self._session_key(model_name, version)
-        if key in self._sessions:
-            del self._sessions[key]
+        session = self._sessions.pop((model_name, version), None)
+        if session is not None:
+            session.discard()
             logger.info(f"Cancelled transfer for {model_name}:{version}")
     
     # ==================== Utilities ====================
@@ -5,24 +5,65 @@ Tracks available models, their metadata, versions, and which nodes have them.
 Supports both local registry and mesh-wide model discovery.
 """
 
+import asyncio
 import hashlib
 import json
 import logging
+import mmap
 import os
 import shutil
+import time
+import weakref
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import yaml
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# libyaml's C loader and dumper when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as _YamlDumper, CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper, SafeLoader as _YamlLoader
+
 logger = logging.getLogger(__name__)
 
 # Default paths
 DEFAULT_MODELS_DIR = Path.home() / ".atmosphere" / "models"
-DEFAULT_REGISTRY_FILE = DEFAULT_MODELS_DIR / "registry.yaml"
+DEFAULT_REGISTRY_FILE = DEFAULT_MODELS_DIR / "registry.json"
+YAML_SUFFIXES = (".yaml", ".yml")  # Registry files in the original YAML format
 LLAMAFARM_MODELS_DIR = Path.home() / ".llamafarm" / "models"
 
+# Block size for streaming a model file through a hash
+CHECKSUM_READ_SIZE = 1024 * 1024
+
+# Seconds a LlamaFarm scan is served before it is refreshed in the background
+SCAN_CACHE_TTL = 30.0
+
+# Model file extensions scan_llamafarm picks up
+LLAMAFARM_MODEL_EXTENSIONS = frozenset({".joblib", ".pkl", ".onnx", ".pt", ".pth", ".safetensors"})
+
+# Bulk imports in flight; hashing releases the GIL, so this scales with
+# cores, and copies are I/O bound, so it never drops below 8
+IMPORT_CONCURRENCY = max(8, os.cpu_count() or 1)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    """Parse a serialized ISO timestamp; None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return None
+
 
 @dataclass
 class NodeRequirements:
@@ -42,11 +83,12 @@ class NodeRequirements:
     
     @classmethod
     def from_dict(cls, data: dict) -> "NodeRequirements":
+        get = data.get
         return cls(
-            min_memory_mb=data.get("min_memory_mb", 512),
-            min_cpu_cores=data.get("min_cpu_cores", 1),
-            gpu_required=data.get("gpu_required", False),
-            architectures=data.get("architectures", ["x86_64", "arm64"]),
+            min_memory_mb=get("min_memory_mb", 512),
+            min_cpu_cores=get("min_cpu_cores", 1),
+            gpu_required=get("gpu_required", False),
+            architectures=get("architectures", ["x86_64", "arm64"]),
         )
 
 
@@ -106,47 +148,51 @@ class ModelManifest:
     
     @classmethod
     def from_dict(cls, data: dict) -> "ModelManifest":
-        trained_on = None
-        if data.get("trained_on"):
-            try:
-                trained_on = datetime.fromisoformat(data["trained_on"])
-            except (ValueError, TypeError):
-                pass
-        
-        node_req = data.get("node_requirements", {})
+        get = data.get
+        node_req = get("node_requirements", {})
         if isinstance(node_req, dict):
             node_req = NodeRequirements.from_dict(node_req)
         
         return cls(
             name=data["name"],
             version=data["version"],
-            type=data.get("type", "unknown"),
-            file=data.get("file", ""),
-            format=data.get("format", "sklearn"),
-            size_bytes=data.get("size_bytes", 0),
-            checksum_sha256=data.get("checksum_sha256", ""),
-            trained_on=trained_on,
-            training_data_domain=data.get("training_data_domain", ""),
-            training_node=data.get("training_node", ""),
-            requirements=data.get("requirements", []),
-            capabilities=data.get("capabilities", []),
+            type=get("type", "unknown"),
+            file=get("file", ""),
+            format=get("format", "sklearn"),
+            size_bytes=get("size_bytes", 0),
+            checksum_sha256=get("checksum_sha256", ""),
+            trained_on=_parse_datetime(get("trained_on")),
+            training_data_domain=get("training_data_domain", ""),
+            training_node=get("training_node", ""),
+            requirements=get("requirements", []),
+            capabilities=get("capabilities", []),
             node_requirements=node_req,
-            config=data.get("config", {}),
-            priority=data.get("priority", "normal"),
-            roles=data.get("roles", []),
+            config=get("config", {}),
+            priority=get("priority", "normal"),
+            roles=get("roles", []),
         )
     
     def to_yaml(self) -> str:
-        return yaml.dump(self.to_dict(), default_flow_style=False)
+        return yaml.dump(self.to_dict(), Dumper=_YamlDumper, default_flow_style=False)
     
     @classmethod
     def from_yaml(cls, yaml_str: str) -> "ModelManifest":
-        return cls.from_dict(yaml.safe_load(yaml_str))
+        return cls.from_dict(yaml.load(yaml_str, Loader=_YamlLoader))
     
     @property
     def id(self) -> str:
         """Unique identifier for this model version."""
         return f"{self.name}:{self.version}"
+    
+    @cached_property
+    def capabilities_set(self) -> frozenset:
+        """Capabilities as a frozenset for O(1) membership checks."""
+        return frozenset(self.capabilities)
+    
+    @cached_property
+    def roles_set(self) -> frozenset:
+        """Roles as a frozenset for O(1) membership checks."""
+        return frozenset(self.roles)
 
 
 @dataclass
@@ -175,26 +221,14 @@ class ModelEntry:
     
     @classmethod
     def from_dict(cls, data: dict) -> "ModelEntry":
-        loaded_at = None
-        received_at = None
-        if data.get("loaded_at"):
-            try:
-                loaded_at = datetime.fromisoformat(data["loaded_at"])
-            except (ValueError, TypeError):
-                pass
-        if data.get("received_at"):
-            try:
-                received_at = datetime.fromisoformat(data["received_at"])
-            except (ValueError, TypeError):
-                pass
-        
+        get = data.get
         return cls(
             manifest=ModelManifest.from_dict(data["manifest"]),
             path=Path(data["path"]),
-            loaded=data.get("loaded", False),
-            loaded_at=loaded_at,
-            source_node=data.get("source_node", ""),
-            received_at=received_at,
+            loaded=get("loaded", False),
+            loaded_at=_parse_datetime(get("loaded_at")),
+            source_node=get("source_node", ""),
+            received_at=_parse_datetime(get("received_at")),
         )
 
 
@@ -225,6 +259,15 @@ class MeshModelInfo:
             return self.versions.get(version, set())
         return set().union(*self.versions.values())
     
+    def pick_node(self, version: str = None) -> Optional[str]:
+        """Pick a node holding the model (or version) without copying the set."""
+        if version:
+            return next(iter(self.versions.get(version, ())), None)
+        for nodes in self.versions.values():
+            if nodes:
+                return next(iter(nodes))
+        return None
+    
     def latest_version(self) -> Optional[str]:
         if not self.versions:
             return None
@@ -238,6 +281,69 @@ class MeshModelInfo:
         }
 
 
+@dataclass
+class ScannedModel:
+    """A model file found by scan_llamafarm, with its size from the scan."""
+    path: Path
+    size_bytes: int
+
+
+@dataclass
+class ModelDescription:
+    """Everything the registry knows about one model name."""
+    name: str
+    local: Optional[ModelEntry] = None
+    mesh: Optional[MeshModelInfo] = None
+    nodes: Set[str] = field(default_factory=set)
+
+
+def file_sha256(path: Path) -> str:
+    """Compute the hex SHA256 of a file without reading it into memory."""
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: reads into a reused buffer without a copy per block
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        
+        # Older Pythons: hash the mapped file in one call, which releases
+        # the GIL for the whole digest and never copies the file
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()  # Empty files can't be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def _scan_models(root: Path) -> List[ScannedModel]:
+    """
+    Find model files under a directory, sorted by path.
+    
+    Walks the tree with os.scandir, so directories and files are told
+    apart from the directory entries. Only files with a model
+    extension are stat'ed, and symlinked models are followed.
+    """
+    models: List[ScannedModel] = []
+    pending = [str(root)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() not in LLAMAFARM_MODEL_EXTENSIONS:
+                        continue
+                    try:
+                        if entry.is_file():
+                            models.append(ScannedModel(Path(entry.path), entry.stat().st_size))
+                    except OSError as e:
+                        # A broken symlink shouldn't hide the rest of the directory
+                        logger.debug(f"Skipping unreadable model file: {e}")
+        except OSError as e:
+            logger.debug(f"Skipping unreadable directory: {e}")
+    
+    models.sort(key=lambda m: m.path)
+    return models
+
+
 class ModelRegistry:
     """
     Model registry for the Atmosphere mesh.
@@ -272,32 +378,58 @@ class ModelRegistry:
         self.registry_file = Path(registry_file)
         self.node_id = node_id
         
-        # Local models on this node
-        self._local_models: Dict[str, ModelEntry] = {}  # model_id -> entry
+        # Local models on this node, model_id -> entry. Entries read from
+        # disk stay serialized dicts until first accessed; see _local_entry
+        self._local_models: Dict[str, Union[ModelEntry, dict]] = {}
+        self._all_built = True
+        
+        # Model type / capability -> local model ids, as dicts used for
+        # ordered sets; built on first use, then kept up to date
+        self._by_type: Optional[Dict[str, Dict[str, None]]] = None
+        self._by_capability: Optional[Dict[str, Dict[str, None]]] = None
+        
+        # Bumped whenever the set of local models changes, so callers can
+        # cache anything derived from list_local()
+        self.local_version = 0
         
         # Mesh-wide model knowledge
         self._mesh_models: Dict[str, MeshModelInfo] = {}  # name -> info
         
+        # (root, monotonic scan time, models) of the last LlamaFarm scan,
+        # and the background refresh replacing it, if one is running
+        self._scan_cache: Optional[Tuple[Path, float, List[ScannedModel]]] = None
+        self._scan_refresh: Optional[asyncio.Task] = None
+        
+        # Serializes copies into the same model file; entries drop out once unused
+        self._copy_locks: "weakref.WeakValueDictionary[Path, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        
         self._loaded = False
     
+    @property
+    def source_file(self) -> Path:
+        """
+        The file load() reads.
+        
+        A JSON registry file that doesn't exist yet falls back to a
+        registry.yaml next to it, which the next save() migrates.
+        """
+        path = self.registry_file
+        if not path.exists() and path.suffix not in YAML_SUFFIXES:
+            path = path.with_suffix(".yaml")
+        return path
+    
     async def load(self) -> None:
-        """Load registry from disk."""
+        """Load registry from disk (see source_file for which file)."""
         self.models_dir.mkdir(parents=True, exist_ok=True)
         
-        if self.registry_file.exists():
+        path = self.source_file
+        if path.exists():
             try:
-                with open(self.registry_file) as f:
-                    data = yaml.safe_load(f) or {}
-                
-                for model_id, entry_data in data.get("models", {}).items():
-                    self._local_models[model_id] = ModelEntry.from_dict(entry_data)
+                data = self._read_file(path) or {}
                 
-                for name, mesh_data in data.get("mesh_models", {}).items():
-                    info = MeshModelInfo(name=name)
-                    for version, nodes in mesh_data.get("versions", {}).items():
-                        for node in nodes:
-                            info.add_node(version, node)
-                    self._mesh_models[name] = info
+                self._apply_data(data)
                 
                 logger.info(f"Loaded registry: {len(self._local_models)} local, {len(self._mesh_models)} mesh models")
             except Exception as e:
@@ -306,12 +438,37 @@ class ModelRegistry:
         self._loaded = True
     
     async def save(self) -> None:
-        """Save registry to disk."""
+        """Save registry to disk, replacing the file atomically."""
         self.models_dir.mkdir(parents=True, exist_ok=True)
         
-        data = {
+        data = self.to_snapshot()
+        if self.registry_file.suffix in YAML_SUFFIXES:
+            content = yaml.dump(data, Dumper=_YamlDumper, default_flow_style=False).encode()
+        elif ORJSON_AVAILABLE:
+            content = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        else:
+            content = json.dumps(data, indent=2).encode()
+        
+        tmp_path = self.registry_file.with_name(self.registry_file.name + ".tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, self.registry_file)
+        
+        logger.debug("Registry saved")
+    
+    @staticmethod
+    def _read_file(path: Path) -> Any:
+        """Parse a registry file, as YAML or JSON by its suffix."""
+        if path.suffix in YAML_SUFFIXES:
+            with open(path) as f:
+                return yaml.load(f, Loader=_YamlLoader)
+        content = path.read_bytes()
+        return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+    
+    def to_snapshot(self) -> dict:
+        """Serialize local and mesh state to a plain dict."""
+        return {
             "models": {
-                model_id: entry.to_dict()
+                model_id: entry if isinstance(entry, dict) else entry.to_dict()
                 for model_id, entry in self._local_models.items()
             },
             "mesh_models": {
@@ -319,28 +476,130 @@ class ModelRegistry:
                 for name, info in self._mesh_models.items()
             }
         }
+    
+    @classmethod
+    def from_snapshot(cls, data: dict, **kwargs) -> "ModelRegistry":
+        """
+        Build a loaded registry from a to_snapshot() dict.
         
-        with open(self.registry_file, "w") as f:
-            yaml.dump(data, f, default_flow_style=False)
-        
-        logger.debug("Registry saved")
+        Bypasses load(); used to restore a cached registry without
+        re-parsing the registry file.
+        """
+        registry = cls(**kwargs)
+        registry._apply_data(data)
+        registry._loaded = True
+        return registry
+    
+    def _apply_data(self, data: dict) -> None:
+        """Populate local and mesh state from a serialized dict."""
+        models = data.get("models", {})
+        if models:
+            self._local_models.update(models)
+            self._all_built = False
+            self._by_type = self._by_capability = None
+        self.local_version += 1
+        
+        for name, mesh_data in data.get("mesh_models", {}).items():
+            info = MeshModelInfo(name=name)
+            for version, nodes in mesh_data.get("versions", {}).items():
+                for node in nodes:
+                    info.add_node(version, node)
+            self._mesh_models[name] = info
     
     # ==================== Local Models ====================
     
+    def _local_entry(self, model_id: str) -> Optional[ModelEntry]:
+        """
+        Get a local entry by id, building it if it is still serialized.
+        
+        The entry replaces its dict in place, so ordering is kept.
+        Unreadable entries are logged and dropped.
+        """
+        entry = self._local_models.get(model_id)
+        if isinstance(entry, dict):
+            try:
+                entry = self._local_models[model_id] = ModelEntry.from_dict(entry)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                logger.error(f"Dropping unreadable registry entry {model_id}: {e}")
+                del self._local_models[model_id]
+                return None
+        return entry
+    
+    def _local_entries(self) -> Dict[str, ModelEntry]:
+        """All local entries by id, building any that are still serialized."""
+        if not self._all_built:
+            for model_id in list(self._local_models):
+                self._local_entry(model_id)
+            self._all_built = True
+        return self._local_models
+    
+    def _local_indexes(self) -> Tuple[Dict[str, Dict[str, None]], Dict[str, Dict[str, None]]]:
+        """The (type, capability) indexes of local models, built on first use."""
+        if self._by_type is None:
+            self._by_type, self._by_capability = {}, {}
+            for model_id, entry in self._local_entries().items():
+                self._index_entry(model_id, entry)
+        return self._by_type, self._by_capability
+    
+    def _index_entry(self, model_id: str, entry: ModelEntry) -> None:
+        manifest = entry.manifest
+        self._by_type.setdefault(manifest.type, {})[model_id] = None
+        for capability in manifest.capabilities_set:
+            self._by_capability.setdefault(capability, {})[model_id] = None
+    
+    def _unindex_entry(self, model_id: str, entry: ModelEntry) -> None:
+        manifest = entry.manifest
+        for index, keys in (
+            (self._by_type, (manifest.type,)),
+            (self._by_capability, manifest.capabilities_set),
+        ):
+            for key in keys:
+                ids = index.get(key, {})
+                ids.pop(model_id, None)
+                if not ids:
+                    index.pop(key, None)
+    
     def list_local(self) -> List[ModelEntry]:
         """List all local models."""
-        return list(self._local_models.values())
+        return list(self._local_entries().values())
+    
+    def iter_local(
+        self,
+        model_type: str = None,
+        capability: str = None,
+    ) -> Iterator[ModelEntry]:
+        """
+        Iterate local models, optionally filtered by type and capability.
+        
+        Filters are answered from the type and capability indexes, and
+        entries are yielded lazily so callers can stop early.
+        """
+        if not (model_type or capability):
+            yield from self._local_entries().values()
+            return
+        
+        by_type, by_capability = self._local_indexes()
+        ids = by_type.get(model_type, {}) if model_type else by_capability.get(capability, {})
+        if model_type and capability:
+            with_capability = by_capability.get(capability, {})
+            ids = [i for i in ids if i in with_capability]
+        for model_id in ids:
+            yield self._local_models[model_id]
     
     def get_local(self, name: str, version: str = None) -> Optional[ModelEntry]:
         """Get a local model by name and optionally version."""
         if version:
-            return self._local_models.get(f"{name}:{version}")
-        
-        # Find latest version
-        matching = [
-            e for e in self._local_models.values()
-            if e.manifest.name == name
-        ]
+            return self._local_entry(f"{name}:{version}")
+        
+        # Find latest version, only building entries with a matching name
+        matching = []
+        for model_id, entry in list(self._local_models.items()):
+            if isinstance(entry, dict):
+                if (entry.get("manifest") or {}).get("name") != name:
+                    continue
+                entry = self._local_entry(model_id)
+            if entry is not None and entry.manifest.name == name:
+                matching.append(entry)
         if not matching:
             return None
         return sorted(matching, key=lambda e: e.manifest.version, reverse=True)[0]
@@ -353,25 +612,47 @@ class ModelRegistry:
         self,
         manifest: ModelManifest,
         model_path: Path,
-        source_node: str = ""
+        source_node: str = "",
+        save: bool = True,
     ) -> ModelEntry:
-        """Register a model as available locally."""
+        """
+        Register a model as available locally.
+        
+        Pass save=False when registering many models at once and call
+        save() after the batch. Concurrent registrations that copy to the
+        same file (e.g. two LlamaFarm models with the same stem) run one
+        at a time, so the file always matches the entry registered last.
+        """
         # Copy to models directory if not already there
         dest_path = self.models_dir / f"{manifest.name}-{manifest.version}{model_path.suffix}"
         
-        if model_path != dest_path:
-            shutil.copy2(model_path, dest_path)
-            logger.info(f"Copied model to {dest_path}")
-        
-        entry = ModelEntry(
-            manifest=manifest,
-            path=dest_path,
-            source_node=source_node or self.node_id,
-            received_at=datetime.now(),
-        )
-        
-        self._local_models[manifest.id] = entry
-        await self.save()
+        lock = self._copy_locks.get(dest_path)
+        if lock is None:
+            lock = self._copy_locks[dest_path] = asyncio.Lock()
+        
+        async with lock:
+            if model_path != dest_path:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, shutil.copy2, model_path, dest_path)
+                logger.info(f"Copied model to {dest_path}")
+            
+            entry = ModelEntry(
+                manifest=manifest,
+                path=dest_path,
+                source_node=source_node or self.node_id,
+                received_at=datetime.now(),
+            )
+            
+            if self._by_type is not None:
+                previous = self._local_entry(manifest.id)
+                if previous is not None:
+                    self._unindex_entry(manifest.id, previous)
+                self._index_entry(manifest.id, entry)
+            self._local_models[manifest.id] = entry
+            self.local_version += 1
+        
+        if save:
+            await self.save()
         
         logger.info(f"Registered local model: {manifest.id}")
         return entry
@@ -380,10 +661,14 @@ class ModelRegistry:
         """Unregister a local model."""
         model_id = f"{name}:{version}"
         
-        if model_id not in self._local_models:
+        entry = self._local_entry(model_id)
+        if entry is None:
             return False
         
-        entry = self._local_models.pop(model_id)
+        del self._local_models[model_id]
+        if self._by_type is not None:
+            self._unindex_entry(model_id, entry)
+        self.local_version += 1
         
         if delete_file and entry.path.exists():
             entry.path.unlink()
@@ -395,17 +680,11 @@ class ModelRegistry:
     
     def find_by_capability(self, capability: str) -> List[ModelEntry]:
         """Find local models with a specific capability."""
-        return [
-            e for e in self._local_models.values()
-            if capability in e.manifest.capabilities
-        ]
+        return list(self.iter_local(capability=capability))
     
     def find_by_type(self, model_type: str) -> List[ModelEntry]:
         """Find local models of a specific type."""
-        return [
-            e for e in self._local_models.values()
-            if e.manifest.type == model_type
-        ]
+        return list(self.iter_local(model_type=model_type))
     
     # ==================== Mesh Models ====================
     
@@ -423,6 +702,21 @@ class ModelRegistry:
             self._mesh_models[name] = MeshModelInfo(name=name)
         self._mesh_models[name].add_node(version, node_id)
     
+    def update_mesh_models_bulk(self, updates: Iterable[Tuple[str, str, str]]) -> None:
+        """
+        Update mesh knowledge for many models at once.
+        
+        Args:
+            updates: (name, version, node_id) tuples
+        """
+        mesh_models = self._mesh_models
+        now = datetime.now()
+        for name, version, node_id in updates:
+            info = mesh_models.get(name)
+            if info is None:
+                info = mesh_models[name] = MeshModelInfo(name=name, first_seen=now)
+            info.versions.setdefault(version, set()).add(node_id)
+    
     def find_nodes_with_model(self, name: str, version: str = None) -> Set[str]:
         """Find nodes that have a specific model."""
         info = self._mesh_models.get(name)
@@ -433,6 +727,16 @@ class ModelRegistry:
             return info.versions.get(version, set())
         return info.get_nodes()
     
+    def describe(self, name: str) -> ModelDescription:
+        """Collect the local entry, mesh info and nodes for a model at once."""
+        mesh = self._mesh_models.get(name)
+        return ModelDescription(
+            name=name,
+            local=self.get_local(name),
+            mesh=mesh,
+            nodes=mesh.get_nodes() if mesh else set(),
+        )
+    
     def list_available(self) -> List[MeshModelInfo]:
         """List models available in mesh that we don't have locally."""
         available = []
@@ -465,11 +769,7 @@ class ModelRegistry:
     
     def compute_checksum(self, path: Path) -> str:
         """Compute SHA256 checksum of a file."""
-        sha256 = hashlib.sha256()
-        with open(path, "rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        return file_sha256(path)
     
     async def import_model(
         self,
@@ -479,6 +779,8 @@ class ModelRegistry:
         model_type: str = "unknown",
         capabilities: List[str] = None,
         config: Dict[str, Any] = None,
+        known_size: Optional[int] = None,
+        save: bool = True,
     ) -> ModelEntry:
         """
         Import a model file into the registry.
@@ -490,18 +792,22 @@ class ModelRegistry:
             model_type: Type (anomaly_detector, classifier, etc.)
             capabilities: List of capabilities
             config: Model configuration
+            known_size: File size if already known (skips a stat)
+            save: Persist the registry after registering
         
         Returns:
             ModelEntry for the imported model
         """
         path = Path(path)
-        if not path.exists():
-            raise FileNotFoundError(f"Model file not found: {path}")
         
-        # Detect format and compute checksum
+        # Hashing opens the file, which doubles as the existence check
+        loop = asyncio.get_running_loop()
+        try:
+            checksum = await loop.run_in_executor(None, self.compute_checksum, path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Model file not found: {path}") from None
         format_type = self.detect_format(path)
-        checksum = self.compute_checksum(path)
-        size = path.stat().st_size
+        size = known_size if known_size is not None else path.stat().st_size
         
         manifest = ModelManifest(
             name=name,
@@ -516,7 +822,9 @@ class ModelRegistry:
             config=config or {},
         )
         
-        return await self.register_local(manifest, path, source_node=self.node_id)
+        return await self.register_local(
+            manifest, path, source_node=self.node_id, save=save
+        )
     
     async def import_from_llamafarm(
         self,
@@ -524,6 +832,8 @@ class ModelRegistry:
         name: str = None,
         model_type: str = None,
         capabilities: List[str] = None,
+        known_size: Optional[int] = None,
+        save: bool = True,
     ) -> ModelEntry:
         """
         Import a model from LlamaFarm's models directory.
@@ -533,6 +843,8 @@ class ModelRegistry:
             name: Name for the model (default: derived from filename)
             model_type: Type of model
             capabilities: List of capabilities
+            known_size: File size from scan_llamafarm (skips a stat)
+            save: Persist the registry after registering
         
         Returns:
             ModelEntry for the imported model
@@ -559,58 +871,123 @@ class ModelRegistry:
             name=name,
             model_type=model_type,
             capabilities=capabilities,
+            known_size=known_size,
+            save=save,
         )
     
-    async def scan_llamafarm(self, model_type: str = None) -> List[Path]:
+    async def import_from_llamafarm_many(
+        self,
+        subpaths: List[str],
+        capabilities: List[str] = None,
+        known_sizes: Optional[List[int]] = None,
+        concurrency: int = IMPORT_CONCURRENCY,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Union[ModelEntry, Exception]]:
         """
-        Scan LlamaFarm models directory for importable models.
+        Import several LlamaFarm models and save the registry once.
+        
+        Imports run concurrently (checksums and copies happen in the
+        executor), bounded by `concurrency`.
         
         Args:
-            model_type: Filter by type (anomaly, classifier, etc.)
+            subpaths: Paths relative to ~/.llamafarm/models/
+            capabilities: Capabilities to add to every model
+            known_sizes: File sizes from scan_llamafarm, same order as subpaths
+            concurrency: Max imports in flight
+            on_progress: Called as on_progress(done, total) after each import
         
         Returns:
-            List of paths to model files
+            One result per subpath: the ModelEntry, or the exception raised
+        """
+        total = len(subpaths)
+        sizes = known_sizes or [None] * total
+        sem = asyncio.Semaphore(concurrency)
+        done = 0
+        
+        async def one(subpath: str, size: Optional[int]) -> ModelEntry:
+            nonlocal done
+            async with sem:
+                try:
+                    return await self.import_from_llamafarm(
+                        subpath,
+                        capabilities=capabilities,
+                        known_size=size,
+                        save=False,
+                    )
+                finally:
+                    done += 1
+                    if on_progress:
+                        on_progress(done, total)
+        
+        results = await asyncio.gather(
+            *(one(p, size) for p, size in zip(subpaths, sizes)),
+            return_exceptions=True,
+        )
+        
+        if any(not isinstance(r, BaseException) for r in results):
+            await self.save()
+        
+        return list(results)
+    
+    async def scan_llamafarm(self, model_type: str = None) -> List[ScannedModel]:
         """
-        if not LLAMAFARM_MODELS_DIR.exists():
-            return []
+        Scan LlamaFarm models directory for importable models.
         
-        models = []
-        extensions = {".joblib", ".pkl", ".onnx", ".pt", ".pth", ".safetensors"}
+        The walk runs in the executor and its result is cached. Within
+        SCAN_CACHE_TTL the cached scan is returned as is; after that it
+        is still returned, and a refresh is started in the background.
+        Only the first scan waits on the filesystem.
         
-        for path in LLAMAFARM_MODELS_DIR.rglob("*"):
-            if path.suffix.lower() in extensions:
-                if model_type is None or model_type.lower() in path.parts:
-                    models.append(path)
+        Args:
+            model_type: Filter by type (anomaly, classifier, etc.)
         
-        return sorted(models)
+        Returns:
+            Model files sorted by path, with sizes
+        """
+        root = LLAMAFARM_MODELS_DIR
+        cache = self._scan_cache
+        if cache is None or cache[0] != root:
+            models = await self._refresh_scan(root)
+        else:
+            _, scanned_at, models = cache
+            if time.monotonic() - scanned_at > SCAN_CACHE_TTL and self._scan_refresh is None:
+                self._scan_refresh = asyncio.create_task(self._refresh_scan(root))
+        
+        if model_type:
+            type_filter = model_type.lower()
+            return [m for m in models if type_filter in m.path.parts]
+        return list(models)
+    
+    async def _refresh_scan(self, root: Path) -> List[ScannedModel]:
+        """Walk the LlamaFarm directory in the executor and cache the result."""
+        loop = asyncio.get_running_loop()
+        try:
+            models = await loop.run_in_executor(None, _scan_models, root)
+            self._scan_cache = (root, time.monotonic(), models)
+        finally:
+            self._scan_refresh = None
+        return models
     
     # ==================== Stats ====================
     
     def stats(self) -> dict:
         """Get registry statistics."""
+        entries = self._local_entries()
         total_size = sum(
-            e.manifest.size_bytes for e in self._local_models.values()
+            e.manifest.size_bytes for e in entries.values()
         )
         
         return {
-            "local_models": len(self._local_models),
+            "local_models": len(entries),
             "mesh_models": len(self._mesh_models),
             "total_size_bytes": total_size,
-            "loaded_count": sum(1 for e in self._local_models.values() if e.loaded),
+            "loaded_count": sum(1 for e in entries.values() if e.loaded),
             "by_type": self._count_by_type(),
             "by_capability": self._count_by_capability(),
         }
     
     def _count_by_type(self) -> Dict[str, int]:
-        counts: Dict[str, int] = {}
-        for entry in self._local_models.values():
-            t = entry.manifest.type
-            counts[t] = counts.get(t, 0) + 1
-        return counts
+        return {t: len(ids) for t, ids in self._local_indexes()[0].items()}
     
     def _count_by_capability(self) -> Dict[str, int]:
-        counts: Dict[str, int] = {}
-        for entry in self._local_models.values():
-            for cap in entry.manifest.capabilities:
-                counts[cap] = counts.get(cap, 0) + 1
-        return counts
+        return {cap: len(ids) for cap, ids in self._local_indexes()[1].items()}
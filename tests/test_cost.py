@@ -309,6 +309,26 @@ class TestCostGossipState:
         assert len(fresh) == 0
 
 
+    def test_get_many(self):
+        """Test batched lookup matches per-node lookup."""
+        state = CostGossipState()
+        
+        for node_id in ("node-a", "node-b"):
+            state.handle_cost_update({
+                "type": "NODE_COST_UPDATE",
+                "version": 1,
+                "node_id": node_id,
+                "timestamp": time.time(),
+                "cost_factors": {"cpu_load": 0.3},
+            })
+        
+        result = state.get_many(["node-a", "node-b", "missing"])
+        
+        assert result["node-a"] is state.get_node_cost("node-a")
+        assert result["node-b"].cpu_load == 0.3
+        assert result["missing"] is None
+
+
 class TestCostBroadcaster:
     """Tests for CostBroadcaster."""
     
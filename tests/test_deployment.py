@@ -0,0 +1,1697 @@
+"""
+Tests for the model deployment module.
+"""
+
+import asyncio
+import dataclasses
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+from atmosphere.deployment import registry as registry_module
+from atmosphere.deployment.distributor import (
+    DeploymentRule,
+    DeploymentStrategy,
+    ModelDistributor,
+    NodeCapabilities,
+    TransferStatus,
+)
+from atmosphere.deployment import gossip as gossip_module
+from atmosphere.deployment.gossip import (
+    MessageType, ModelGossip, ModelMessage, ModelRoute, ModelRoutingTable, WireFormat,
+)
+from atmosphere.deployment import packager as packager_module
+from atmosphere.deployment.packager import ModelChunk, ModelPackage, ModelPackager
+from atmosphere.deployment.registry import ModelEntry, ModelManifest, ModelRegistry, ScannedModel
+
+
+@pytest.fixture
+def llamafarm_dir(tmp_path, monkeypatch):
+    """Point LLAMAFARM_MODELS_DIR at a temp tree with a few model files."""
+    models_dir = tmp_path / "llamafarm"
+    (models_dir / "anomaly").mkdir(parents=True)
+    (models_dir / "classifier").mkdir(parents=True)
+    (models_dir / "anomaly" / "detector.joblib").write_bytes(b"a" * 100)
+    (models_dir / "classifier" / "spam.pkl").write_bytes(b"b" * 2048)
+    (models_dir / "notes.txt").write_text("not a model")
+    monkeypatch.setattr(registry_module, "LLAMAFARM_MODELS_DIR", models_dir)
+    return models_dir
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Empty registry backed by a temp directory."""
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    return ModelRegistry(
+        models_dir=models_dir,
+        registry_file=models_dir / "registry.json",
+    )
+
+
+@pytest.fixture
+def distributor(registry):
+    """Distributor over the temp registry with ten known nodes."""
+    dist = ModelDistributor("local", registry, ModelPackager(), max_parallel_pushes=4)
+    for i in range(10):
+        dist.register_node(NodeCapabilities(
+            node_id=f"node-{i}",
+            role="edge",
+            memory_mb=4096,
+            cpu_cores=4,
+            architecture="x86_64",
+        ))
+    return dist
+
+
+class TestModelRegistry:
+    """Tests for ModelRegistry."""
+    
+    @pytest.mark.asyncio
+    async def test_scan_llamafarm(self, registry, llamafarm_dir):
+        """Test scanning returns model files with their sizes, skipping other entries."""
+        (llamafarm_dir / "anomaly" / "a-broken.pkl").symlink_to(llamafarm_dir / "missing.pkl")
+        os.mkfifo(llamafarm_dir / "anomaly" / "b-fifo.onnx")
+        scanned = await registry.scan_llamafarm()
+        
+        assert scanned == [
+            ScannedModel(llamafarm_dir / "anomaly" / "detector.joblib", 100),
+            ScannedModel(llamafarm_dir / "classifier" / "spam.pkl", 2048),
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_scan_llamafarm_type_filter(self, registry, llamafarm_dir):
+        """Test filtering the scan by model type directory."""
+        scanned = await registry.scan_llamafarm("classifier")
+        
+        assert [m.path.name for m in scanned] == ["spam.pkl"]
+    
+    @pytest.mark.asyncio
+    async def test_scan_llamafarm_serves_stale_while_refreshing(self, registry, llamafarm_dir, monkeypatch):
+        """Test a cached scan is served while a stale one refreshes in the background."""
+        assert len(await registry.scan_llamafarm()) == 2
+        (llamafarm_dir / "classifier" / "new.onnx").write_bytes(b"c")
+        assert len(await registry.scan_llamafarm()) == 2
+        
+        monkeypatch.setattr(registry_module, "SCAN_CACHE_TTL", 0)
+        assert len(await registry.scan_llamafarm()) == 2
+        await registry._scan_refresh
+        monkeypatch.setattr(registry_module, "SCAN_CACHE_TTL", 30)
+        assert [m.path.name for m in await registry.scan_llamafarm("classifier")] == ["new.onnx", "spam.pkl"]
+    
+    @pytest.mark.asyncio
+    async def test_import_from_llamafarm_many(self, registry, llamafarm_dir):
+        """Test batch import registers models and reports failures in place."""
+        progress = []
+        
+        results = await registry.import_from_llamafarm_many(
+            ["anomaly/detector.joblib", "missing.pkl", "classifier/spam.pkl"],
+            on_progress=lambda done, total: progress.append((done, total)),
+        )
+        
+        assert results[0].manifest.type == "anomaly_detector"
+        assert isinstance(results[1], FileNotFoundError)
+        assert results[2].manifest.size_bytes == 2048
+        assert progress[-1] == (3, 3)
+        
+        reloaded = ModelRegistry(
+            models_dir=registry.models_dir,
+            registry_file=registry.registry_file,
+        )
+        await reloaded.load()
+        assert {e.manifest.name for e in reloaded.list_local()} == {"detector", "spam"}
+    
+    @pytest.mark.asyncio
+    async def test_import_many_same_stem_copies_serially(self, registry, llamafarm_dir, monkeypatch):
+        """Test same-stem models copied to one file don't interleave their writes."""
+        (llamafarm_dir / "anomaly" / "model.joblib").write_bytes(os.urandom(2000))
+        (llamafarm_dir / "classifier" / "model.joblib").write_bytes(os.urandom(1000))
+        
+        def slow_copy(src, dst):
+            data = src.read_bytes()
+            with open(dst, "wb") as f:
+                f.write(data[:len(data) // 2])
+                f.flush()
+                time.sleep(0.05)
+                f.write(data[len(data) // 2:])
+        
+        monkeypatch.setattr(registry_module.shutil, "copy2", slow_copy)
+        results = await registry.import_from_llamafarm_many(
+            ["anomaly/model.joblib", "classifier/model.joblib"]
+        )
+        
+        assert all(isinstance(r, ModelEntry) for r in results)
+        entry = registry.get_local("model")
+        assert hashlib.sha256(entry.path.read_bytes()).hexdigest() == entry.manifest.checksum_sha256
+        assert registry._copy_locks.get(entry.path) is None
+    
+    @pytest.mark.asyncio
+    async def test_yaml_registry_migrates_to_json(self, registry, llamafarm_dir):
+        """Test a legacy registry.yaml is loaded and the next save writes JSON."""
+        legacy = ModelRegistry(
+            models_dir=registry.models_dir,
+            registry_file=registry.models_dir / "registry.yaml",
+        )
+        await legacy.import_from_llamafarm("anomaly/detector.joblib")
+        assert legacy.registry_file.exists() and not registry.registry_file.exists()
+        assert registry.source_file == legacy.registry_file
+        
+        await registry.load()
+        assert [e.manifest.name for e in registry.list_local()] == ["detector"]
+        
+        await registry.save()
+        assert registry.source_file == registry.registry_file
+        assert json.loads(registry.registry_file.read_text())["models"].keys() == {"detector:1.0.0"}
+    
+    @pytest.mark.asyncio
+    async def test_snapshot_round_trip(self, registry, llamafarm_dir):
+        """Test from_snapshot restores local and mesh state."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        registry.update_mesh_model("remote", "1.0.0", "node-a")
+        
+        restored = ModelRegistry.from_snapshot(registry.to_snapshot())
+        
+        assert restored.get_local("detector").manifest.size_bytes == 100
+        assert restored.find_nodes_with_model("remote") == {"node-a"}
+    
+    @pytest.mark.asyncio
+    async def test_loaded_entries_built_on_access(self, registry, llamafarm_dir):
+        """Test loading keeps entries serialized until they are looked up."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        snapshot = registry.to_snapshot()
+        snapshot["models"]["broken:1.0.0"] = {"manifest": {"name": "broken"}}
+        
+        restored = ModelRegistry.from_snapshot(snapshot)
+        assert restored.get_local("spam").manifest.size_bytes == 2048
+        assert isinstance(restored._local_models["detector:1.0.0"], dict)
+        assert restored.to_snapshot()["models"]["detector:1.0.0"] == snapshot["models"]["detector:1.0.0"]
+        
+        assert [e.manifest.name for e in restored.list_local()] == ["detector", "spam"]
+        assert restored.get_local("broken") is None
+    
+    @pytest.mark.asyncio
+    async def test_iter_local_filters(self, registry, llamafarm_dir):
+        """Test iter_local applies type and capability filters."""
+        await registry.import_from_llamafarm(
+            "anomaly/detector.joblib", capabilities=["anomaly_detection"]
+        )
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        
+        def names(**filters):
+            return {e.manifest.name for e in registry.iter_local(**filters)}
+        
+        assert names() == {"detector", "spam"}
+        assert names(model_type="classifier") == {"spam"}
+        assert names(capability="anomaly_detection") == {"detector"}
+        assert names(model_type="classifier", capability="anomaly_detection") == set()
+    
+    @pytest.mark.asyncio
+    async def test_type_and_capability_indexes_follow_changes(self, registry, llamafarm_dir):
+        """Test the secondary indexes track registrations after they are built."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib", capabilities=["a", "b"])
+        await registry.import_from_llamafarm("classifier/spam.pkl", capabilities=["b"])
+        assert registry.stats()["by_capability"] == {"a": 1, "b": 2}
+        
+        await registry.import_from_llamafarm("classifier/spam.pkl", capabilities=["c"])
+        await registry.unregister_local("detector", "1.0.0")
+        
+        assert [e.manifest.name for e in registry.find_by_capability("c")] == ["spam"]
+        assert registry.find_by_capability("b") == []
+        assert registry.stats()["by_type"] == {"classifier": 1}
+        assert registry.stats()["by_capability"] == {"c": 1}
+    
+    @pytest.mark.parametrize("file_digest", [True, False])
+    def test_compute_checksum(self, registry, tmp_path, monkeypatch, file_digest):
+        """Test both checksum paths agree with a plain SHA256 digest."""
+        if not file_digest:
+            monkeypatch.delattr(registry_module.hashlib, "file_digest", raising=False)
+        path = tmp_path / "model.bin"
+        data = os.urandom(4096)
+        path.write_bytes(data)
+        
+        assert registry.compute_checksum(path) == hashlib.sha256(data).hexdigest()
+        path.write_bytes(b"")
+        assert registry.compute_checksum(path) == hashlib.sha256(b"").hexdigest()
+
+
+class TestModelPackager:
+    """Tests for ModelPackager."""
+    
+    @pytest.mark.parametrize("payload", [bytes(range(256)) * 40, b"x" * 10_000, b""])
+    def test_iter_chunks_reassembles(self, tmp_path, payload):
+        """Test lazily produced chunks reassemble into the original model."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier")
+        packager = ModelPackager(chunk_size=1000)
+        
+        chunks = list(packager.iter_chunks(manifest, model_path))
+        
+        assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+        assert all(c.total_chunks == len(chunks) and c.verify() for c in chunks)
+        data = b"".join(c.data for c in chunks)
+        if data != payload:
+            data = gzip.decompress(data)
+        assert data == payload
+    
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_create_chunks_matches_iter_chunks(self, tmp_path, compress):
+        """Test chunks hashed on the pool match the lazily produced ones."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(os.urandom(5000) + b"x" * 5000)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier")
+        packager = ModelPackager(chunk_size=1000, compress=compress)
+        
+        try:
+            assert packager.create_chunks(manifest, model_path) == list(
+                packager.iter_chunks(manifest, model_path)
+            )
+        finally:
+            packager.close()
+    
+    def test_compressed_chunks_spill_to_disk(self, tmp_path, monkeypatch):
+        """Test compressed chunking streams through a spooled file past the limit."""
+        monkeypatch.setattr(packager_module, "MAX_INLINE_SIZE", 100)
+        payload = b"".join(str(i).encode() for i in range(50_000))
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier")
+        
+        chunks = list(ModelPackager(chunk_size=1000).iter_chunks(manifest, model_path))
+        
+        data = b"".join(c.data for c in chunks)
+        assert len(data) < len(payload) * 0.9
+        assert gzip.decompress(data) == payload
+        assert all(c.total_chunks == len(chunks) and c.verify() for c in chunks)
+    
+    @pytest.mark.asyncio
+    async def test_compressed_payload_reused_across_sends(self, tmp_path, monkeypatch):
+        """Test a file is compressed once for packages and chunks until it changes."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(b"a" * 10_000)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier")
+        packager = ModelPackager(chunk_size=1000)
+        calls = []
+        compress, compress_to = packager._compress, packager._compress_to
+        monkeypatch.setattr(packager, "_compress", lambda *a: calls.append(1) or compress(*a))
+        monkeypatch.setattr(packager, "_compress_to", lambda *a: calls.append(1) or compress_to(*a))
+        
+        package = await packager.package(manifest, model_path)
+        chunks = packager.create_chunks(manifest, model_path)
+        assert calls == [1]
+        assert b"".join(c.data for c in chunks) == package.data
+        
+        model_path.write_bytes(b"b" * 20_000)
+        assert gzip.decompress((await packager.package(manifest, model_path)).data) == b"b" * 20_000
+        assert calls == [1, 1]
+        
+    
+    @pytest.mark.asyncio
+    async def test_incompressible_files_skip_full_compression(self, tmp_path, monkeypatch):
+        """Test a sampled estimate skips compressing random data."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(os.urandom(512 * 1024))
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier")
+        packager = ModelPackager(chunk_size=64 * 1024)
+        sizes = []
+        compress = packager._compress
+        monkeypatch.setattr(packager, "_compress", lambda d: sizes.append(len(d)) or compress(d))
+        
+        assert not (await packager.package(manifest, model_path)).compressed
+        assert sizes == [packager_module.COMPRESSION_SAMPLES * packager_module.COMPRESSION_SAMPLE_SIZE]
+        
+        # Text-like data still gets compressed
+        model_path.write_bytes(b"".join(str(i).encode() for i in range(100_000)))
+        assert (await packager.package(manifest, model_path)).compressed
+        assert not packager._should_compress(memoryview(os.urandom(512 * 1024)))
+    
+    def test_prepared_cache_evicts_least_recently_used(self, monkeypatch):
+        """Test the prepared cache stays within its byte budget."""
+        monkeypatch.setattr(packager_module, "PREPARED_CACHE_BYTES", 400)
+        packager = ModelPackager()
+        for key in "abc":
+            packager._put_prepared(key, b"x" * 100)
+        packager._get_prepared("a")
+        packager._put_prepared("d", b"x" * 100)
+        packager._put_prepared("e", b"x" * 100)
+        packager._put_prepared("huge", b"x" * 101)  # Over a quarter of the budget
+        
+        assert list(packager._prepared) == ["c", "a", "d", "e"]
+        assert packager._prepared_bytes == 400
+    
+    @pytest.mark.asyncio
+    async def test_stream_chunks_reads_off_the_loop(self, tmp_path, monkeypatch):
+        """Test streamed chunks are produced in a worker thread and the source is closed."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(os.urandom(5000))
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier")
+        packager = ModelPackager(chunk_size=1000)
+        threads, closed = [], []
+        iter_chunks = packager.iter_chunks
+        
+        def spy(*args):
+            try:
+                for chunk in iter_chunks(*args):
+                    threads.append(threading.get_ident())
+                    yield chunk
+            finally:
+                closed.append(True)
+        
+        monkeypatch.setattr(packager, "iter_chunks", spy)
+        stream = packager.stream_chunks(manifest, model_path)
+        
+        assert [c.chunk_index for c in [await stream.__anext__() for _ in range(2)]] == [0, 1]
+        await stream.aclose()
+        
+        assert threading.get_ident() not in threads
+        assert closed == [True]
+    
+    @pytest.mark.asyncio
+    async def test_transfer_spools_to_disk_and_cleans_up(self, tmp_path):
+        """Test chunks land in a spool file that is removed when verification fails."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(os.urandom(2500))
+        manifest = ModelManifest(
+            name="m", version="1.0.0", type="classifier", file="m.bin", checksum_sha256="bad",
+        )
+        packager = ModelPackager(chunk_size=1000)
+        spool_dir = tmp_path / "spool"
+        
+        session = packager.start_transfer("m", "1.0.0", 3, manifest=manifest, spool_dir=spool_dir)
+        for chunk in packager.create_chunks(manifest, model_path):
+            packager.receive_chunk(session, chunk)
+        assert session.spool_path.parent == spool_dir
+        
+        with pytest.raises(ValueError, match="Checksum"):
+            await packager.complete_transfer(session, tmp_path / "out")
+        
+        assert list(spool_dir.iterdir()) == list((tmp_path / "out").iterdir()) == []
+        assert packager.get_session("m", "1.0.0") is None
+    
+    def test_chunk_crc_skips_sha_when_manifest_checksummed(self, tmp_path):
+        """Test chunks fall back to CRC32 only when the whole model is checksummed."""
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(os.urandom(2500))
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier", file="m.bin")
+        packager = ModelPackager(chunk_size=1000)
+        chunk = packager.create_chunks(manifest, model_path)[0]
+        assert ModelChunk.from_bytes(chunk.to_bytes()).crc32 == chunk.crc32
+        
+        chunk.digest = bytes(32)
+        assert chunk.verify(authenticate=False)
+        assert not chunk.verify()
+        
+        session = packager.start_transfer("m", "1.0.0", 3, manifest=manifest)
+        assert not packager.receive_chunk(session, chunk)
+        assert session.received_chunks == set()
+        
+        manifest.checksum_sha256 = "0" * 64
+        session = packager.start_transfer("m", "1.0.0", 3, manifest=manifest)
+        packager.receive_chunk(session, chunk)
+        assert session.received_chunks == {0}
+        packager.cancel_transfer("m", "1.0.0")
+    
+    @pytest.mark.asyncio
+    async def test_compressed_transfer_decompresses_as_chunks_arrive(self, tmp_path, monkeypatch):
+        """Test the in-order prefix is decompressed on arrival, so completion is a rename."""
+        payload = b"".join(str(i).encode() for i in range(20_000))
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(
+            name="m", version="1.0.0", type="classifier", file="m.bin",
+            checksum_sha256=hashlib.sha256(payload).hexdigest(),
+        )
+        packager = ModelPackager(chunk_size=1000)
+        chunks = packager.create_chunks(manifest, model_path)
+        assert len(chunks) > 4
+        
+        session = packager.start_transfer("m", "1.0.0", len(chunks), spool_dir=tmp_path / "spool")
+        for chunk in [chunks[2], chunks[0], chunks[1], *chunks[:2:-1]]:
+            packager.receive_chunk(session, chunk)
+            if chunk is chunks[1]:
+                assert session._inflated == 3
+        
+        monkeypatch.setattr(packager_module, "_decompress_file", None)
+        path = await packager.complete_transfer(session, tmp_path / "spool")
+        assert path.read_bytes() == payload
+        assert list((tmp_path / "spool").iterdir()) == [path]
+    
+    @pytest.mark.asyncio
+    async def test_compressed_transfer_without_stream_end_detection(self, tmp_path, monkeypatch):
+        """Test a decompressor without unused_data/eof falls back to decompressing the spool."""
+        payload = b"".join(str(i).encode() for i in range(20_000))
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier", file="m.bin")
+        packager = ModelPackager(chunk_size=1000)
+        chunks = packager.create_chunks(manifest, model_path)
+        
+        decompressobj = zlib.decompressobj
+        
+        class OldDecompressObj:
+            def __init__(self, *args):
+                self.decompress = decompressobj(*args).decompress
+        
+        monkeypatch.setattr(zlib, "decompressobj", OldDecompressObj)
+        with pytest.raises(ValueError):
+            packager_module._Inflater("gzip", tmp_path, prefix="m-")
+        assert not list(tmp_path.glob("m-*"))
+        session = packager.start_transfer("m", "1.0.0", len(chunks), spool_dir=tmp_path / "spool")
+        for chunk in chunks:
+            packager.receive_chunk(session, chunk)
+        assert session._inflated is None
+        monkeypatch.undo()
+        
+        path = await packager.complete_transfer(session, tmp_path / "spool")
+        assert path.read_bytes() == payload
+        assert list((tmp_path / "spool").iterdir()) == [path]
+    
+    @pytest.mark.asyncio
+    async def test_zstd_compression(self, tmp_path):
+        """Test zstd packages and chunked transfers round trip through the codec field."""
+        if not packager_module.ZSTD_AVAILABLE:
+            with pytest.raises(ValueError):
+                ModelPackager(compression="zstd")
+            pytest.skip("zstandard not installed")
+        payload = b"".join(str(i).encode() for i in range(20_000))
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier", file="m.bin")
+        packager = ModelPackager(chunk_size=1000, compression="zstd")
+        
+        package = ModelPackage.from_bytes((await packager.package(manifest, model_path)).to_bytes())
+        assert package.compressed and package.compression == "zstd"
+        assert (await packager.unpackage(package, tmp_path / "a")).read_bytes() == payload
+        
+        chunks = packager.create_chunks(manifest, model_path)
+        session = packager.start_transfer(
+            "m", "1.0.0", len(chunks), manifest=manifest,
+            compressed=True, original_size=len(payload), compression="zstd",
+        )
+        for chunk in chunks:
+            packager.receive_chunk(session, chunk)
+        assert (await packager.complete_transfer(session, tmp_path / "b")).read_bytes() == payload
+    
+    def test_package_compression_defaults_to_gzip(self):
+        """Test packages from peers without a codec field are read as gzip."""
+        package = ModelPackage(
+            ModelManifest(name="m", version="1.0.0", type="classifier"),
+            b"data", compressed=True,
+        )
+        header = package.to_dict()
+        del header["compression"]
+        
+        assert ModelPackage.from_dict(header).compression == "gzip"
+    
+    def test_binary_frames_round_trip_without_base64(self):
+        """Test chunks and packages carry raw payload bytes in binary frames."""
+        payload = bytes(range(256)) * 64
+        chunk = ModelChunk("m", "1.0.0", 0, 1, payload, hashlib.sha256(payload).digest())
+        package = ModelPackage(
+            ModelManifest(name="m", version="1.0.0", type="classifier"),
+            payload, compressed=True, original_size=99,
+        )
+        
+        assert ModelChunk.from_bytes(chunk.to_bytes()) == chunk
+        assert ModelPackage.from_bytes(package.to_bytes()).to_dict() == package.to_dict()
+        assert len(chunk.to_bytes()) < len(payload) + 200
+        frame = chunk.to_bytes()
+        assert ModelChunk.from_bytes(frame).data.obj is frame  # Zero-copy payload
+        assert chunk.checksum.encode() not in frame
+        assert ModelChunk.from_dict(chunk.to_dict()) == chunk
+        
+        # Frames carrying a hex checksum in the header still decode
+        legacy = packager_module._frame({**chunk._header(), "checksum": chunk.checksum}, payload)
+        assert ModelChunk.from_bytes(legacy).verify()
+        assert ModelChunk.from_dict(chunk.to_dict()) == chunk
+
+
+class TestDeploymentRule:
+    """Tests for DeploymentRule."""
+    
+    def test_get_models_for_node(self):
+        """Test rule specs select models by name and version."""
+        models = [
+            ModelManifest(name="a", version="1.0.0", type="classifier"),
+            ModelManifest(name="a", version="2.0.0", type="classifier"),
+            ModelManifest(name="b", version="1.0.0", type="classifier"),
+        ]
+        node = NodeCapabilities(node_id="n", memory_mb=4096, cpu_cores=4, architecture="arm64")
+        
+        def select(*specs):
+            rule = DeploymentRule(name="r", trigger="node_join", models=list(specs))
+            return [(m.name, m.version) for m in rule.get_models_for_node(node, models)]
+        
+        assert select({"name": "a"}) == [("a", "1.0.0"), ("a", "2.0.0")]
+        assert select({"name": "a", "version": "2.0.0"}) == [("a", "2.0.0")]
+        assert select({"name": "missing"}) == []
+        assert len(select({"name": "*"})) == 3
+    
+    def test_matches_node(self):
+        """Test compiled conditions and recompiling after a change."""
+        rule = DeploymentRule(
+            name="r", trigger="node_join",
+            conditions={"role": "edge", "min_memory_mb": 1024, "has_gpu": False},
+        )
+        
+        assert rule.matches_node(NodeCapabilities(node_id="a", role="edge", memory_mb=2048))
+        assert not rule.matches_node(NodeCapabilities(node_id="b", role="edge", memory_mb=512))
+        assert not rule.matches_node(NodeCapabilities(node_id="c", role="edge", memory_mb=2048, has_gpu=True))
+        assert not rule.matches_node(NodeCapabilities(node_id="d", role="central", memory_mb=2048))
+        
+        rule.conditions["role"] = "central"
+        rule.compile()
+        assert rule.matches_node(NodeCapabilities(node_id="d", role="central", memory_mb=2048))
+
+
+class TestNodeCapabilities:
+    """Tests for NodeCapabilities."""
+    
+    def test_wants_model(self):
+        """Test role and interest matching."""
+        node = NodeCapabilities.from_dict({
+            "node_id": "n", "role": "edge", "interests": ["vision", "audio"],
+        })
+        
+        def manifest(**kwargs):
+            return ModelManifest(name="m", version="1.0.0", type="classifier", **kwargs)
+        
+        assert node.wants_model(manifest(capabilities=["audio"]))
+        assert node.wants_model(manifest(capabilities=["audio"], roles=["edge", "gateway"]))
+        assert not node.wants_model(manifest(capabilities=["text"]))
+        assert not node.wants_model(manifest(capabilities=["audio"], roles=["central"]))
+        assert NodeCapabilities(node_id="any").wants_model(manifest(capabilities=["text"]))
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_to_bytes(self, monkeypatch, use_orjson):
+        """Test to_bytes matches to_dict with and without orjson."""
+        from atmosphere.deployment import distributor as distributor_module
+        if use_orjson and not distributor_module.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(distributor_module, "ORJSON_AVAILABLE", use_orjson)
+        node = NodeCapabilities(node_id="n", role="edge", interests=["audio"])
+        
+        assert json.loads(node.to_bytes()) == node.to_dict()
+        assert NodeCapabilities.from_dict(json.loads(node.to_bytes())) == node
+
+
+class TestModelDistributor:
+    """Tests for ModelDistributor."""
+    
+    @pytest.mark.asyncio
+    async def test_push_to_all_is_bounded(self, distributor, registry, llamafarm_dir):
+        """Test fan-out pushes run concurrently up to the configured limit."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        in_flight = 0
+        peak = 0
+        
+        async def send_package(node_id, package):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return node_id != "node-3"
+        
+        distributor.set_send_callback(send_package)
+        records = await distributor.push_to_all("detector", "1.0.0")
+        
+        by_node = {r.to_node: r for r in records}
+        assert sorted(by_node) == [f"node-{i}" for i in range(10)]
+        assert by_node["node-3"].status == TransferStatus.FAILED
+        assert sum(r.status == TransferStatus.COMPLETED for r in records) == 9
+        assert 1 < peak <= 4
+    
+    @pytest.mark.asyncio
+    async def test_push_chunked_pipelines_sends(self, distributor, registry, llamafarm_dir):
+        """Test chunked pushes keep several chunks in flight."""
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        distributor.packager = ModelPackager(chunk_size=128, compress=False)
+        distributor.chunk_window = 3
+        received = {}
+        in_flight = 0
+        peak = 0
+        
+        async def send_chunk(node_id, chunk):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            received[chunk.chunk_index] = chunk.data
+            return True
+        
+        distributor.set_chunk_callback(send_chunk)
+        record = await distributor.push("spam", "1.0.0", "node-0")
+        
+        assert record.status == TransferStatus.COMPLETED
+        assert record.bytes_transferred == 2048
+        assert 0 < record.started_at_ns <= record.completed_at_ns
+        assert record.to_dict()["completed_at_ns"] == record.completed_at_ns
+        
+        transfer_id = record.to_dict()["transfer_id"]
+        assert transfer_id == f"xfer-{record.transfer_id:06d}"
+        assert distributor.get_transfer(transfer_id) is record
+        assert distributor.get_transfer(record.transfer_id) is record
+        assert b"".join(received[i] for i in sorted(received)) == b"b" * 2048
+        assert peak == 3
+    
+    @pytest.mark.asyncio
+    async def test_push_chunked_stops_on_failure(self, distributor, registry, llamafarm_dir):
+        """Test a failed chunk send fails the transfer without sending the rest."""
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        distributor.packager = ModelPackager(chunk_size=128, compress=False)
+        distributor.chunk_window = 2
+        sent = []
+        
+        async def send_chunk(node_id, chunk):
+            await asyncio.sleep(0)
+            sent.append(chunk.chunk_index)
+            return chunk.chunk_index != 1
+        
+        distributor.set_chunk_callback(send_chunk)
+        record = await distributor.push("spam", "1.0.0", "node-0")
+        
+        assert record.status == TransferStatus.FAILED
+        assert "chunk 1" in record.error
+        assert len(sent) < 16
+    
+    @pytest.mark.asyncio
+    async def test_receive_chunks_out_of_order(self, distributor, tmp_path):
+        """Test chunks from a sender with its own chunk size land in place in any order."""
+        payload = os.urandom(2500)
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(
+            name="m", version="1.0.0", type="classifier", file="m.bin",
+            checksum_sha256=hashlib.sha256(payload).hexdigest(),
+        )
+        chunks = ModelPackager(chunk_size=1000, compress=False).create_chunks(manifest, model_path)
+        
+        assert await distributor.receive_chunk(chunks[1], "node-0", manifest) is None
+        session = distributor.packager.get_session("m", "1.0.0")
+        assert session.chunk_size == 1000
+        assert not session.add_chunk(dataclasses.replace(
+            chunks[0], data=payload[:999], digest=hashlib.sha256(payload[:999]).digest()
+        ))
+        assert await distributor.receive_chunk(chunks[2], "node-0") is None
+        entry = await distributor.receive_chunk(chunks[0], "node-0")
+        
+        assert entry.path.read_bytes() == payload
+    
+    @pytest.mark.asyncio
+    async def test_retransmitted_chunk_during_completion(self, distributor, tmp_path):
+        """Test a chunk resent while the model is being written doesn't complete it twice."""
+        payload = os.urandom(2500)
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier", file="m.bin")
+        chunks = ModelPackager(chunk_size=1000, compress=False).create_chunks(manifest, model_path)
+        
+        for chunk in chunks[:-1]:
+            await distributor.receive_chunk(chunk, "node-0")
+        first = asyncio.create_task(distributor.receive_chunk(chunks[-1], "node-0"))
+        await asyncio.sleep(0)
+        assert await distributor.receive_chunk(chunks[-1], "node-0") is None
+        
+        assert (await first).path.read_bytes() == payload
+        assert distributor.packager.get_session("m", "1.0.0") is None
+    
+    @pytest.mark.asyncio
+    async def test_receive_chunk_rejects_oversized_layout(self, distributor, tmp_path, monkeypatch):
+        """Test the spool reservation is bounded by the declared size and failures reject the transfer."""
+        distributor.models_dir = tmp_path / "models"
+        payload = os.urandom(2500)
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(
+            name="m", version="1.0.0", type="classifier", file="m.bin", size_bytes=len(payload),
+        )
+        chunks = ModelPackager(chunk_size=1000, compress=False).create_chunks(manifest, model_path)
+        reserved = []
+        monkeypatch.setattr(os, "posix_fallocate", lambda fd, offset, length: reserved.append(length),
+                            raising=False)
+        
+        bogus = dataclasses.replace(chunks[0], total_chunks=10 ** 9)
+        assert await distributor.receive_chunk(bogus, "node-0") is None
+        assert distributor.packager.get_session("m", "1.0.0") is None
+        assert reserved == []
+        
+        def full_disk(fd, offset, length):
+            raise OSError(28, "No space left on device")
+        
+        monkeypatch.setattr(os, "posix_fallocate", full_disk, raising=False)
+        assert await distributor.receive_chunk(chunks[0], "node-0") is None
+        assert distributor.packager.get_session("m", "1.0.0") is None
+        assert list((tmp_path / "models").iterdir()) == []
+        
+        monkeypatch.setattr(os, "posix_fallocate", lambda fd, offset, length: reserved.append(length),
+                            raising=False)
+        for chunk in chunks:
+            entry = await distributor.receive_chunk(chunk, "node-0")
+        assert entry.path.read_bytes() == payload
+        assert reserved == [len(payload)]
+    
+    @pytest.mark.asyncio
+    async def test_receive_chunks_sized_by_sender(self, distributor, tmp_path):
+        """Test the session takes the sender's chunk size even when the last chunk arrives first."""
+        distributor.models_dir = tmp_path / "models"
+        distributor.packager = ModelPackager(chunk_size=1000)
+        sender = ModelPackager(chunk_size=2000, compress=False)
+        payload = os.urandom(5000)
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier", file="m.bin")
+        chunks = [
+            ModelChunk.from_bytes(c.to_bytes()) for c in sender.create_chunks(manifest, model_path)
+        ]
+        assert len(chunks) == 3 and all(c.chunk_size == 2000 for c in chunks)
+        
+        assert await distributor.receive_chunk(chunks[2], "node-0", manifest) is None
+        assert distributor.packager.get_session("m", "1.0.0").chunk_size == 2000
+        assert await distributor.receive_chunk(chunks[1], "node-0") is None
+        entry = await distributor.receive_chunk(chunks[0], "node-0")
+        assert entry.path.read_bytes() == payload
+        
+        # One chunk larger than the receiver's default, with and without the size field
+        small = tmp_path / "small.bin"
+        small.write_bytes(payload[:1500])
+        for version, chunk_size in (("2.0.0", 2000), ("3.0.0", None)):
+            manifest = ModelManifest(name="m", version=version, type="classifier", file="m.bin")
+            [chunk] = sender.create_chunks(manifest, small)
+            chunk.chunk_size = chunk_size
+            entry = await distributor.receive_chunk(chunk, "node-0")
+            assert entry.path.read_bytes() == payload[:1500]
+    
+    @pytest.mark.asyncio
+    async def test_receive_compressed_chunks_uses_model_header(self, distributor, tmp_path):
+        """Test chunk 0's header tells the receiver how to decompress, whenever it arrives."""
+        payload = b"".join(str(i).encode() for i in range(5000))
+        model_path = tmp_path / "model.bin"
+        model_path.write_bytes(payload)
+        manifest = ModelManifest(name="m", version="1.0.0", type="classifier", file="m.bin")
+        chunks = ModelPackager(chunk_size=1000).create_chunks(manifest, model_path)
+        frames = [c.to_bytes() for c in chunks]
+        
+        header = ModelChunk.from_bytes(frames[0]).header
+        assert header.compressed and header.original_size == len(payload)
+        assert "data_base64" not in header.to_json()
+        assert all(ModelChunk.from_bytes(f).header is None for f in frames[1:])
+        
+        await distributor.receive_chunk(ModelChunk.from_bytes(frames[1]), "node-0", manifest)
+        for frame in reversed(frames[2:]):
+            await distributor.receive_chunk(ModelChunk.from_bytes(frame), "node-0")
+        entry = await distributor.receive_chunk(ModelChunk.from_bytes(frames[0]), "node-0")
+        
+        assert entry.path.read_bytes() == payload
+        assert sorted(p.name for p in entry.path.parent.iterdir()) == [
+            entry.path.name, "registry.json",
+        ]
+    
+    def test_find_capable_nodes_cache_invalidation(self, distributor):
+        """Test re-registering a node refreshes its cached fit."""
+        manifest = ModelManifest(
+            name="m", version="1.0.0", type="classifier", checksum_sha256="abc"
+        )
+        assert len(distributor.find_capable_nodes(manifest)) == 10
+        
+        distributor.register_node(NodeCapabilities(node_id="node-0", memory_mb=64))
+        distributor.unregister_node("node-1")
+        
+        capable = distributor.find_capable_nodes(manifest)
+        assert "node-0" not in capable
+        assert "node-1" not in capable
+        assert len(capable) == 8
+    
+    @pytest.mark.asyncio
+    async def test_role_and_arch_indexes(self, distributor, registry, llamafarm_dir):
+        """Test role and architecture lookups follow node re-registration."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        distributor.set_send_callback(lambda node_id, package: asyncio.sleep(0, True))
+        distributor.register_node(NodeCapabilities(
+            node_id="node-0", role="gateway", memory_mb=4096, cpu_cores=4, architecture="riscv",
+        ))
+        distributor.register_node(NodeCapabilities(
+            node_id="gw-1", role="gateway", memory_mb=4096, cpu_cores=4, architecture="arm64",
+        ))
+        
+        records = await distributor.push_to_role("detector", "1.0.0", "gateway")
+        assert {r.to_node for r in records} == {"node-0", "gw-1"}
+        
+        manifest = registry.get_local("detector").manifest
+        capable = distributor.find_capable_nodes(manifest)
+        assert "node-0" not in capable and "gw-1" in capable
+        assert len(capable) == 10
+        
+        gateway_only = dataclasses.replace(manifest, roles=["gateway"])
+        assert distributor.find_capable_nodes(gateway_only) == {"gw-1"}
+    
+    @pytest.mark.asyncio
+    async def test_transfer_history_bounded(self, distributor, registry, llamafarm_dir, monkeypatch):
+        """Test old transfers are evicted while status counts keep running."""
+        from atmosphere.deployment import distributor as distributor_module
+        monkeypatch.setattr(distributor_module, "MAX_TRANSFER_HISTORY", 4)
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        calls = []
+        
+        async def send_package(node_id, package):
+            calls.append(node_id)
+            return len(calls) > 1
+        
+        distributor.set_send_callback(send_package)
+        
+        await distributor.push_to_all("detector", "1.0.0")
+        
+        stats = distributor.stats()
+        assert stats["total_transfers"] == 10
+        assert stats["transfers_by_status"] == {"completed": 9, "failed": 1}
+        assert len(distributor.list_transfers()) == 4
+        completed = distributor.list_transfers(status=TransferStatus.COMPLETED)
+        assert completed == distributor.list_transfers()
+        assert distributor.list_transfers(status=TransferStatus.FAILED) == []
+    
+    def test_find_capable_nodes_large_mesh(self, distributor):
+        """Test the vectorized resource filter agrees with can_run_model."""
+        for i in range(200):
+            distributor.register_node(NodeCapabilities(
+                node_id=f"big-{i}",
+                memory_mb=256 * (i % 8),
+                cpu_cores=i % 4,
+                has_gpu=i % 3 == 0,
+                architecture="arm64",
+                max_model_size_mb=i % 5,
+            ))
+        manifest = ModelManifest(
+            name="m", version="1.0.0", type="classifier", size_bytes=2 * 1024 * 1024
+        )
+        manifest.node_requirements.min_memory_mb = 1024
+        manifest.node_requirements.gpu_required = True
+        
+        expected = {
+            node_id for node_id, caps in distributor._node_capabilities.items()
+            if caps.can_run_model(manifest)
+        }
+        
+        assert expected
+        assert distributor.find_capable_nodes(manifest) == expected
+    
+    @pytest.mark.asyncio
+    async def test_pull_prefers_lowest_rtt(self, distributor, registry):
+        """Test pull sources from the peer with the lowest smoothed RTT."""
+        for node_id in ("node-1", "node-2", "node-3"):
+            registry.update_mesh_model("remote", "1.0.0", node_id)
+        distributor.record_peer_rtt("node-1", 80)
+        distributor.record_peer_rtt("node-2", 20)
+        distributor.record_peer_rtt("node-2", 300)  # smoothed to 76
+        requested = []
+        
+        async def request_model(node_id, name, version):
+            requested.append(node_id)
+            return None
+        
+        distributor.set_request_callback(request_model)
+        record = await distributor.pull("remote")
+        
+        assert requested == ["node-2"]
+        assert record.from_node == "node-2"
+    
+    @pytest.mark.asyncio
+    async def test_advertise_gossip(self, distributor, registry, llamafarm_dir, tmp_path):
+        """Test advertisements fan out to sqrt(N) peers that pull and re-advertise their share."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        mesh = {"local": distributor}
+        served = []
+        advertised = []
+        
+        for i in range(10):
+            node_id = f"node-{i}"
+            peer_dir = tmp_path / node_id
+            peer_dir.mkdir()
+            peer = ModelDistributor(
+                node_id,
+                ModelRegistry(models_dir=peer_dir, registry_file=peer_dir / "registry.json"),
+                ModelPackager(),
+                models_dir=peer_dir,
+            )
+            mesh[node_id] = peer
+        
+        for sender_id, sender in mesh.items():
+            async def send_ad(node_id, ad, sender_id=sender_id):
+                advertised.append(node_id)
+                await mesh[node_id].receive_advertisement(ad, sender_id)
+                return True
+            
+            async def request_model(node_id, name, version):
+                served.append(node_id)
+                entry = mesh[node_id].registry.get_local(name, version)
+                return await mesh[node_id].packager.package(entry.manifest, entry.path)
+            
+            sender.set_advertise_callback(send_ad)
+            sender.set_request_callback(request_model)
+        
+        random.seed(0)
+        sent = await distributor.advertise("detector")
+        
+        assert len(sent) == 4
+        assert served.count("local") == 4
+        assert sorted(advertised) == sorted(f"node-{i}" for i in range(10))
+        holders = [n for n, d in mesh.items() if d.registry.has_local("detector")]
+        assert len(holders) == 11
+        assert all(
+            mesh[n].registry.get_local("detector").path.read_bytes() == b"a" * 100
+            for n in holders
+        )
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_advertisements_share_pull(self, distributor):
+        """Test concurrent advertisements for one model wait on a single pull."""
+        requests = []
+        
+        async def request_model(node_id, name, version):
+            requests.append(node_id)
+            await asyncio.sleep(0.01)
+            return None
+        
+        distributor.set_request_callback(request_model)
+        ad = {"model": "m", "version": "1.0.0", "targets": ["local"], "ttl": 1}
+        first, second = await asyncio.gather(
+            distributor.receive_advertisement(ad, "node-1"),
+            distributor.receive_advertisement(ad, "node-2"),
+        )
+        
+        assert len(requests) == 1
+        assert first is second
+        assert distributor._pending_pulls == {}
+    
+    @pytest.mark.asyncio
+    async def test_organic_deploy_skips_sent(self, distributor, registry, llamafarm_dir):
+        """Test ORGANIC deploy does not resend to nodes already pushed to."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        distributor.set_send_callback(lambda node_id, package: asyncio.sleep(0, True))
+        
+        await distributor.push("detector", "1.0.0", "node-0")
+        records = await distributor.deploy("detector")
+        assert len(records) == 9
+        assert "node-0" not in {r.to_node for r in records}
+        assert await distributor.deploy("detector") == []
+        
+        distributor.unregister_node("node-0")
+        distributor.register_node(NodeCapabilities(
+            node_id="node-0", memory_mb=4096, cpu_cores=4, architecture="x86_64",
+        ))
+        records = await distributor.deploy("detector")
+        assert [r.to_node for r in records] == ["node-0"]
+    
+    @pytest.mark.asyncio
+    async def test_push_many_packages_once(self, distributor, registry, llamafarm_dir, monkeypatch):
+        """Test a fan-out push reads the model once for all targets."""
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        distributor.set_send_callback(lambda node_id, package: asyncio.sleep(0, True))
+        distributor.set_chunk_callback(lambda node_id, chunk: asyncio.sleep(0, True))
+        reads = []
+        package_sync = distributor.packager._package_sync
+        monkeypatch.setattr(distributor.packager, "_package_sync",
+                            lambda *a: reads.append("package") or package_sync(*a))
+        
+        records = await distributor.push_to_all("spam", "1.0.0")
+        assert reads == ["package"]
+        assert all(r.bytes_transferred == records[0].bytes_transferred > 0 for r in records)
+    
+    @pytest.mark.asyncio
+    async def test_push_many_streams_chunks(self, distributor, registry, llamafarm_dir, monkeypatch):
+        """Test a chunked fan-out compresses once and streams chunks per target."""
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        distributor.packager = packager = ModelPackager(chunk_size=512)
+        sent = {}
+        
+        async def send_chunk(node_id, chunk):
+            sent.setdefault(node_id, []).append(chunk.chunk_index)
+            return True
+        
+        distributor.set_chunk_callback(send_chunk)
+        calls = []
+        compress_to = packager._compress_to
+        monkeypatch.setattr(packager, "_compress_to",
+                            lambda *a: calls.append("compress") or compress_to(*a))
+        monkeypatch.setattr(packager, "create_chunks",
+                            lambda *a: calls.append("create_chunks"))
+        
+        records = await distributor.push_to_all("spam", "1.0.0")
+        assert calls == ["compress"]
+        assert all(r.status == TransferStatus.COMPLETED for r in records)
+        assert len(sent) == len(records) > 1
+    
+    @pytest.mark.asyncio
+    async def test_push_fail_fast(self, distributor, registry, llamafarm_dir):
+        """Test fail_fast cancels outstanding pushes after the first failure."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        distributor._push_semaphore = asyncio.Semaphore(2)
+        
+        async def send_package(node_id, package):
+            await asyncio.sleep(0 if node_id == "node-0" else 0.05)
+            return node_id != "node-0"
+        
+        distributor.set_send_callback(send_package)
+        records = await distributor.deploy(
+            "detector",
+            strategy=DeploymentStrategy.PUSH,
+            target_nodes=[f"node-{i}" for i in range(6)],
+            fail_fast=True,
+        )
+        
+        statuses = [r.status for r in records]
+        assert statuses[0] == TransferStatus.FAILED
+        assert set(statuses[1:]) == {TransferStatus.CANCELLED}
+        assert distributor.list_transfers(status=TransferStatus.IN_PROGRESS) == []
+
+
+@pytest.fixture
+def gossip(registry):
+    """ModelGossip over the temp registry that records what it broadcasts."""
+    node = ModelGossip("local", registry)
+    node.broadcasts = []
+    
+    async def broadcast(data):
+        node.broadcasts.append(data)
+    
+    node.set_broadcast_callback(broadcast)
+    return node
+
+
+def make_route(project="m", **kwargs):
+    """Build a ModelRoute with sensible defaults."""
+    fields = dict(
+        project=project, version="1.0.0", model_type="classifier",
+        embedding=[0.25, 0.5], nodes=["node-a"], capabilities=["text"],
+        size_bytes=10, checksum="abc",
+    )
+    fields.update(kwargs)
+    return ModelRoute(**fields)
+
+
+class TestModelGossip:
+    """Tests for ModelGossip."""
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_message_bytes_round_trip(self, monkeypatch, use_orjson):
+        """Test messages survive to_bytes/from_bytes with either encoder."""
+        if use_orjson and not gossip_module.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(gossip_module, "ORJSON_AVAILABLE", use_orjson)
+        msg = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE, from_node="a", routes=[make_route()]
+        )
+        
+        data = msg.to_bytes()
+        
+        assert isinstance(data, bytes)
+        assert ModelMessage.from_bytes(data).to_dict() == msg.to_dict()
+        assert ModelMessage.from_json(msg.to_json()).to_dict() == msg.to_dict()
+    
+    def test_route_embedding_float32_round_trip(self):
+        """Test route embeddings are float32 and travel as base64."""
+        route = make_route(embedding=[0.1, 0.2, 0.3])
+        
+        data = route.to_dict()
+        restored = ModelRoute.from_dict(data)
+        
+        assert route.embedding.dtype == np.float32
+        assert isinstance(data["embedding"], str)
+        assert data["dim"] == 3
+        np.testing.assert_array_equal(restored.embedding, route.embedding)
+    
+    def test_route_embedding_accepts_float_list(self):
+        """Test routes from peers sending plain float lists still decode."""
+        data = make_route().to_dict()
+        data["embedding"] = [0.25, 0.5]
+        del data["dim"]
+        
+        route = ModelRoute.from_dict(data)
+        
+        assert route.embedding.dtype == np.float32
+        assert route.embedding.tolist() == [0.25, 0.5]
+    
+    @pytest.mark.asyncio
+    async def test_routing_table_match(self):
+        """Test match ranks routes by cosine similarity and tracks updates."""
+        table = ModelRoutingTable()
+        await table.add_or_update(make_route("x", embedding=[1.0, 0.0]))
+        await table.add_or_update(make_route("y", embedding=[0.0, 2.0]))
+        await table.add_or_update(make_route("xy", embedding=[1.0, 1.0]))
+        await table.add_or_update(make_route("other-dim", embedding=[1.0, 0.0, 0.0]))
+        
+        matches = table.match(np.array([3.0, 0.1]), top_k=2)
+        
+        assert [r.project for r, _ in matches] == ["x", "xy"]
+        assert matches[0][1] == pytest.approx(0.9994, abs=1e-3)
+        
+        await table.remove("x")
+        assert [r.project for r, _ in table.match([3.0, 0.1], top_k=5)] == ["xy", "y"]
+    
+    @pytest.mark.asyncio
+    async def test_routing_table_copy_on_write(self):
+        """Test writers swap snapshots instead of mutating what readers hold."""
+        table = ModelRoutingTable()
+        applied = await table.add_or_update_many([
+            make_route("a", updated_at=1.0),
+            make_route("b", capabilities=["vision"], updated_at=1.0),
+            make_route("a", nodes=["node-b"], updated_at=2.0),
+            make_route("b", updated_at=0.5),
+        ])
+        
+        assert sorted((r.project, *r.nodes) for r in applied) == [("a", "node-b"), ("b", "node-a")]
+        
+        before = table.get("a")
+        held = table.get_all()
+        await table.add_node_to_route("a", "node-c")
+        
+        assert before.nodes == {"node-b"}
+        assert table.get("a").nodes == {"node-b", "node-c"}
+        assert len(held) == 2
+        assert [r.project for r in table.get_by_node("node-c")] == ["a"]
+        
+        await table.remove("b")
+        assert table.get_by_capability("vision") == []
+        assert table.stats() == {
+            "total_routes": 1, "nodes_with_models": 2, "capabilities_indexed": 1,
+        }
+    
+    @pytest.mark.asyncio
+    async def test_routing_table_refresh_leaves_indexes_alone(self):
+        """Test re-adding an unchanged route does no index or matrix work."""
+        table = ModelRoutingTable()
+        await table.add_or_update(make_route("a", updated_at=1.0))
+        table.match([1.0, 1.0])
+        _, by_node, by_capability = table._snapshot
+        matrices = table._matrices
+        
+        await table.add_or_update(make_route("a", updated_at=2.0))
+        
+        assert table._snapshot[1] is by_node
+        assert table._snapshot[2] is by_capability
+        assert table._matrices is matrices
+        
+        await table.add_or_update(make_route("a", nodes=["node-b"], updated_at=3.0))
+        
+        assert table._snapshot[2] is by_capability
+        assert [r.project for r in table.get_by_node("node-b")] == ["a"]
+        assert table.get_by_node("node-a") == []
+    
+    def test_route_strings_are_interned(self):
+        """Test decoded routes share node and capability string objects."""
+        data = make_route().to_dict()
+        first = ModelRoute.from_dict(json.loads(json.dumps(data)))
+        second = ModelRoute.from_dict(json.loads(json.dumps(data)))
+        
+        assert next(iter(first.nodes)) is next(iter(second.nodes))
+        assert first.capabilities[0] is second.capabilities[0]
+    
+    def test_route_nodes_are_a_set(self):
+        """Test route nodes dedupe and serialize in sorted order."""
+        route = make_route(nodes=["node-b", "node-a", "node-b"])
+        
+        assert route.nodes == {"node-a", "node-b"}
+        assert route.to_dict()["nodes"] == ["node-a", "node-b"]
+        assert ModelRoute.from_dict(route.to_dict()).nodes == route.nodes
+    
+    @pytest.mark.asyncio
+    async def test_route_update_forwarded(self, gossip):
+        """Test a received route update is applied and forwarded with ttl - 1."""
+        msg = ModelMessage(
+            type=MessageType.ROUTE_UPDATE, from_node="a", action="add",
+            route=make_route(), ttl=3,
+        )
+        
+        await gossip.handle_message(msg.to_bytes(), "a")
+        
+        assert gossip.routing_table.get("m").nodes == {"node-a"}
+        assert len(gossip.broadcasts) == 1
+        forwarded = ModelMessage.from_bytes(gossip.broadcasts[0])
+        assert forwarded.ttl == 2
+        assert forwarded.nonce == msg.nonce
+        assert forwarded.route.to_dict() == msg.route.to_dict()
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_bytes_dropped_before_decode(self, gossip, monkeypatch):
+        """Test byte-identical duplicates are dropped without being decoded."""
+        msg = ModelMessage(
+            type=MessageType.ROUTE_UPDATE, from_node="a", action="add",
+            route=make_route(), ttl=3,
+        )
+        data = msg.to_bytes()
+        await gossip.handle_message(data, "a")
+        
+        decoded = []
+        real_loads = gossip_module._loads
+        monkeypatch.setattr(
+            gossip_module, "_loads", lambda d: decoded.append(d) or real_loads(d)
+        )
+        await gossip.handle_message(data, "b")
+        
+        assert decoded == []
+        assert len(gossip.broadcasts) == 1
+    
+    @pytest.mark.asyncio
+    async def test_full_hash_cache_falls_back_to_nonce_check(self, gossip):
+        """Test a full content-hash cache stops growing and leaves replays to the nonce check."""
+        gossip._seen_hashes.max_size = 1
+        first, second = (
+            ModelMessage(
+                type=MessageType.ROUTE_UPDATE, from_node="a", action="add",
+                route=make_route(project), ttl=3,
+            ).to_bytes()
+            for project in ("m1", "m2")
+        )
+        
+        await gossip.handle_message(first, "a")
+        await gossip.handle_message(second, "a")
+        await gossip.handle_message(second, "b")
+        
+        assert gossip.stats()["seen_hashes_size"] == 1
+        assert len(gossip.broadcasts) == 2
+    
+    @pytest.mark.asyncio
+    async def test_model_available_applied_in_bulk(self, gossip, registry):
+        """Test an announcement updates table and registry with one event."""
+        events = []
+        
+        async def on_routes_updated(routes, from_peer):
+            events.append(([r.project for r in routes], from_peer))
+        
+        gossip.on_routes_updated = on_routes_updated
+        msg = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE, from_node="peer",
+            routes=[make_route("a"), make_route("b", version="2.0.0")], ttl=1,
+        )
+        
+        await gossip.handle_message(msg.to_bytes(), "peer")
+        
+        assert events == [(["a", "b"], "peer")]
+        assert len(gossip.routing_table.get_all()) == 2
+        assert registry.find_nodes_with_model("b", "2.0.0") == {"peer"}
+        assert registry.describe("a").mesh.first_seen is not None
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    async def test_announce_reuses_payload(self, gossip, registry, tmp_path, monkeypatch, use_orjson):
+        """Test announcements reuse cached bytes until local models change."""
+        if use_orjson and not gossip_module.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(gossip_module, "ORJSON_AVAILABLE", use_orjson)
+        model_path = tmp_path / "m.pkl"
+        model_path.write_bytes(b"x" * 10)
+        await registry.register_local(
+            ModelManifest(name="m", version="1.0.0", type="classifier"), model_path, save=False
+        )
+        
+        await gossip.announce()
+        cached = gossip._announce_cache
+        await gossip.announce()
+        
+        assert gossip._announce_cache is cached
+        first, second = (ModelMessage.from_bytes(b) for b in gossip.broadcasts)
+        assert first.type == MessageType.MODEL_AVAILABLE
+        assert [r.project for r in second.routes] == ["m"]
+        assert first.nonce != second.nonce
+        assert gossip.routing_table.get("m").nodes == {"local"}
+        
+        await registry.unregister_local("m", "1.0.0")
+        await gossip.announce()
+        
+        assert len(gossip.broadcasts) == 2
+        assert gossip._announce_cache[2] == 0
+    
+    @pytest.mark.asyncio
+    async def test_forward_fans_out_concurrently_skipping_sender(self, gossip):
+        """Test forwarding sends to all peers at once except the sender."""
+        started, release = [], asyncio.Event()
+        
+        async def send(peer, data):
+            started.append(peer)
+            await release.wait()
+            return peer != "p2"
+        
+        gossip.set_send_callback(send)
+        gossip.set_peers(["p1", "p2", "p3"])
+        msg = ModelMessage(
+            type=MessageType.ROUTE_UPDATE, from_node="a", route=make_route(), ttl=3,
+        )
+        
+        task = asyncio.create_task(gossip.handle_message(msg.to_bytes(), "p1"))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        
+        assert sorted(started) == ["p2", "p3"]
+        release.set()
+        await task
+        assert gossip.broadcasts == []
+    
+    @pytest.mark.asyncio
+    async def test_announce_loop_skips_unchanged_state(self, gossip, monkeypatch):
+        """Test the loop announces on change and otherwise only as a refresh."""
+        announced, delays = [], []
+        
+        async def announce():
+            announced.append(len(delays))
+            gossip._announced_version = gossip.registry.local_version
+        
+        async def fake_sleep(delay):
+            delays.append(delay)
+            if len(delays) == 5:
+                gossip.registry.local_version += 1
+            if len(delays) == 20:
+                gossip._running = False
+        
+        monkeypatch.setattr(gossip, "announce", announce)
+        monkeypatch.setattr(gossip_module.asyncio, "sleep", fake_sleep)
+        gossip.announce_interval = 60
+        gossip._running = True
+        
+        await gossip._announce_loop()
+        
+        # Initial, after the local change, then a refresh after 10 idle ticks
+        assert announced == [0, 5, 16]
+        assert all(54 <= d <= 66 for d in delays)
+    
+    def test_time_bucketed_set_expires_after_two_periods(self, monkeypatch):
+        """Test nonces are remembered one to two periods without sweeping."""
+        now = [0.0]
+        monkeypatch.setattr(gossip_module.time, "monotonic", lambda: now[0])
+        seen = gossip_module._TimeBucketedSet(10)
+        
+        assert seen.add_if_new("a")
+        assert not seen.add_if_new("a")
+        now[0] = 11
+        assert not seen.add_if_new("a")
+        assert seen.add_if_new("b")
+        now[0] = 22
+        assert seen.add_if_new("a")
+        assert not seen.add_if_new("b")
+        assert len(seen) == 2
+    
+    @pytest.mark.asyncio
+    async def test_large_sync_response_is_gzipped(self, gossip, registry):
+        """Test large sync responses go out gzipped and decode on receipt."""
+        sent = []
+        
+        async def send(peer, data):
+            sent.append(data)
+            return True
+        
+        gossip.set_send_callback(send)
+        await gossip.routing_table.add_or_update_many([
+            make_route(f"m{i}", embedding=[0.5] * 64) for i in range(40)
+        ])
+        
+        await gossip._send_sync_response("peer", "abc")
+        
+        assert sent[0][:2] == gossip_module.GZIP_MAGIC
+        receiver = ModelGossip("peer", registry)
+        await receiver.handle_message(sent[0], "local")
+        assert len(receiver.routing_table.get_all()) == 40
+    
+    @pytest.mark.asyncio
+    async def test_large_announcement_forwarded_gzipped(self, gossip):
+        """Test forwarding re-compresses a large announcement instead of sending raw JSON."""
+        msg = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE, from_node="a", ttl=3,
+            routes=[make_route(f"m{i}", embedding=[0.5] * 64) for i in range(40)],
+        )
+        
+        await gossip.handle_message(gossip_module._compress(msg.to_bytes()), "a")
+        
+        assert len(gossip.broadcasts) == 1
+        assert gossip.broadcasts[0][:2] == gossip_module.GZIP_MAGIC
+        forwarded = ModelMessage.from_bytes(gzip.decompress(gossip.broadcasts[0]))
+        assert forwarded.ttl == 2
+        assert len(forwarded.routes) == 40
+    
+    @pytest.mark.asyncio
+    async def test_oversized_gzip_message_dropped(self, gossip, monkeypatch):
+        """Test a gzip payload inflating past the size cap is dropped, not decompressed."""
+        monkeypatch.setattr(gossip_module, "MAX_GOSSIP_MESSAGE_SIZE", 64 * 1024)
+        msg = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE, from_node="a", ttl=3,
+            routes=[make_route(f"m{i}", embedding=[0.5] * 64) for i in range(40)],
+        )
+        data = msg.to_bytes()
+        bomb = gzip.compress(data + b" " * (1024 * 1024))
+        assert len(bomb) < 64 * 1024
+        
+        with pytest.raises(ValueError):
+            gossip_module._decompress(bomb)
+        await gossip.handle_message(bomb, "a")
+        assert gossip.broadcasts == []
+        assert gossip.routing_table.get_all() == []
+        
+        await gossip.handle_message(gzip.compress(data), "a")
+        assert len(gossip.broadcasts) == 1
+    
+    def test_msgpack_wire_format(self):
+        """Test msgpack messages round trip and are detected on receipt."""
+        if not gossip_module.ORMSGPACK_AVAILABLE:
+            with pytest.raises(ValueError):
+                ModelGossip("local", None, wire_format=WireFormat.MSGPACK)
+            pytest.skip("ormsgpack not installed")
+        msg = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE, from_node="a", routes=[make_route()]
+        )
+        
+        data = msg.to_bytes(WireFormat.MSGPACK)
+        
+        assert data[0] == 0xde
+        assert ModelMessage.from_bytes(data).to_dict() == msg.to_dict()
+    
+    @pytest.mark.asyncio
+    async def test_replay_rejected_before_building_message(self, gossip, monkeypatch):
+        """Test a replayed nonce is dropped without materializing routes."""
+        msg = ModelMessage(
+            type=MessageType.MODEL_AVAILABLE, from_node="a", routes=[make_route()], ttl=3,
+        )
+        await gossip.handle_message(msg.to_bytes(), "a")
+        
+        built = []
+        real_from_dict = ModelMessage.from_dict.__func__
+        monkeypatch.setattr(
+            ModelMessage, "from_dict",
+            classmethod(lambda cls, d: built.append(d) or real_from_dict(cls, d)),
+        )
+        msg.ttl = 2  # Different bytes, same nonce
+        await gossip.handle_message(msg.to_bytes(), "b")
+        
+        assert built == []
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_sync_requests_coalesce(self, gossip):
+        """Test concurrent request_sync calls share one request and result."""
+        callers = [asyncio.create_task(gossip.request_sync()) for _ in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        
+        assert len(gossip.broadcasts) == 1
+        request = ModelMessage.from_bytes(gossip.broadcasts[0])
+        response = ModelMessage(
+            type=MessageType.SYNC_RESPONSE, from_node="peer", nonce=request.nonce,
+            full_routes=[make_route("a"), make_route("b")],
+        )
+        await gossip.handle_message(response.to_bytes(), "peer")
+        
+        assert await asyncio.gather(*callers) == [2, 2, 2]
+        assert gossip._inflight_syncs == {}
+    
+    @pytest.mark.asyncio
+    async def test_identical_model_requests_coalesce(self, gossip):
+        """Test repeating a model request within the window is not re-sent."""
+        first = await gossip.request_model(name="m", capabilities=["text"])
+        second = await gossip.request_model(name="m", capabilities=["text"])
+        other = await gossip.request_model(name="other")
+        
+        assert first == second != other
+        assert len(gossip.broadcasts) == 2
+    
+    @pytest.mark.asyncio
+    async def test_model_request_uses_capability_index(self, gossip, registry, tmp_path):
+        """Test requests are answered from the capability index, refreshed on registration."""
+        model_path = tmp_path / "m.pkl"
+        model_path.write_bytes(b"x" * 10)
+        for name, caps in [("a", ["text", "vision"]), ("b", ["text"]), ("c", ["audio"])]:
+            await registry.register_local(
+                ModelManifest(name=name, version="1.0.0", type="classifier", capabilities=caps),
+                model_path, save=False,
+            )
+        offers = []
+        
+        async def send(to_node, data):
+            offers.append(ModelMessage.from_bytes(data).offer_route.project)
+        
+        gossip.set_send_callback(send)
+        request = ModelMessage(
+            type=MessageType.MODEL_REQUEST, from_node="peer",
+            criteria={"capabilities": ["text", "vision"]}, ttl=0,
+        )
+        await gossip.handle_message(request.to_bytes(), "peer")
+        assert offers == ["a"]
+        assert [e.manifest.name for e in gossip._local_candidates({"capabilities": ["text"]})] == ["a", "b"]
+        assert list(gossip._local_candidates({"capabilities": ["video"]})) == []
+        
+        await registry.register_local(
+            ModelManifest(name="d", version="1.0.0", type="classifier", capabilities=["video"]),
+            model_path, save=False,
+        )
+        assert [e.manifest.name for e in gossip._local_candidates({"capabilities": ["video"]})] == ["d"]
+    
+    @pytest.mark.asyncio
+    async def test_forwarding_is_queued_while_running(self, gossip, monkeypatch):
+        """Test forwards go through the queue and full queues shed announcements."""
+        monkeypatch.setattr(gossip_module, "FORWARD_QUEUE_SIZE", 1)
+        monkeypatch.setattr(gossip_module, "FORWARD_WORKERS", 0)
+        await gossip.start()
+        try:
+            update = ModelMessage(
+                type=MessageType.ROUTE_UPDATE, from_node="a", route=make_route(), ttl=3,
+            )
+            await gossip.handle_message(update.to_bytes(), "a")
+            
+            assert gossip.broadcasts == []
+            assert gossip._forward_q.qsize() == 1
+            
+            announcement = ModelMessage(
+                type=MessageType.MODEL_AVAILABLE, from_node="a", routes=[make_route("b")], ttl=3,
+            )
+            await gossip.handle_message(announcement.to_bytes(), "a")
+            
+            assert gossip.stats()["forwards_dropped"] == 1
+            assert gossip.broadcasts == []
+        finally:
+            await gossip.stop()
+    
+    @pytest.mark.asyncio
+    async def test_start_seeds_routes_in_one_swap(self, gossip, registry, llamafarm_dir, monkeypatch):
+        """Test start publishes every local model's route in a single snapshot."""
+        await registry.import_from_llamafarm("anomaly/detector.joblib")
+        await registry.import_from_llamafarm("classifier/spam.pkl")
+        publishes = []
+        publish = gossip.routing_table._publish
+        monkeypatch.setattr(gossip.routing_table, "_publish",
+                            lambda changes: publishes.append(set(changes)) or publish(changes))
+        
+        await gossip.start()
+        try:
+            assert publishes == [{"detector", "spam"}]
+            assert gossip.routing_table.find_nodes_with_model("spam") == {"local"}
+        finally:
+            await gossip.stop()
+    
+    @pytest.mark.asyncio
+    async def test_forward_workers_drain_queue(self, gossip):
+        """Test the forward workers send queued forwards."""
+        await gossip.start()
+        try:
+            msg = ModelMessage(
+                type=MessageType.ROUTE_UPDATE, from_node="a", route=make_route(), ttl=3,
+            )
+            await gossip.handle_message(msg.to_bytes(), "a")
+            await gossip._forward_q.join()
+            
+            assert ModelMessage.from_bytes(gossip.broadcasts[-1]).ttl == 2
+        finally:
+            await gossip.stop()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    async def test_sync_response_reuses_encoded_routes(self, gossip, monkeypatch, use_orjson):
+        """Test sync responses splice the cached route list into the envelope."""
+        if use_orjson and not gossip_module.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(gossip_module, "ORJSON_AVAILABLE", use_orjson)
+        sent = []
+        
+        async def send(peer, data):
+            sent.append(data)
+            return True
+        
+        gossip.set_send_callback(send)
+        await gossip.routing_table.add_or_update_many([make_route("a"), make_route("b")])
+        
+        await gossip._send_sync_response("peer", "n1")
+        encoded = gossip.routing_table.export_for_sync_json()
+        await gossip._send_sync_response("peer", "n2")
+        
+        assert gossip.routing_table.export_for_sync_json() is encoded
+        msg = ModelMessage.from_bytes(sent[1])
+        assert msg.type == MessageType.SYNC_RESPONSE and msg.nonce == "n2"
+        assert sorted(r.project for r in msg.full_routes) == ["a", "b"]
+        
+        await gossip.routing_table.remove("a")
+        assert gossip.routing_table.export_for_sync_json() is not encoded
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_removal_update_then_remove(self, gossip):
+        """Test removal broadcasts an update while others hold it, then a remove."""
+        await gossip.routing_table.add_or_update(make_route(nodes=["local", "node-a"]))
+        
+        await gossip.broadcast_removal("m")
+        await gossip.routing_table.remove_node_from_route("m", "node-a")
+        await gossip.routing_table.add_or_update(make_route(nodes=["local"]))
+        await gossip.broadcast_removal("m")
+        
+        update, remove = (ModelMessage.from_bytes(b) for b in gossip.broadcasts)
+        assert (update.action, update.route.nodes) == ("update", {"node-a"})
+        assert (remove.action, remove.route.nodes) == ("remove", frozenset())
+        assert gossip.routing_table.get("m") is None
+    
+    def test_full_nonce_cache_rejects_new_messages(self, gossip, monkeypatch, caplog):
+        """Test a full nonce cache rejects new nonces until entries expire."""
+        now = [1000.0]
+        monkeypatch.setattr(gossip_module.time, "time", lambda: now[0])
+        gossip._nonce_cache = gossip_module._NonceWindow(10, 5, max_size=2)
+        
+        assert gossip._check_nonce("a", 1000) and gossip._check_nonce("b", 1000)
+        assert not gossip._check_nonce("c", 1000)
+        assert "nonce_rate_abuse" in caplog.text
+        
+        now[0] = 1015  # Timestamps of both nonces have left the window
+        assert gossip._check_nonce("c", 1010)
+    
+    def test_nonce_cap_per_peer(self, gossip, monkeypatch, caplog):
+        """Test one peer hitting its nonce cap doesn't block other peers."""
+        now = [1000.0]
+        monkeypatch.setattr(gossip_module.time, "time", lambda: now[0])
+        monkeypatch.setattr(gossip_module, "NONCE_PER_PEER_MAX", 2)
+        gossip._nonce_cache = gossip_module._NonceWindow(10, 5)
+        
+        assert gossip._check_nonce("a", 995, "p1")
+        assert gossip._check_nonce("b", 1005, "p1")
+        assert not gossip._check_nonce("c", 1000, "p1")
+        assert gossip._check_nonce("c", 1000, "p2")
+        assert "nonce_rate_abuse: peer p1" in caplog.text
+        stats = gossip.stats()
+        assert (stats["nonce_cache_peers"], stats["nonce_capped_peers"]) == (2, 1)
+        assert stats["nonces_rejected"] == 1
+        
+        now[0] = 1010  # "a" has expired
+        assert gossip._check_nonce("d", 1010, "p1")
+    
+    def test_nonces_kept_while_timestamp_is_valid(self, monkeypatch):
+        """Test a future-dated nonce is remembered until its timestamp expires."""
+        now = [1000.0]
+        monkeypatch.setattr(gossip_module.time, "time", lambda: now[0])
+        window = gossip_module._NonceWindow(300, 60)
+        
+        assert window.add_if_new("n", 1299)
+        now[0] = 1550  # Long after arrival, but 1299 is still within the window
+        assert not window.add_if_new("n", 1299)
+        assert not window.add_if_new("n", 1500)  # Re-dated replay
+        
+        now[0] = 1700
+        assert len(window) == 0
+        assert window.add_if_new("n", 1700)